@@ -0,0 +1,141 @@
+from exchanges.models import Exchange
+from organizations.graph import follow_graph, contains
+from organizations.models import Organization
+from products.models import Product
+from users.models import Identity, Setting
+from .models import Base
+
+OWNER_TYPES = ('organization', 'exchange', 'product', 'identity')
+
+
+class AccessContext(object):
+    """
+        Loads what the permission classes need about the request user once per request
+    """
+    def __init__(self, user):
+        self.user = user
+        self._identity = None
+        self._identity_loaded = False
+        self._followed = None
+        self._user_identities = {}
+        self._settings = {}
+        self._owners = {}
+        self._identity_users = {}
+
+    @property
+    def identity(self):
+        if not self._identity_loaded:
+            self._identity_loaded = True
+            if self.user.is_authenticated:
+                try:
+                    self._identity = Identity.objects.get(identity_user=self.user)
+                except Identity.DoesNotExist:
+                    self._identity = None
+        return self._identity
+
+    @property
+    def followed(self):
+        # sorted ids of the identities the request user follows (accepted)
+        if self._followed is None:
+            identity = self.identity
+            self._followed = follow_graph.following(identity.id if identity is not None else None)
+        return self._followed
+
+    def follows(self, identity_id):
+        return identity_id is not None and contains(self.followed, int(identity_id))
+
+    def follows_user(self, user_id):
+        return self.follows(self.get_user_identity_id(user_id))
+
+    def get_user_identity_id(self, user_id):
+        user_id = int(user_id)
+        if user_id not in self._user_identities:
+            self._user_identities[user_id] = Identity.objects.filter(
+                identity_user_id=user_id).values_list('id', flat=True).first()
+        return self._user_identities[user_id]
+
+    def prefetch_settings(self, user_ids):
+        user_ids = {int(user_id) for user_id in user_ids} - set(self._settings)
+        if user_ids:
+            for setting in Setting.objects.filter(setting_user_id__in=user_ids):
+                self._settings[setting.setting_user_id] = setting
+            for user_id in user_ids:
+                self._settings.setdefault(user_id, None)
+
+    def get_setting(self, user_id, create=False):
+        user_id = int(user_id)
+        self.prefetch_settings([user_id])
+        if self._settings[user_id] is None and create:
+            self._settings[user_id] = Setting.objects.create(setting_user_id=user_id)
+        return self._settings[user_id]
+
+    def can_read(self, user_id, target_field, missing=False):
+        # missing is the answer when the owner has no setting row
+        setting = self.get_setting(user_id)
+        if setting is None:
+            return missing
+        target_value = getattr(setting, target_field)
+        if target_value == 'all' or self.user.is_superuser:
+            return True
+        elif target_value == 'followers':
+            return self.follows_user(user_id)
+        return False
+
+    def prefetch_owners(self, base_ids):
+        base_ids = {int(base_id) for base_id in base_ids} - set(self._owners)
+        if not base_ids:
+            return
+        child_names = dict(Base.objects.filter(id__in=base_ids).values_list('id', 'child_name'))
+        for base_id in base_ids:
+            self._owners[base_id] = (child_names.get(base_id), None)
+
+        def ids_of(child_name):
+            return [base_id for base_id, name in child_names.items() if name == child_name]
+
+        owners = []
+        if ids_of('organization'):
+            owners.extend(Organization.objects.filter(id__in=ids_of('organization')).values_list('id', 'owner_id'))
+        if ids_of('product'):
+            owners.extend(Product.objects.filter(id__in=ids_of('product')).values_list('id', 'product_user_id'))
+        if ids_of('exchange'):
+            exchanges = Exchange.objects.filter(id__in=ids_of('exchange')).values_list(
+                'id', 'owner__identity_user_id', 'owner__identity_organization__owner_id')
+            owners.extend((exchange_id, user_id or owner_id) for exchange_id, user_id, owner_id in exchanges)
+        if ids_of('identity'):
+            identities = Identity.objects.filter(id__in=ids_of('identity')).values_list(
+                'id', 'identity_user_id', 'identity_organization__owner_id')
+            for identity_id, user_id, owner_id in identities:
+                self._identity_users[identity_id] = user_id
+                if user_id is not None:
+                    self._user_identities[user_id] = identity_id
+                owners.append((identity_id, user_id or owner_id))
+        for base_id, owner_id in owners:
+            self._owners[base_id] = (child_names[base_id], owner_id)
+
+    def get_owner(self, base_id):
+        """
+            Returns (child_name, owner user id), child_name is None for a missing base
+        """
+        if base_id is None:
+            return None, None
+        base_id = int(base_id)
+        self.prefetch_owners([base_id])
+        return self._owners[base_id]
+
+    def get_identity_user_id(self, identity_id):
+        child_name, owner_id = self.get_owner(identity_id)
+        return self._identity_users.get(int(identity_id))
+
+    def is_owner(self, base_id, owner_types=OWNER_TYPES):
+        child_name, owner_id = self.get_owner(base_id)
+        if child_name not in owner_types:
+            return False
+        return owner_id is not None and owner_id == self.user.id
+
+
+def get_access_context(request):
+    context = getattr(request, '_access_context', None)
+    if context is None or context.user != request.user:
+        context = AccessContext(request.user)
+        request._access_context = context
+    return context
@@ -0,0 +1,151 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.apps import apps
+from django.conf import settings
+
+from .search import normalize_text
+
+# source: (model, title field, weight field)
+AUTOCOMPLETE_SOURCES = {
+    'hashtags': ('base.HashtagParent', 'title', 'usage'),
+    'identities': ('users.Identity', 'name', None),
+    'categories': ('products.Category', 'title', None),
+}
+MAX_RESULTS = 50
+# results of prefixes this short span most of the index, they are memoized
+SHORT_PREFIX = 2
+LAST_CHARACTER = chr(0x10FFFF)
+
+
+def get_keys(title):
+    # every word start is a key so "رضا" finds "علی رضایی"
+    words = normalize_text(title).split(' ')
+    return {' '.join(words[index:]) for index in range(len(words)) if words[index]}
+
+
+class PrefixIndex(object):
+    """
+        Sorted array of (key, id) answering top-k prefix queries by weight
+    """
+    def __init__(self, rows=()):
+        self.keys = []
+        self.entries = {}
+        self.top = {}
+        self.lock = threading.Lock()
+        for pk, title, weight in rows:
+            self._add(pk, title, weight or 0, sort=False)
+        self.keys.sort()
+
+    def _add(self, pk, title, weight, sort=True):
+        entry_keys = get_keys(title)
+        self.entries[pk] = (title, weight, entry_keys)
+        for key in entry_keys:
+            if sort:
+                insort(self.keys, (key, pk))
+                self._forget(key)
+            else:
+                self.keys.append((key, pk))
+
+    def _remove(self, pk):
+        entry = self.entries.pop(pk, None)
+        if entry is None:
+            return
+        for key in entry[2]:
+            index = bisect_left(self.keys, (key, pk))
+            if index < len(self.keys) and self.keys[index] == (key, pk):
+                del self.keys[index]
+            self._forget(key)
+
+    def _forget(self, key):
+        for length in range(1, SHORT_PREFIX + 1):
+            self.top.pop(key[:length], None)
+
+    def update(self, pk, title, weight=0):
+        with self.lock:
+            self._remove(pk)
+            if title:
+                self._add(pk, title, weight or 0)
+
+    def delete(self, pk):
+        with self.lock:
+            self._remove(pk)
+
+    def _rank(self, pk):
+        title, weight, entry_keys = self.entries[pk]
+        return -weight, len(title), pk
+
+    def query(self, prefix, limit=10):
+        prefix = normalize_text(prefix)
+        limit = min(limit, MAX_RESULTS)
+        if not prefix:
+            return []
+        with self.lock:
+            if prefix in self.top:
+                best = self.top[prefix]
+            else:
+                start = bisect_left(self.keys, (prefix,))
+                end = bisect_left(self.keys, (prefix + LAST_CHARACTER,))
+                ids = {pk for key, pk in self.keys[start:end]}
+                best = heapq.nsmallest(MAX_RESULTS, ids, key=self._rank)
+                if len(prefix) <= SHORT_PREFIX:
+                    self.top[prefix] = best
+            return [{
+                'id': pk,
+                'title': self.entries[pk][0],
+                'weight': self.entries[pk][1],
+            } for pk in best[:limit]]
+
+
+def load_rows(source):
+    model_label, title_field, weight_field = AUTOCOMPLETE_SOURCES[source]
+    queryset = apps.get_model(model_label).objects.all()
+    if weight_field is None:
+        return ((pk, title, 0) for pk, title in queryset.values_list('id', title_field).iterator())
+    return queryset.values_list('id', title_field, weight_field).iterator()
+
+
+class Autocomplete(object):
+    """
+        In process prefix indexes, patched by post_save of this process and rebuilt
+        every AUTOCOMPLETE_REBUILD_INTERVAL seconds to catch writes of other processes
+    """
+    def __init__(self):
+        self.indexes = {}
+        self.built_times = {}
+        self.lock = threading.Lock()
+
+    def get_index(self, source):
+        index = self.indexes.get(source)
+        expired = time.time() - self.built_times.get(source, 0) > settings.AUTOCOMPLETE_REBUILD_INTERVAL
+        # one thread rebuilds, the others keep answering from the old index
+        if (index is None or expired) and self.lock.acquire(index is None):
+            try:
+                # another thread may have rebuilt it while this one waited
+                if time.time() - self.built_times.get(source, 0) > settings.AUTOCOMPLETE_REBUILD_INTERVAL:
+                    self.indexes[source] = PrefixIndex(load_rows(source))
+                    self.built_times[source] = time.time()
+                index = self.indexes[source]
+            finally:
+                self.lock.release()
+        return index
+
+    def query(self, source, prefix, limit=10):
+        return self.get_index(source).query(prefix, limit)
+
+    def update_instance(self, instance):
+        label = instance._meta.label
+        for source, (model_label, title_field, weight_field) in AUTOCOMPLETE_SOURCES.items():
+            index = self.indexes.get(source)
+            if model_label != label or index is None:
+                continue
+            if instance.delete_flag:
+                index.delete(instance.pk)
+            else:
+                weight = getattr(instance, weight_field) if weight_field else 0
+                index.update(instance.pk, getattr(instance, title_field), weight)
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,155 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .instrumentation import record_cache
+
+
+def table_version_key(table):
+    return 'version:%s' % table
+
+
+def get_table_version(table):
+    version = cache.get(table_version_key(table))
+    if version is None:
+        version = 1
+        # add is a no-op if another worker created the counter first
+        if not cache.add(table_version_key(table), version, None):
+            version = cache.get(table_version_key(table), version)
+    return version
+
+
+def bump_table_version(table):
+    try:
+        return cache.incr(table_version_key(table))
+    except ValueError:
+        cache.set(table_version_key(table), 2, None)
+        return 2
+
+
+def row_key(table, pk, version=None):
+    if version is None:
+        version = get_table_version(table)
+    return 'row:%s:%s:%s' % (table, version, pk)
+
+
+def get_row(table, pk):
+    instance = cache.get(row_key(table, pk))
+    record_cache(int(instance is not None), int(instance is None))
+    return instance
+
+
+def get_rows(table, pks):
+    version = get_table_version(table)
+    keys = {row_key(table, pk, version): pk for pk in pks}
+    cached = cache.get_many(list(keys))
+    record_cache(len(cached), len(keys) - len(cached))
+    return {keys[key]: instance for key, instance in cached.items()}
+
+
+def set_row(table, instance):
+    cache.set(row_key(table, instance.pk), instance, settings.CACHE_TIMEOUT)
+
+
+def set_rows(table, instances):
+    version = get_table_version(table)
+    cache.set_many({row_key(table, instance.pk, version): instance for instance in instances},
+                   settings.CACHE_TIMEOUT)
+
+
+def delete_row(table, pk):
+    cache.delete(row_key(table, pk))
+
+
+def delete_rows(table, pks):
+    version = get_table_version(table)
+    cache.delete_many([row_key(table, pk, version) for pk in pks])
+
+
+def related_tables(model):
+    # parent and child tables share the inherited columns (delete_flag, updated_time, ...)
+    tables = {model._meta.db_table}
+    tables.update(parent._meta.db_table for parent in model._meta.get_parent_list())
+    children = model.__subclasses__()
+    while children:
+        child = children.pop()
+        if not child._meta.abstract and not child._meta.proxy:
+            tables.add(child._meta.db_table)
+        children.extend(child.__subclasses__())
+    return tables
+
+
+class InvalidationBus(threading.local):
+    """
+        Collects cache invalidations of a transaction and sends them once on commit
+    """
+    def __init__(self):
+        self.rows = {}
+        self.tables = set()
+        self.scheduled = {}
+
+    def _is_scheduled(self, connection):
+        return any(func == self.flush for sids, func in connection.run_on_commit)
+
+    def _buffer(self, using):
+        connection = transaction.get_connection(using)
+        if not connection.in_atomic_block:
+            return False
+        if self.scheduled.get(using) and not self._is_scheduled(connection):
+            # the block holding our callback was rolled back, so were its writes
+            self.rows = {}
+            self.tables = set()
+            self.scheduled = {}
+        if not self.scheduled.get(using):
+            self.scheduled[using] = True
+            transaction.on_commit(self.flush, using=using)
+        return True
+
+    def add_rows(self, tables, pk, using=None):
+        if self._buffer(using):
+            for table in tables:
+                self.rows.setdefault(table, set()).add(str(pk))
+        else:
+            cache.delete_many([row_key(table, pk) for table in tables])
+
+    def add_tables(self, tables, using=None):
+        if self._buffer(using):
+            self.tables.update(tables)
+        else:
+            for table in tables:
+                bump_table_version(table)
+
+    def is_dirty(self, table, pk=None, using=None):
+        # rows changed by the running transaction must not be served from or written to the cache
+        if not transaction.get_connection(using).in_atomic_block:
+            return False
+        return table in self.tables or table in self.rows and (pk is None or str(pk) in self.rows[table])
+
+    def flush(self):
+        rows, tables = self.rows, self.tables
+        self.rows = {}
+        self.tables = set()
+        self.scheduled = {}
+        for table in tables:
+            bump_table_version(table)
+        keys = []
+        for table, pks in rows.items():
+            # a bumped generation already hides every row of the table
+            if table not in tables:
+                version = get_table_version(table)
+                keys.extend(row_key(table, pk, version) for pk in pks)
+        if keys:
+            cache.delete_many(keys)
+
+
+invalidation_bus = InvalidationBus()
+
+
+def invalidate_instance(instance, using=None):
+    invalidation_bus.add_rows(related_tables(type(instance)), instance.pk, using)
+
+
+def invalidate_table(model, using=None):
+    invalidation_bus.add_tables(related_tables(model), using)
@@ -0,0 +1,206 @@
+import time
+import uuid
+from array import array
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Count
+
+from exchanges.models import Exchange, ExchangeIdentity
+from organizations.graph import follow_graph, contains
+from organizations.models import Follow
+from .instrumentation import record_cache
+from .models import Post
+
+LARGE_EXCHANGES_KEY = 'feed:large_exchanges'
+LARGE_AUTHORS_KEY = 'feed:large_authors'
+LOCK_ATTEMPTS = 20
+LOCK_DELAY = 0.01
+
+
+def version_key(identity_id):
+    return 'feed_version:%s' % identity_id
+
+
+def feed_key(identity_id, version):
+    return 'feed:%s:%s' % (identity_id, version)
+
+
+def lock_key(identity_id):
+    return 'feed_lock:%s' % identity_id
+
+
+@contextmanager
+def feed_lock(identity_id):
+    """
+        Serializes the writers of one cached feed, yields False when the lock was not taken in time
+    """
+    for attempt in range(LOCK_ATTEMPTS):
+        # add is atomic in memcached, only one writer gets the key
+        if cache.add(lock_key(identity_id), 1, settings.FEED_LOCK_TIMEOUT):
+            try:
+                yield True
+            finally:
+                cache.delete(lock_key(identity_id))
+            return
+        time.sleep(LOCK_DELAY)
+    yield False
+
+
+def get_large_exchange_ids():
+    """
+        Exchanges read on demand instead of fanned out, the default one every user joins and the crowded ones
+    """
+    exchange_ids = cache.get(LARGE_EXCHANGES_KEY)
+    if exchange_ids is None:
+        exchange_ids = set(Exchange.objects.filter(is_default_exchange=True).values_list('id', flat=True))
+        exchange_ids.update(ExchangeIdentity.objects.filter(active_flag=True).values(
+            'exchange_identity_related_exchange_id'
+        ).annotate(members=Count('id')).filter(
+            members__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('exchange_identity_related_exchange_id', flat=True).order_by())
+        cache.set(LARGE_EXCHANGES_KEY, exchange_ids, settings.FEED_LARGE_EXCHANGES_TIMEOUT)
+    return exchange_ids
+
+
+def get_large_author_ids():
+    """
+        Identities with more followers than a post is fanned out to, their posts are read on demand
+    """
+    author_ids = cache.get(LARGE_AUTHORS_KEY)
+    if author_ids is None:
+        author_ids = set(Follow.objects.filter(follow_accepted=True).values('follow_followed_id').annotate(
+            followers=Count('id')
+        ).filter(followers__gt=settings.FEED_FANOUT_LIMIT).values_list('follow_followed_id', flat=True).order_by())
+        cache.set(LARGE_AUTHORS_KEY, author_ids, settings.FEED_LARGE_EXCHANGES_TIMEOUT)
+    return author_ids
+
+
+def get_joined_exchange_ids(identity_id):
+    return set(ExchangeIdentity.objects.filter(
+        exchange_identity_related_identity_id=identity_id,
+        active_flag=True
+    ).values_list('exchange_identity_related_exchange_id', flat=True))
+
+
+def build_feed(identity_id):
+    # fan-out-on-read of everything the feed is made of, used when the cached feed is missing
+    authors = set(follow_graph.following(identity_id)) - get_large_author_ids()
+    authors.add(identity_id)
+    exchange_ids = get_joined_exchange_ids(identity_id) - get_large_exchange_ids()
+    post_ids = Post.objects.filter(
+        Q(post_identity_id__in=authors) | Q(post_parent_id__in=exchange_ids)
+    ).order_by('-id').values_list('id', flat=True)[:settings.FEED_SIZE]
+    return array('q', post_ids)
+
+
+def load_feed(identity_id):
+    # (version, feed) of the cached feed, feed is None when it is cold
+    version = cache.get(version_key(identity_id))
+    data = cache.get(feed_key(identity_id, version)) if version is not None else None
+    if data is None:
+        return version, None
+    feed = array('q')
+    feed.frombytes(data)
+    return version, feed
+
+
+def get_feed(identity_id):
+    version, feed = load_feed(identity_id)
+    record_cache(int(feed is not None), int(feed is None))
+    if feed is not None:
+        return feed
+    # built under the lock of the feed, a post committed meanwhile is either in the build or appended after it
+    with feed_lock(identity_id) as locked:
+        if locked:
+            version, feed = load_feed(identity_id)
+            if feed is not None:
+                return feed
+        if version is None:
+            # set before building, a change committed after the build replaces it
+            version = uuid.uuid4().hex
+            cache.set(version_key(identity_id), version, settings.CACHE_TIMEOUT)
+        feed = build_feed(identity_id)
+        if locked:
+            cache.set(feed_key(identity_id, version), feed.tobytes(), settings.CACHE_TIMEOUT)
+    return feed
+
+
+def invalidate_feeds(identity_ids):
+    # the authors or exchanges of these feeds changed, they are built again on their next read
+    cache.set_many({version_key(identity_id): uuid.uuid4().hex for identity_id in identity_ids},
+                   settings.CACHE_TIMEOUT)
+
+
+def add_to_feed(identity_id, post_id):
+    """
+        Inserts post_id into the cached feed of identity_id, kept newest first and FEED_SIZE long
+    """
+    with feed_lock(identity_id) as locked:
+        if not locked:
+            # a busy feed is built again instead of waiting for it
+            invalidate_feeds([identity_id])
+            return
+        version, feed = load_feed(identity_id)
+        if feed is None:
+            # cold feeds are built with the post on their next read
+            return
+        # posts committed together may arrive out of order
+        index = page_after(feed, post_id)
+        if index >= settings.FEED_SIZE or index and feed[index - 1] == post_id:
+            return
+        feed.insert(index, post_id)
+        del feed[settings.FEED_SIZE:]
+        cache.set(feed_key(identity_id, version), feed.tobytes(), settings.CACHE_TIMEOUT)
+
+
+def get_recipients(post):
+    recipients = {post.post_identity_id}
+    if post.post_identity_id not in get_large_author_ids():
+        recipients.update(follow_graph.followers(post.post_identity_id))
+    if post.post_parent_id is not None and post.post_parent_id not in get_large_exchange_ids():
+        recipients.update(ExchangeIdentity.objects.filter(
+            exchange_identity_related_exchange_id=post.post_parent_id,
+            active_flag=True
+        ).values_list('exchange_identity_related_identity_id', flat=True))
+    return recipients
+
+
+def fan_out_post(post):
+    for identity_id in get_recipients(post):
+        add_to_feed(identity_id, post.pk)
+
+
+def page_after(feed, cursor):
+    # first index of an id below cursor in a newest first feed
+    low, high = 0, len(feed)
+    while low < high:
+        middle = (low + high) // 2
+        if feed[middle] >= cursor:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def read_feed(identity_id, cursor=None, limit=20):
+    """
+        Returns a page of posts older than cursor and the cursor of the next page
+    """
+    feed = get_feed(identity_id)
+    start = page_after(feed, int(cursor)) if cursor else 0
+    post_ids = set(feed[start:start + limit])
+    large_exchange_ids = get_joined_exchange_ids(identity_id) & get_large_exchange_ids()
+    following = follow_graph.following(identity_id)
+    large_author_ids = [author_id for author_id in get_large_author_ids() if contains(following, author_id)]
+    if large_exchange_ids or large_author_ids:
+        posts = Post.objects.filter(Q(post_parent_id__in=large_exchange_ids) | Q(post_identity_id__in=large_author_ids))
+        if cursor:
+            posts = posts.filter(id__lt=cursor)
+        post_ids.update(posts.order_by('-id').values_list('id', flat=True)[:limit])
+    post_ids = sorted(post_ids, reverse=True)[:limit]
+    # hydrated from the row cache, deleted posts drop out here
+    posts = Post.objects.get_many(post_ids)
+    next_cursor = post_ids[-1] if len(post_ids) == limit else None
+    return [posts[post_id] for post_id in post_ids if post_id in posts], next_cursor
@@ -0,0 +1,224 @@
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# upper bounds in milliseconds of the latency histogram buckets
+LATENCY_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+STRINGS = re.compile(r"'(?:[^']|'')*'")
+NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+VALUE_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    # queries differing only in their parameters share a fingerprint
+    sql = NUMBERS.sub('?', STRINGS.sub('?', sql))
+    return VALUE_LISTS.sub('(?)', sql)
+
+
+class RequestStats(object):
+    def __init__(self):
+        self.queries = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_time = 0.0
+        self.duration = 0.0
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def query_time(self):
+        return sum(float(query['time']) for query in self.queries)
+
+    def duplicates(self):
+        counts = Counter(fingerprint(query['sql']) for query in self.queries)
+        return {sql: count for sql, count in counts.items() if count > 1}
+
+    def as_dict(self):
+        return {
+            'duration': round(self.duration * 1000, 2),
+            'queries': self.query_count,
+            'query_time': round(self.query_time * 1000, 2),
+            'duplicates': self.duplicates(),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'serializer_time': round(self.serializer_time * 1000, 2),
+        }
+
+
+class StatsStack(threading.local):
+    def __init__(self):
+        self.active = []
+        self.serializer_depth = 0
+
+
+stats_stack = StatsStack()
+
+
+@contextmanager
+def collect_stats(budget=None):
+    """
+        Records the queries, cache lookups and serializer time of the block, raises
+        QueryBudgetExceeded when more than budget queries ran
+    """
+    stats = RequestStats()
+    logs = {}
+    for connection in connections.all():
+        logs[connection.alias] = (connection, connection.force_debug_cursor, len(connection.queries_log))
+        connection.force_debug_cursor = True
+    stats_stack.active.append(stats)
+    start = time.time()
+    try:
+        yield stats
+    finally:
+        stats.duration = time.time() - start
+        stats_stack.active.remove(stats)
+        for connection, force_debug_cursor, first in logs.values():
+            connection.force_debug_cursor = force_debug_cursor
+            stats.queries.extend(list(connection.queries_log)[first:])
+    if budget is not None and stats.query_count > budget:
+        raise QueryBudgetExceeded('%s queries ran, the budget is %s' % (stats.query_count, budget))
+
+
+def record_cache(hits, misses):
+    for stats in stats_stack.active:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+@contextmanager
+def serializer_timer():
+    # nested serializers are already inside the outer one's time
+    stats_stack.serializer_depth += 1
+    start = time.time()
+    try:
+        yield
+    finally:
+        stats_stack.serializer_depth -= 1
+        if not stats_stack.serializer_depth:
+            elapsed = time.time() - start
+            for stats in stats_stack.active:
+                stats.serializer_time += elapsed
+
+
+class RouteHistogram(object):
+    """
+        Rolling per route samples of the last REQUEST_STATS_SAMPLES requests of this process
+    """
+    def __init__(self):
+        self.routes = {}
+        self.lock = threading.Lock()
+
+    def add(self, route, stats):
+        sample = (stats.duration, stats.query_count, stats.query_time, stats.cache_hits,
+                  stats.cache_misses, stats.serializer_time, len(stats.duplicates()))
+        with self.lock:
+            samples = self.routes.get(route)
+            if samples is None:
+                samples = self.routes[route] = deque(maxlen=settings.REQUEST_STATS_SAMPLES)
+            samples.append(sample)
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+
+    def summary(self):
+        with self.lock:
+            routes = {route: list(samples) for route, samples in self.routes.items()}
+        result = []
+        for route, samples in routes.items():
+            durations = sorted(sample[0] * 1000 for sample in samples)
+            buckets = Counter()
+            for duration in durations:
+                bucket = next((bound for bound in LATENCY_BUCKETS if duration <= bound), 'inf')
+                buckets[bucket] += 1
+            queries = [sample[1] for sample in samples]
+            result.append({
+                'route': route,
+                'requests': len(samples),
+                'p50': round(percentile(durations, 50), 2),
+                'p95': round(percentile(durations, 95), 2),
+                'p99': round(percentile(durations, 99), 2),
+                'max': round(durations[-1], 2),
+                'histogram': [[bound, buckets[bound]] for bound in LATENCY_BUCKETS + ('inf',)],
+                'queries_avg': round(sum(queries) / len(queries), 2),
+                'queries_max': max(queries),
+                'query_time_avg': round(sum(sample[2] for sample in samples) * 1000 / len(samples), 2),
+                'cache_hits': sum(sample[3] for sample in samples),
+                'cache_misses': sum(sample[4] for sample in samples),
+                'serializer_time_avg': round(sum(sample[5] for sample in samples) * 1000 / len(samples), 2),
+                'with_duplicates': sum(1 for sample in samples if sample[6]),
+            })
+        return sorted(result, key=lambda route: route['p95'], reverse=True)
+
+
+def percentile(values, percent):
+    index = min(len(values) - 1, int(round(percent / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+route_histogram = RouteHistogram()
+
+
+def get_query_budget(view_func, method):
+    """
+        query_budget of a viewset is a number or a {action: number} dict, 'default' covers the other actions
+    """
+    budget = getattr(getattr(view_func, 'cls', None), 'query_budget', None)
+    if isinstance(budget, dict):
+        action = getattr(view_func, 'actions', {}).get(method.lower())
+        return budget.get(action, budget.get('default'))
+    return budget
+
+
+class RequestStatsMiddleware(object):
+    """
+        Measures REQUEST_STATS_SAMPLE_RATE of the requests, feeds the route histogram, adds X-* headers
+        in debug and checks the query budget declared on the view
+    """
+    def __init__(self, get_response):
+        if not settings.REQUEST_STATS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.REQUEST_STATS_SAMPLE_RATE < 1 and random.random() >= settings.REQUEST_STATS_SAMPLE_RATE:
+            return self.get_response(request)
+        with collect_stats() as stats:
+            response = self.get_response(request)
+        match = request.resolver_match
+        route = '%s %s' % (request.method, match.view_name if match else 'unresolved')
+        route_histogram.add(route, stats)
+        if settings.DEBUG:
+            response['X-Request-Time'] = '%.2f' % (stats.duration * 1000)
+            response['X-Query-Count'] = stats.query_count
+            response['X-Query-Time'] = '%.2f' % (stats.query_time * 1000)
+            response['X-Duplicate-Queries'] = sum(stats.duplicates().values())
+            response['X-Cache-Hits'] = stats.cache_hits
+            response['X-Cache-Misses'] = stats.cache_misses
+            response['X-Serializer-Time'] = '%.2f' % (stats.serializer_time * 1000)
+        budget = getattr(request, '_query_budget', None)
+        if budget is not None and stats.query_count > budget:
+            message = '%s ran %s queries, the budget is %s' % (route, stats.query_count, budget)
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra={'duplicates': stats.duplicates()})
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = get_query_budget(view_func, request.method)
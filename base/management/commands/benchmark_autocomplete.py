@@ -0,0 +1,52 @@
+import random
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from base.autocomplete import AUTOCOMPLETE_SOURCES, PrefixIndex, load_rows
+from base.search import normalize_text
+
+
+class Command(BaseCommand):
+    help = 'Compare the autocomplete prefix index with the ORM substring lookups it replaces'
+
+    def add_arguments(self, parser):
+        parser.add_argument('sources', nargs='*', choices=list(AUTOCOMPLETE_SOURCES), default=list(AUTOCOMPLETE_SOURCES))
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=10)
+
+    def orm_query(self, source, prefix, limit):
+        model_label, title_field, weight_field = AUTOCOMPLETE_SOURCES[source]
+        queryset = apps.get_model(model_label).objects.filter(**{'%s__contains' % title_field: prefix})
+        if weight_field is not None:
+            queryset = queryset.order_by('-' + weight_field)
+        return list(queryset.values_list('id', flat=True)[:limit])
+
+    def handle(self, *args, **options):
+        for source in options['sources']:
+            start = time.time()
+            index = PrefixIndex(load_rows(source))
+            build_time = time.time() - start
+            titles = [entry[0] for entry in index.entries.values() if entry[0]]
+            if not titles:
+                self.stdout.write('%s: nothing to index' % source)
+                continue
+            prefixes = []
+            for title in random.sample(titles, min(options['queries'], len(titles))):
+                title = normalize_text(title)
+                prefixes.append(title[:random.randint(1, min(len(title), 6))])
+
+            start = time.time()
+            for prefix in prefixes:
+                index.query(prefix, options['limit'])
+            index_time = time.time() - start
+
+            start = time.time()
+            for prefix in prefixes:
+                self.orm_query(source, prefix, options['limit'])
+            orm_time = time.time() - start
+
+            self.stdout.write('%s: %s rows, index built in %.3fs' % (source, len(index.entries), build_time))
+            self.stdout.write('  index: %.1f us/query' % (index_time / len(prefixes) * 1000000))
+            self.stdout.write('  orm:   %.1f us/query' % (orm_time / len(prefixes) * 1000000))
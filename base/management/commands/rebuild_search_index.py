@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from base.search import create_search_index, get_searchable_models, index_instance
+
+
+class Command(BaseCommand):
+    help = 'Create the search index and reindex every searchable model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Model names to reindex, all of them by default')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        create_search_index()
+        for model in get_searchable_models():
+            if options['models'] and model._meta.model_name not in options['models']:
+                continue
+            indexed = 0
+            last_id = 0
+            while True:
+                batch = list(model.objects.filter(id__gt=last_id).order_by('id')[:options['batch_size']])
+                if not batch:
+                    break
+                with transaction.atomic():
+                    for instance in batch:
+                        index_instance(instance)
+                last_id = batch[-1].id
+                indexed += len(batch)
+            self.stdout.write('%s: %s rows indexed' % (model._meta.model_name, indexed))
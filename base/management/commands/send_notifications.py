@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from base.models import OutboundMessage
+from base.notifications import send_batch
+
+
+class Command(BaseCommand):
+    help = 'Send the queued emails and sms, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('channels', nargs='*', help='Channels to send, all of them by default')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--interval', type=float, default=2,
+                            help='Seconds to sleep when nothing is due')
+        parser.add_argument('--once', action='store_true', help='Send what is due and exit')
+
+    def handle(self, *args, **options):
+        channels = options['channels'] or [channel for channel, name in OutboundMessage.CHANNEL_CHOICES]
+        while True:
+            busy = False
+            for channel in channels:
+                sent, failed = send_batch(channel, options['batch_size'])
+                if sent or failed:
+                    busy = True
+                    self.stdout.write('%s: %s sent, %s failed' % (channel, sent, failed))
+            if options['once'] and not busy:
+                break
+            if not busy:
+                # a long running worker must not keep a connection the database dropped
+                close_old_connections()
+                time.sleep(options['interval'])
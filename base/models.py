@@ -4,20 +4,62 @@ from django.conf import settings
 from django.db.models.signals import post_save, pre_save
 from django.utils.timezone import now
 from django.contrib.contenttypes.models import ContentType
-from django.core.cache import cache
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
 
 from unixtimestampfield.fields import UnixTimeStampField
 
-from .signals import update_cache, set_child_name
+from .cache import get_row, get_rows, set_row, set_rows, invalidate_table, invalidation_bus
+from .signals import (
+    update_cache,
+    set_child_name,
+    update_search_document,
+    update_autocomplete,
+    update_feeds,
+    update_profile_strength)
 
 
-class BaseManager(models.Manager):
+class BaseQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        rows = super(BaseQuerySet, self).update(**kwargs)
+        # bulk updates skip post_save, drop every cached row of the table
+        invalidate_table(self.model, self.db)
+        return rows
+
+    update.alters_data = True
+
+
+class BaseManager(models.Manager.from_queryset(BaseQuerySet)):
     def get_queryset(self):
-        if not cache.get(self.model._meta.db_table):
-            cache.set(self.model._meta.db_table, super(BaseManager, self).get_queryset().filter(delete_flag=False),
-                      settings.CACHE_TIMEOUT)
-        return cache.get(self.model._meta.db_table)
+        return super(BaseManager, self).get_queryset().filter(delete_flag=False)
+
+    def _is_cacheable(self, pk=None):
+        # related managers add their own filters to get_queryset
+        if getattr(self, 'instance', None) is not None:
+            return False
+        return not invalidation_bus.is_dirty(self.model._meta.db_table, pk, self.db)
+
+    def get(self, *args, **kwargs):
+        pk = kwargs.get('pk', kwargs.get('id', None))
+        if args or len(kwargs) != 1 or pk is None or not self._is_cacheable(pk):
+            return super(BaseManager, self).get(*args, **kwargs)
+        instance = get_row(self.model._meta.db_table, pk)
+        if instance is None:
+            instance = super(BaseManager, self).get(pk=pk)
+            set_row(self.model._meta.db_table, instance)
+        return instance
+
+    def get_many(self, pks):
+        pks = list(set(pks))
+        if not self._is_cacheable():
+            return self.in_bulk(pks)
+        instances = get_rows(self.model._meta.db_table, pks)
+        missing = [pk for pk in pks if pk not in instances]
+        if missing:
+            fetched = self.in_bulk(missing)
+            set_rows(self.model._meta.db_table, fetched.values())
+            instances.update(fetched)
+        return instances
 
 
 class Base(models.Model):
@@ -40,6 +82,12 @@ class Base(models.Model):
 post_save.connect(update_cache, sender=Base)
 
 
+class SearchDocument(models.Model):
+    search_base = models.OneToOneField(Base, related_name='search_document', primary_key=True,
+                                       on_delete=models.CASCADE, help_text='Integer')
+    search_vector = SearchVectorField(null=True)
+
+
 class HashtagParent(Base):
     title = models.CharField(db_index=True, unique=True, max_length=50, help_text='String(50)')
     usage = models.BigIntegerField(db_index=True, default=0)
@@ -51,6 +99,8 @@ class HashtagParent(Base):
 post_save.connect(update_cache, sender=HashtagParent)
 # Set Child Name
 pre_save.connect(set_child_name, sender=HashtagParent)
+# Update Autocomplete Index
+post_save.connect(update_autocomplete, sender=HashtagParent)
 
 
 class Hashtag(Base):
@@ -67,6 +117,8 @@ class Hashtag(Base):
 post_save.connect(update_cache, sender=Hashtag)
 # Set Child Name
 pre_save.connect(set_child_name, sender=Hashtag)
+# Score Profile Strength
+post_save.connect(update_profile_strength, sender=Hashtag)
 
 
 class HashtagRelation(Base):
@@ -140,6 +192,7 @@ class Post(Base):
     post_link = models.CharField(max_length=255, null=True, blank=True, db_index=True)
 
     objects = BaseManager()
+    search_fields = (('post_title', 'A'), ('post_description', 'B'))
 
     def __str__(self):
         return str(self.pk) + ': ' + self.post_title + ' (' + self.post_identity.name + ')'
@@ -153,6 +206,12 @@ class Post(Base):
 post_save.connect(update_cache, sender=Post)
 # Set Child Name
 pre_save.connect(set_child_name, sender=Post)
+# Update Search Index
+post_save.connect(update_search_document, sender=Post)
+# Fan Out To Feeds
+post_save.connect(update_feeds, sender=Post)
+# Score Profile Strength
+post_save.connect(update_profile_strength, sender=Post)
 
 
 class BaseCertificate(Base):
@@ -362,6 +421,39 @@ class Favorite(Base):
     )
 
 
+class OutboundMessage(models.Model):
+    """
+        Email or sms waiting for the send_notifications worker, kept with its delivery status
+    """
+    CHANNEL_CHOICES = (
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    )
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('limited', 'Rate Limited'),
+    )
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, db_index=True)
+    recipient = models.CharField(max_length=254, db_index=True)
+    subject = models.CharField(max_length=255, blank=True, default='')
+    body = models.TextField(blank=True, default='')
+    # json of the channel specific fields, html body and sender of emails, template of sms
+    payload = models.TextField(blank=True, default='{}')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', db_index=True)
+    attempts = models.IntegerField(default=0)
+    # earliest next send, the lease end while sending
+    next_attempt = models.DateTimeField(default=now, db_index=True)
+    last_error = models.TextField(blank=True, default='')
+    created_time = models.DateTimeField(default=now, db_index=True)
+    sent_time = models.DateTimeField(blank=True, null=True, default=None)
+
+    class Meta:
+        index_together = [('status', 'next_attempt'), ('recipient', 'created_time')]
+
+
 class FavoriteBase(Base):
     favorite_base_related_parent = models.ForeignKey(
         Base, related_name='favorite_base_parent', db_index=True,
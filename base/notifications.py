@@ -0,0 +1,247 @@
+import json
+import logging
+import smtplib
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+LIMITED = 'limited'
+
+
+class TransportError(Exception):
+    """
+        retry is False when sending the message again can not succeed
+    """
+    def __init__(self, message, retry=True):
+        super(TransportError, self).__init__(message)
+        self.retry = retry
+
+
+class EmailTransport(object):
+    """
+        Sends the whole batch over one connection of EMAIL_BACKEND
+    """
+    def __init__(self):
+        self.connection = None
+
+    def open(self):
+        self.connection = get_connection(fail_silently=False)
+        try:
+            self.connection.open()
+        except (smtplib.SMTPException, OSError) as e:
+            raise TransportError('connection failed: %s' % e)
+
+    def send(self, message):
+        payload = json.loads(message.payload or '{}')
+        email = EmailMultiAlternatives(message.subject, message.body, payload.get('from_email'),
+                                       [message.recipient], connection=self.connection)
+        if payload.get('html_body'):
+            email.attach_alternative(payload['html_body'], 'text/html')
+        try:
+            email.send()
+        except smtplib.SMTPRecipientsRefused as e:
+            raise TransportError('recipient refused: %s' % e, retry=False)
+        except (smtplib.SMTPException, OSError) as e:
+            raise TransportError(str(e))
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.connection = None
+
+
+class RestfulSmsTransport(object):
+    """
+        Template sms of RestfulSms, one token serves the whole batch
+    """
+    def __init__(self):
+        self.token = None
+
+    def open(self):
+        if not settings.SMS_API_KEY or not settings.SMS_SECRET_KEY:
+            raise TransportError('SMS_API_KEY and SMS_SECRET_KEY are not configured')
+        data = {
+            'UserApiKey': settings.SMS_API_KEY,
+            'SecretKey': settings.SMS_SECRET_KEY,
+        }
+        try:
+            response = requests.post(settings.SMS_TOKEN_URL, data=data, timeout=settings.SMS_TIMEOUT).json()
+        except (requests.RequestException, ValueError) as e:
+            raise TransportError('token request failed: %s' % e)
+        if not response.get('IsSuccessful'):
+            raise TransportError('token refused: %s' % response.get('Message'))
+        self.token = response['TokenKey']
+
+    def send(self, message):
+        payload = json.loads(message.payload or '{}')
+        sms_body = {
+            'ParameterArray': [
+                {'Parameter': name, 'ParameterValue': value} for name, value in payload.get('parameters', [])
+            ],
+            'Mobile': message.recipient,
+            'TemplateId': payload.get('template_id'),
+        }
+        headers = {
+            'Content-Type': 'application/json',
+            'x-sms-ir-secure-token': self.token,
+        }
+        try:
+            response = requests.post(settings.SMS_SEND_URL, headers=headers, data=json.dumps(sms_body),
+                                     timeout=settings.SMS_TIMEOUT).json()
+        except (requests.RequestException, ValueError) as e:
+            raise TransportError('send request failed: %s' % e)
+        if not response.get('IsSuccessful'):
+            raise TransportError('send refused: %s' % response.get('Message'))
+
+    def close(self):
+        self.token = None
+
+
+class FakeTransport(object):
+    """
+        Keeps the sent messages in outbox instead of sending them, for tests. Set fail to a
+        TransportError to make every send raise it.
+    """
+    outbox = []
+    fail = None
+
+    def open(self):
+        pass
+
+    def send(self, message):
+        if self.fail is not None:
+            raise self.fail
+        FakeTransport.outbox.append(message)
+
+    def close(self):
+        pass
+
+
+def get_transport(channel):
+    return import_string(settings.NOTIFICATION_TRANSPORTS[channel])()
+
+
+def is_rate_limited(channel, recipient):
+    from .models import OutboundMessage
+    limit, window = settings.NOTIFICATION_RATE_LIMITS.get(channel, (None, None))
+    if not limit:
+        return False
+    return OutboundMessage.objects.filter(
+        channel=channel, recipient=recipient, created_time__gte=now() - timedelta(seconds=window)
+    ).exclude(status=LIMITED).count() >= limit
+
+
+def enqueue(channel, recipient, subject='', body='', **payload):
+    """
+        Queues a message for the send_notifications worker. Messages over the rate limit of the
+        recipient are stored as limited and never sent.
+    """
+    from .models import OutboundMessage
+    message = OutboundMessage(channel=channel, recipient=recipient, subject=subject, body=body,
+                              payload=json.dumps(payload))
+    with transaction.atomic():
+        # parallel requests for one recipient count and insert one after the other, held until commit
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', ['notification:%s:%s' % (channel, recipient)])
+        if is_rate_limited(channel, recipient):
+            message.status = LIMITED
+            logger.warning('%s to %s rate limited', channel, recipient)
+        message.save()
+    return message
+
+
+def queue_email(recipient, subject, body, html_body=None, from_email=None):
+    return enqueue('email', recipient, subject, body, html_body=html_body,
+                   from_email=from_email or settings.EMAIL_FROM or settings.EMAIL_HOST_USER)
+
+
+def queue_sms(mobile, template_id, parameters):
+    # parameters are (name, value) pairs of the template
+    return enqueue('sms', mobile, template_id=template_id, parameters=[list(pair) for pair in parameters])
+
+
+def claim(channel, batch_size):
+    """
+        Marks up to batch_size due messages as sending for the lease time and returns their ids,
+        parallel workers skip each other's rows. Messages of a worker that died are due again
+        once the lease ends.
+    """
+    from .models import OutboundMessage
+    table = OutboundMessage._meta.db_table
+    current = now()
+    # a message that kept killing its worker is not sent again
+    OutboundMessage.objects.filter(
+        channel=channel, status=SENDING, next_attempt__lte=current, attempts__gte=settings.NOTIFICATION_MAX_ATTEMPTS
+    ).update(status=FAILED, last_error='worker stopped while sending')
+    sql = (
+        'UPDATE {table} SET status = %s, next_attempt = %s, attempts = attempts + 1 WHERE id IN ('
+        'SELECT id FROM {table} WHERE channel = %s AND status IN (%s, %s) AND next_attempt <= %s '
+        'ORDER BY next_attempt LIMIT %s FOR UPDATE SKIP LOCKED'
+        ') RETURNING id'
+    ).format(table=table)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [SENDING, current + timedelta(seconds=settings.NOTIFICATION_LEASE),
+                             channel, QUEUED, SENDING, current, batch_size])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_retry_delay(attempts):
+    return min(settings.NOTIFICATION_RETRY_DELAY * 2 ** (attempts - 1), settings.NOTIFICATION_MAX_RETRY_DELAY)
+
+
+def record_failure(message, error, retry=True):
+    from .models import OutboundMessage
+    if retry and message.attempts < settings.NOTIFICATION_MAX_ATTEMPTS:
+        values = {'status': QUEUED, 'next_attempt': now() + timedelta(seconds=get_retry_delay(message.attempts))}
+    else:
+        values = {'status': FAILED}
+    OutboundMessage.objects.filter(pk=message.pk).update(last_error=str(error), **values)
+    logger.warning('%s %s to %s failed (attempt %s): %s', message.channel, message.pk, message.recipient,
+                   message.attempts, error)
+
+
+def send_batch(channel, batch_size=None):
+    """
+        Sends the due messages of channel over one transport session, returns (sent, failed)
+    """
+    from .models import OutboundMessage
+    ids = claim(channel, batch_size or settings.NOTIFICATION_BATCH_SIZE)
+    if not ids:
+        return 0, 0
+    messages = list(OutboundMessage.objects.filter(pk__in=ids).order_by('next_attempt', 'id'))
+    transport = get_transport(channel)
+    try:
+        transport.open()
+    except TransportError as e:
+        for message in messages:
+            record_failure(message, e, e.retry)
+        return 0, len(messages)
+    sent = []
+    failed = 0
+    try:
+        for message in messages:
+            try:
+                transport.send(message)
+            except TransportError as e:
+                failed += 1
+                record_failure(message, e, e.retry)
+            else:
+                sent.append(message.pk)
+    finally:
+        transport.close()
+        OutboundMessage.objects.filter(pk__in=sent).update(status=SENT, sent_time=now(), last_error='')
+    return len(sent), failed
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+TRUE_VALUES = ('1', 'true', 'True')
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+        limit/offset pages as before, keyset pages when the client sends cursor (empty for the first page).
+        Keyset pages are ordered by the view keyset_ordering ('-id' by default), ids only grow so a cursor
+        stays valid while new rows are inserted. count=false skips the COUNT(*) in both modes, keyset
+        pages skip it unless count=true. Actions in offset_actions keep the ordering of their queryset
+        and always page by limit/offset.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    keyset_ordering = '-id'
+    # search results are ordered by rank, an id cursor would reorder them
+    offset_actions = ('search',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params and \
+            getattr(view, 'action', None) not in self.offset_actions
+        self.with_count = request.query_params.get(
+            self.count_query_param, 'false' if self.keyset else 'true') in TRUE_VALUES
+        if not self.keyset and self.with_count:
+            return super(KeysetPagination, self).paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.display_page_controls = False
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = 0
+        self.count = queryset.count() if self.with_count else None
+
+        if self.keyset:
+            ordering = getattr(view, 'keyset_ordering', self.keyset_ordering)
+            self.cursor_field = ordering.lstrip('-')
+            queryset = queryset.order_by(ordering)
+            cursor = request.query_params.get(self.cursor_query_param)
+            if cursor:
+                if not cursor.isdigit():
+                    raise NotFound('Invalid cursor')
+                lookup = '__lt' if ordering.startswith('-') else '__gt'
+                queryset = queryset.filter(**{self.cursor_field + lookup: cursor})
+            results = list(queryset[:self.limit + 1])
+        else:
+            self.offset = self.get_offset(request)
+            results = list(queryset[self.offset:self.offset + self.limit + 1])
+        # one extra row tells if there is a next page without counting
+        self.has_next = len(results) > self.limit
+        results = results[:self.limit]
+        self.last_result = results[-1] if results else None
+        return results
+
+    def get_next_link(self):
+        if not self.keyset and self.with_count:
+            return super(KeysetPagination, self).get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.keyset:
+            return replace_query_param(url, self.cursor_query_param, getattr(self.last_result, self.cursor_field))
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_previous_link(self):
+        if self.keyset:
+            # infinite scroll only walks forward
+            return None
+        return super(KeysetPagination, self).get_previous_link()
+
+    def get_paginated_response(self, data):
+        if not self.keyset and self.with_count:
+            return super(KeysetPagination, self).get_paginated_response(data)
+        response = OrderedDict()
+        if self.with_count:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
@@ -1,12 +1,7 @@
-from django.contrib.auth.models import User
 from rest_framework import permissions
-from django.contrib.contenttypes.models import ContentType
 from exchanges.models import Exchange
-from organizations.models import Organization
-from products.models import Product
-from users.models import Identity, Setting
-from organizations.models import Follow
-from .models import Base, BaseRoll, FavoriteBase
+from .access import get_access_context
+from .models import BaseRoll, FavoriteBase
 
 
 class IsAdminUserOrReadOnly(permissions.BasePermission):
@@ -48,71 +43,23 @@ class CanReadContent(permissions.BasePermission):
             content_owner_field = view.owner_field
             user_id = request.GET.get(content_owner_field, None)
             if user_id is not None:
-                try:
-                    user_setting = Setting.objects.get(setting_user_id=user_id)
-                except Setting.DoesNotExist:
+                if int(user_id) == request.user.id:
                     return True
-                content_target_field = view.content_target_field
-                content_target_value = getattr(user_setting, content_target_field)
-                if request.user == user_setting.setting_user:
-                    return True
-                elif content_target_value == "all" or request.user.is_superuser:
-                    return True
-                elif content_target_value == "followers":
-                    try:
-                        follower_identity = Identity.objects.get(identity_user=request.user)
-                    except Identity.DoesNotExist:
-                        return False
-                    try:
-                        followed_identity = Identity.objects.get(identity_user_id=user_id)
-                    except Identity.DoesNotExist:
-                        return False
-                    try:
-                        follow = Follow.objects.get(follow_follower=follower_identity,
-                                                    follow_followed=followed_identity)
-                    except Follow.DoesNotExist:
-                        return False
-                    if follow.follow_accepted:
-                        return True
-                    return False
-                else:
-                    return False
+                context = get_access_context(request)
+                return context.can_read(user_id, view.content_target_field, missing=True)
             return False
         return True
 
     def has_object_permission(self, request, view, obj):
         if request.method == "GET":
-            content_owner_field = view.owner_field
-            try:
-                user = User.objects.get(username=getattr(obj, content_owner_field))
-            except User.DoesNotExist:
+            user_id = getattr(obj, '%s_id' % view.owner_field)
+            if user_id is None:
                 return False
-            try:
-                user_setting = Setting.objects.get(setting_user=user)
-            except Setting.DoesNotExist:
-                user_setting = Setting.objects.create(setting_user=user)
-            content_target_field = view.content_target_field
-            content_target_value = getattr(user_setting, content_target_field)
-            if content_target_value == "all" or request.user.is_superuser or request.user == user_setting.setting_user:
+            if request.user.is_superuser or user_id == request.user.id:
                 return True
-            elif content_target_value == "followers":
-                try:
-                    follower_identity = Identity.objects.get(identity_user=request.user)
-                except Identity.DoesNotExist:
-                    return False
-                try:
-                    followed_identity = Identity.objects.get(identity_user=getattr(obj, content_owner_field))
-                except Identity.DoesNotExist:
-                    return False
-                try:
-                    follow = Follow.objects.get(follow_follower=follower_identity, follow_followed=followed_identity)
-                except Follow.DoesNotExist:
-                    return False
-                if follow.follow_accepted:
-                    return True
-                return False
-            else:
-                return False
+            context = get_access_context(request)
+            context.get_setting(user_id, create=True)
+            return context.can_read(user_id, view.content_target_field)
         return True
 
 
@@ -121,29 +68,14 @@ class CanReadBadge(permissions.BasePermission):
         if request.method == "GET":
             badge_related_parent_id = request.GET.get('badge_related_parent', None)
             if badge_related_parent_id is not None:
-                try:
-                    base_object = Base.objects.get(id=badge_related_parent_id)
-                except Base.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(badge_related_parent_id)
+                if owner_name is None:
                     return False
-                owner_name = base_object.child_name
                 if owner_name == 'identity':
-                    identity = Identity.objects.get(id=base_object.id)
-                    if identity.identity_user is not None:
-                        try:
-                            user_setting = Setting.objects.get(setting_user=identity.identity_user)
-                        except Setting.DoesNotExist:
-                            return False
-                        if user_setting.who_can_read_badges == 'all' or request.user.is_superuser:
-                            return True
-                        elif user_setting.who_can_read_badges == 'followers':
-                            follower_identity = Identity.objects.get(identity_user=request.user)
-                            try:
-                                follow = Follow.objects.get(follow_follower=follower_identity, follow_followed=identity, follow_accepted=True)
-                            except Follow.DoesNotExist:
-                                return False
-                            return True
-                        else:
-                            return False
+                    user_id = context.get_identity_user_id(badge_related_parent_id)
+                    if user_id is not None:
+                        return context.can_read(user_id, 'who_can_read_badges')
                     return True
                 return True
             return False
@@ -151,30 +83,12 @@ class CanReadBadge(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         if request.method == "GET":
-            owner_object = ContentType.objects.get(model=obj.badge_related_parent.child_name).__str__()
-            child_object = getattr(obj.badge_related_parent, owner_object)
-            if owner_object == 'identity':
-                if child_object.identity_user is not None:
-                    try:
-                        user_setting = Setting.objects.get(setting_user=child_object.identity_user)
-                    except Setting.DoesNotExist:
-                        return False
-                    if user_setting.who_can_read_badges == 'all' or request.user.is_superuser:
-                        return True
-                    elif user_setting.who_can_read_badges == 'followers':
-                        try:
-                            follower_identity = Identity.objects.get(identity_user=request.user)
-                        except Identity.DoesNotExist:
-                            return False
-                        try:
-                            follow = Follow.objects.get(follow_follower=follower_identity, follow_followed=child_object)
-                        except Follow.DoesNotExist:
-                            return False
-                        if follow.follow_accepted:
-                            return True
-                        return False
-                    else:
-                        return False
+            context = get_access_context(request)
+            owner_name, owner_id = context.get_owner(obj.badge_related_parent_id)
+            if owner_name == 'identity':
+                user_id = context.get_identity_user_id(obj.badge_related_parent_id)
+                if user_id is not None:
+                    return context.can_read(user_id, 'who_can_read_badges')
                 else:
                     return True
             return True
@@ -186,60 +100,20 @@ class IsRollOwnerOrReadOnly(permissions.BasePermission):
         if request.method == 'POST':
             base_id = request.POST.get('roll_owner', None)
             if base_id is not None:
-                try:
-                    base_obj = Base.objects.get(pk=base_id)
-                except Base.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(base_id)
+                if owner_name is None:
                     return False
-                owner_object = base_obj.child_name
-                if request.user.is_superuser:
+                if request.user.is_superuser or context.is_owner(base_id):
                     return True
-                elif owner_object == 'organization':
-                    organization = Organization.objects.get(id=base_obj.id)
-                    if organization.owner == request.user:
-                        return True
-                elif owner_object == 'exchange':
-                    exchange = Exchange.objects.get(id=base_obj.id)
-                    if exchange.owner.identity_user is not None:
-                        if exchange.owner.identity_user == request.user:
-                            return True
-                    else:
-                        if exchange.owner.identity_organization.owner == request.user:
-                            return True
-                elif owner_object == 'product':
-                    product = Product.objects.get(id=base_obj.id)
-                    if product.product_user == request.user:
-                        return True
-                elif owner_object == 'identity':
-                    identity = Identity.objects.get(id=base_obj.id)
-                    if identity.identity_user is not None:
-                        if identity.identity_user == request.user:
-                            return True
-                    elif identity.identity_organization.owner == request.user:
-                        return True
             return False
         return True
 
     def has_object_permission(self, request, view, obj):
-
-        owner_object = ContentType.objects.get(model=obj.roll_owner.child_name).__str__()
-        child_object = getattr(obj.roll_owner, owner_object)
-
         if request.user.is_superuser:
             return True
-        elif owner_object == 'organization':
-            if child_object.owner == request.user:
-                return True
-        elif owner_object == 'exchange':
-            if child_object.owner.identity_user is not None:
-                if child_object.owner.identity_user == request.user:
-                    return True
-            else:
-                if child_object.owner.identity_organization.owner == request.user:
-                    return True
-        elif owner_object == 'product':
-            if child_object.product_user == request.user:
-                return True
-        return False
+        context = get_access_context(request)
+        return context.is_owner(obj.roll_owner_id, ('organization', 'exchange', 'product'))
 
 
 class IsRollPermissionOwnerOrReadOnly(permissions.BasePermission):
@@ -248,62 +122,20 @@ class IsRollPermissionOwnerOrReadOnly(permissions.BasePermission):
             related_roll_id = request.POST.get('roll_permission_related_roll', None)
             base_id = BaseRoll.objects.get(pk=related_roll_id).roll_owner_id
             if base_id is not None:
-                try:
-                    base_obj = Base.objects.get(pk=base_id)
-                except Base.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(base_id)
+                if owner_name is None:
                     return False
-                owner_object = base_obj.child_name
-                if request.user.is_superuser:
+                if request.user.is_superuser or context.is_owner(base_id):
                     return True
-                elif owner_object == 'organization':
-                    organization = Organization.objects.get(id=base_obj.id)
-                    if organization.owner == request.user:
-                        return True
-                elif owner_object == 'exchange':
-                    exchange = Exchange.objects.get(id=base_obj.id)
-                    if exchange.owner.identity_user is not None:
-                        if exchange.owner.identity_user == request.user:
-                            return True
-                    else:
-                        if exchange.owner.identity_organization.owner == request.user:
-                            return True
-                elif owner_object == 'product':
-                    product = Product.objects.get(id=base_obj.id)
-                    if product.product_user == request.user:
-                        return True
-                elif owner_object == 'identity':
-                    identity = Identity.objects.get(id=base_obj.id)
-                    if identity.identity_user is not None:
-                        if identity.identity_user == request.user:
-                            return True
-                    elif identity.identity_organization.owner == request.user:
-                        return True
             return False
         return True
 
     def has_object_permission(self, request, view, obj):
-
-        owner_object = ContentType.objects.get(model=obj.roll_permission_related_roll.roll_owner.child_name).__str__()
-        child_object = getattr(obj.roll_permission_related_roll.roll_owner, owner_object)
-
         if request.user.is_superuser:
             return True
-        elif owner_object == 'organization':
-            if child_object.owner == request.user:
-                return True
-
-        elif owner_object == 'exchange':
-            if child_object.owner.identity_user is not None:
-                if child_object.owner.identity_user == request.user:
-                    return True
-            else:
-                if child_object.owner.identity_organization.owner == request.user:
-                    return True
-        elif owner_object == 'product':
-            if child_object.product_user == request.user:
-                return True
-
-        return False
+        context = get_access_context(request)
+        return context.is_owner(obj.roll_permission_related_roll.roll_owner_id, ('organization', 'exchange', 'product'))
 
 
 class IfExchangeIsAcceptedOrNotAccess(permissions.BasePermission):
@@ -332,9 +164,8 @@ class IfExchangeIsAcceptedOrNotAccess(permissions.BasePermission):
 
 class IsAcceptedOrNotAccess(permissions.BasePermission):
     def has_permission(self, request, view):
-        try:
-            identity = Identity.objects.get(identity_user=request.user)
-        except Identity.DoesNotExist:
+        identity = get_access_context(request).identity
+        if identity is None:
             return False
         if not identity.accepted:
             return False
@@ -353,105 +184,33 @@ class IsHashtagOwnerOrReadOnly(permissions.BasePermission):
         if request.method == 'POST':
             base_id = request.POST.get('hashtag_base', None)
             if base_id is not None:
-                try:
-                    base_obj = Base.objects.get(pk=base_id)
-                except Base.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(base_id)
+                if owner_name is None:
                     return False
-                owner_object = base_obj.child_name
-                if request.user.is_superuser:
+                if request.user.is_superuser or owner_name not in ['organization', 'exchange', 'product', 'identity']:
                     return True
-                elif owner_object == 'organization':
-                    organization = Organization.objects.get(id=base_obj.id)
-                    if organization.owner == request.user:
-                        return True
-                elif owner_object == 'exchange':
-                    exchange = Exchange.objects.get(id=base_obj.id)
-                    if exchange.owner.identity_user is not None:
-                        if exchange.owner.identity_user == request.user:
-                            return True
-                    else:
-                        if exchange.owner.identity_organization.owner == request.user:
-                            return True
-                elif owner_object == 'product':
-                    product = Product.objects.get(id=base_obj.id)
-                    if product.product_user == request.user:
-                        return True
-                elif owner_object == 'identity':
-                    identity = Identity.objects.get(id=base_obj.id)
-                    if identity.identity_user is not None:
-                        if identity.identity_user == request.user:
-                            return True
-                    elif identity.identity_organization.owner == request.user:
-                        return True
-                else:
+                elif context.is_owner(base_id):
                     return True
             return False
         return True
 
     def has_object_permission(self, request, view, obj):
-        owner_object = ContentType.objects.get(model=obj.hashtag_base.child_name).__str__()
-        child_object = getattr(obj.hashtag_base, owner_object)
         if request.user.is_superuser:
             return True
-        elif owner_object == 'organization':
-            if child_object.owner == request.user:
-                return True
-        elif owner_object == 'exchange':
-            if child_object.owner.identity_user is not None:
-                if child_object.owner.identity_user == request.user:
-                    return True
-            else:
-                if child_object.owner.identity_organization.owner == request.user:
-                    return True
-        elif owner_object == 'product':
-            if child_object.product_user == request.user:
-                return True
-        elif owner_object == 'identity':
-            if child_object.identity_user is not None:
-                if child_object.identity_user == request.user:
-                    return True
-            else:
-                if child_object.identity_organization.owner == request.user:
-                    return True
-        return False
+        return get_access_context(request).is_owner(obj.hashtag_base_id)
 
 
 class IsCommentOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        owner_object = ContentType.objects.get(model=obj.comment_parent.child_name).__str__()
-        child_object = getattr(obj.comment_parent, owner_object)
-        owner_identity = Identity.objects.get(pk=obj.comment_sender)
+        context = get_access_context(request)
         # check sender access
-        if owner_identity.identity_user is not None:
-            if owner_identity.identity_user == request.user:
-                return True
-        elif owner_identity.identity_organization is not None:
-            if owner_identity.identity_organization.owner == request.user:
-                return True
+        if context.is_owner(obj.comment_sender_id, ('identity',)):
+            return True
         # check parent access
         if request.user.is_superuser:
             return True
-        elif owner_object == 'organization':
-            if child_object.owner == request.user:
-                return True
-        elif owner_object == 'exchange':
-            if child_object.owner.identity_user is not None:
-                if child_object.owner.identity_user == request.user:
-                    return True
-            else:
-                if child_object.owner.identity_organization.owner == request.user:
-                    return True
-        elif owner_object == 'product':
-            if child_object.product_user == request.user:
-                return True
-        elif owner_object == 'identity':
-            if child_object.identity_user is not None:
-                if child_object.identity_user == request.user:
-                    return True
-            else:
-                if child_object.identity_organization.owner == request.user:
-                    return True
-        return False
+        return context.is_owner(obj.comment_parent_id)
 
 
 class IsBadgeCategoryOwnerOrReadOnly(permissions.BasePermission):
@@ -459,66 +218,20 @@ class IsBadgeCategoryOwnerOrReadOnly(permissions.BasePermission):
         if request.method != 'GET':
             parent_id = request.POST.get('badge_category_related_parent', None)
             if parent_id is not None:
-                try:
-                    base_object = Base.objects.get(pk=parent_id)
-                except Base.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(parent_id)
+                if owner_name is None:
                     return False
-                owner_object = base_object.child_name
-                if request.user.is_superuser:
+                if request.user.is_superuser or context.is_owner(parent_id):
                     return True
-                elif owner_object == 'organization':
-                    organization = Organization.objects.get(id=base_object.id)
-                    if organization.owner == request.user:
-                        return True
-                elif owner_object == 'exchange':
-                    exchange = Exchange.objects.get(id=base_object.id)
-                    if exchange.owner.identity_user is not None:
-                        if exchange.owner.identity_user == request.user:
-                            return True
-                    else:
-                        if exchange.owner.identity_organization.owner == request.user:
-                            return True
-                elif owner_object == 'product':
-                    product = Product.objects.get(id=base_object.id)
-                    if product.product_user == request.user:
-                        return True
-                elif owner_object == 'identity':
-                    identity = Identity.objects.get(id=base_object.id)
-                    if identity.identity_user is not None:
-                        if identity.identity_user == request.user:
-                            return True
-                    elif identity.identity_organization.owner == request.user:
-                        return True
             return False
         return True
 
     def has_object_permission(self, request, view, obj):
         if request.method != "GET":
-            owner_object = ContentType.objects.get(model=obj.badge_category_related_parent.child_name).__str__()
-            child_object = getattr(obj.badge_category_related_parent, owner_object)
             if request.user.is_superuser:
                 return True
-            elif owner_object == 'organization':
-                if child_object.owner == request.user:
-                    return True
-            elif owner_object == 'exchange':
-                if child_object.owner.identity_user is not None:
-                    if child_object.owner.identity_user == request.user:
-                        return True
-                else:
-                    if child_object.owner.identity_organization.owner == request.user:
-                        return True
-            elif owner_object == 'product':
-                if child_object.product_user == request.user:
-                    return True
-            elif owner_object == 'identity':
-                if child_object.identity_user is not None:
-                    if child_object.identity_user == request.user:
-                        return True
-                else:
-                    if child_object.identity_organization.owner == request.user:
-                        return True
-            return False
+            return get_access_context(request).is_owner(obj.badge_category_related_parent_id)
         return True
 
 
@@ -530,36 +243,12 @@ class BadgePermission(permissions.BasePermission):
                 if badge_active is not False:
                     badge_related_parent_id = request.POST.get('badge_related_parent', None)
                     if badge_related_parent_id is not None:
-                        try:
-                            base_object = Base.objects.get(pk=badge_related_parent_id)
-                        except Base.DoesNotExist:
+                        context = get_access_context(request)
+                        owner_name, owner_id = context.get_owner(badge_related_parent_id)
+                        if owner_name is None:
                             return False
-                        owner_object = base_object.child_name
-                        if request.user.is_superuser:
+                        if request.user.is_superuser or context.is_owner(badge_related_parent_id):
                             return True
-                        elif owner_object == 'organization':
-                            organization = Organization.objects.get(id=base_object.id)
-                            if organization.owner == request.user:
-                                return True
-                        elif owner_object == 'exchange':
-                            exchange = Exchange.objects.get(id=base_object.id)
-                            if exchange.owner.identity_user is not None:
-                                if exchange.owner.identity_user == request.user:
-                                    return True
-                            else:
-                                if exchange.owner.identity_organization.owner == request.user:
-                                    return True
-                        elif owner_object == 'product':
-                            product = Product.objects.get(id=base_object.id)
-                            if product.product_user == request.user:
-                                return True
-                        elif owner_object == 'identity':
-                            identity = Identity.objects.get(id=base_object.id)
-                            if identity.identity_user is not None:
-                                if identity.identity_user == request.user:
-                                    return True
-                            elif identity.identity_organization.owner == request.user:
-                                return True
                         return False
                     return False
             return True
@@ -567,31 +256,9 @@ class BadgePermission(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         if request.method != "GET":
-            owner_object = ContentType.objects.get(model=obj.badge_related_parent.child_name).__str__()
-            child_object = getattr(obj.badge_related_parent, owner_object)
             if request.user.is_superuser:
                 return True
-            elif owner_object == 'organization':
-                if child_object.owner == request.user:
-                    return True
-            elif owner_object == 'exchange':
-                if child_object.owner.identity_user is not None:
-                    if child_object.owner.identity_user == request.user:
-                        return True
-                else:
-                    if child_object.owner.identity_organization.owner == request.user:
-                        return True
-            elif owner_object == 'product':
-                if child_object.product_user == request.user:
-                    return True
-            elif owner_object == 'identity':
-                if child_object.identity_user is not None:
-                    if child_object.identity_user == request.user:
-                        return True
-                else:
-                    if child_object.identity_organization.owner == request.user:
-                        return True
-            return False
+            return get_access_context(request).is_owner(obj.badge_related_parent_id)
         return True
 
 
@@ -602,40 +269,15 @@ class FavoriteBasePermission(permissions.BasePermission):
         if request.method != "GET":
             favorite_base_related_parent_id = request.POST.get('favorite_base_related_parent', None)
             if favorite_base_related_parent_id is not None:
-                try:
-                    base_object = Base.objects.get(pk=favorite_base_related_parent_id)
-                except Base.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(favorite_base_related_parent_id)
+                if owner_name is None:
                     return False
-                owner_object = base_object.child_name
-                if owner_object == 'organization':
-                    print('this is organizations type')
-                    organization = Organization.objects.get(id=base_object.id)
-                    if organization.owner != request.user:
-                        return False
-                elif owner_object == 'exchange':
-                    print('this is exchanges type')
-                    exchange = Exchange.objects.get(id=base_object.id)
-                    if exchange.owner.identity_user is not None:
-                        if exchange.owner.identity_user != request.user:
-                            return False
-                    else:
-                        if exchange.owner.identity_organization.owner != request.user:
-                            return False
-                elif owner_object == 'product':
-                    print('this is products type')
-                    product = Product.objects.get(id=base_object.id)
-                    if product.product_user != request.user:
-                        return False
-                elif owner_object == 'identity':
-                    print('this is identities type')
-                    identity = Identity.objects.get(id=base_object.id)
-                    if identity.identity_user is not None:
-                        if identity.identity_user != request.user:
-                            return False
-                    elif identity.identity_organization.owner != request.user:
+                if owner_name in ['organization', 'exchange', 'product', 'identity']:
+                    if not context.is_owner(favorite_base_related_parent_id):
                         return False
                 # check 5 permission
-                return self.check_five_favorite(base_object, request)
+                return self.check_five_favorite(favorite_base_related_parent_id, request)
             return False
         return True
 
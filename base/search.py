@@ -0,0 +1,87 @@
+import re
+
+from django.apps import apps
+from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Value, TextField
+
+from .models import SearchDocument
+
+# postgres ships no persian dictionary, index the normalized words as they are
+SEARCH_CONFIG = 'simple'
+
+PERSIAN_CHARACTERS = {
+    ord('ي'): 'ی',  # arabic yeh
+    ord('ى'): 'ی',  # alef maksura
+    ord('ك'): 'ک',  # arabic kaf
+    ord('ة'): 'ه',  # teh marbuta
+    ord('ؤ'): 'و',  # waw with hamza
+    ord('أ'): 'ا',  # alef with hamza above
+    ord('إ'): 'ا',  # alef with hamza below
+    ord('‌'): ' ',  # zero width non joiner
+    ord('ـ'): None,  # tatweel
+}
+PERSIAN_CHARACTERS.update({ord(digit): str(index) for index, digit in enumerate('۰۱۲۳۴۵۶۷۸۹')})
+PERSIAN_CHARACTERS.update({ord(digit): str(index) for index, digit in enumerate('٠١٢٣٤٥٦٧٨٩')})
+DIACRITICS = re.compile('[ً-ْٰ]')
+SPACES = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    if not text:
+        return ''
+    text = DIACRITICS.sub('', str(text).translate(PERSIAN_CHARACTERS))
+    return SPACES.sub(' ', text).strip().lower()
+
+
+def get_searchable_models():
+    return [model for model in apps.get_models() if getattr(model, 'search_fields', None)]
+
+
+def get_field_text(instance, path):
+    value = instance
+    for name in path.split('.'):
+        value = getattr(value, name, None)
+        if value is None:
+            return ''
+    return normalize_text(value)
+
+
+def build_search_vector(instance):
+    vector = None
+    for path, weight in type(instance).search_fields:
+        text = get_field_text(instance, path)
+        if text:
+            part = SearchVector(Value(text, output_field=TextField()), config=SEARCH_CONFIG, weight=weight)
+            vector = part if vector is None else vector + part
+    return vector
+
+
+def index_instance(instance, using=None):
+    documents = SearchDocument.objects.using(using)
+    if instance.delete_flag:
+        documents.filter(pk=instance.pk).delete()
+        return
+    vector = build_search_vector(instance)
+    if vector is None:
+        documents.filter(pk=instance.pk).delete()
+    elif not documents.filter(pk=instance.pk).update(search_vector=vector):
+        documents.create(search_base_id=instance.pk, search_vector=vector)
+
+
+def search_queryset(queryset, text, prefix=''):
+    """
+        Filters queryset to the rows matching text, best ranked first, prefix leads to the indexed model
+    """
+    query = SearchQuery(normalize_text(text), config=SEARCH_CONFIG)
+    vector_field = prefix + 'search_document__search_vector'
+    return queryset.filter(**{vector_field: query}).annotate(
+        search_rank=SearchRank(F(vector_field), query)
+    ).order_by('-search_rank', '-pk')
+
+
+def create_search_index():
+    # django 1.10 has no GinIndex, the index is created by hand
+    table = SearchDocument._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE INDEX IF NOT EXISTS %s_vector_gin ON %s USING gin (search_vector)' % (table, table))
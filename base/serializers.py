@@ -1,10 +1,10 @@
 from django.contrib.auth.models import User
 from rest_framework.exceptions import ValidationError
 from rest_framework.serializers import ModelSerializer
-from django.db.models import Q
-from exchanges.models import Exchange
+from django.db import transaction
 
-from users.models import Identity, Profile, StrengthStates
+from users.models import Identity
+from .instrumentation import serializer_timer
 from .models import (
     Base,
     HashtagParent,
@@ -31,6 +31,10 @@ class BaseSerializer(ModelSerializer):
             'updated_time': {'read_only': True}
         }
 
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super(BaseSerializer, self).to_representation(instance)
+
 
 class HashtagParentSerializer(BaseSerializer):
     class Meta:
@@ -50,6 +54,7 @@ class HashtagSerializer(BaseSerializer):
             'updated_time': {'read_only': True}
         }
 
+    @transaction.atomic
     def create(self, validated_data):
         instance = Hashtag.objects.create(**validated_data)
         if HashtagParent.objects.filter(title=validated_data['title']).count() == 0:
@@ -60,30 +65,9 @@ class HashtagSerializer(BaseSerializer):
             parent_instance.save()
         instance.related_parent = parent_instance
         instance.save()
-        self.check_hashtag_profile_strength()
+        # profile strength follows the post_save signal, see users.strength
         return instance
 
-    def check_hashtag_profile_strength(self):
-        request = self.context.get("request")
-        try:
-            identity = Identity.objects.get(identity_user=request.user)
-        except Identity.DoesNotExist:
-            identity = Identity.objects.create(identity_user=request.user)
-        hashtags = Hashtag.objects.filter(hashtag_base=identity)
-        try:
-            user_strength = StrengthStates.objects.get(strength_user=request.user)
-        except StrengthStates.DoesNotExist:
-            user_strength = StrengthStates.objects.create(strength_user=request.user)
-        if user_strength.hashtags_obtained is False and hashtags.count() == 3:
-            try:
-                profile = Profile.objects.get(profile_user=request.user)
-            except Profile.DoesNotExist:
-                return False
-            profile.profile_strength += 10
-            profile.save()
-            user_strength.hashtags_obtained = True
-            user_strength.save()
-
 
 class HashtagRelationSerializer(BaseSerializer):
     class Meta:
@@ -159,70 +143,16 @@ class PostSerializer(BaseSerializer):
             'post_user': {'read_only': True}
         }
 
+    @transaction.atomic
     def create(self, validated_data):
         request = self.context.get("request")
         if not request.user.is_superuser or 'post_user' not in validated_data:
             validated_data['post_user'] = request.user
         post = Post.objects.create(**validated_data)
         post.save()
-        if post.post_type == 'supply':
-            exchange = Exchange.objects.filter(id=post.post_parent_id)
-            if exchange.count() > 0:
-                exchange = exchange[0]
-                exchange.supply_count = Post.objects.filter(post_parent_id=exchange.id, post_type='supply').count()
-                exchange.save()
-        elif post.post_type == 'demand':
-            exchange = Exchange.objects.filter(id=post.post_parent_id)
-            if exchange.count() > 0:
-                exchange = exchange[0]
-                exchange.demand_count = Post.objects.filter(post_parent_id=exchange.id, post_type='demand').count()
-                exchange.save()
-        elif post.post_type == 'post':
-            exchange = Exchange.objects.filter(id=post.post_parent_id)
-            if exchange.count() > 0:
-                exchange = exchange[0]
-                exchange.post_count = Post.objects.filter(post_parent_id=exchange.id, post_type='post').count()
-                exchange.save()
-        if post.post_type == 'post':
-            self.check_post_profile_strength()
-        else:
-            self.check_demand_supply_profile_strength()
+        # exchange counters and profile strength follow the post_save signal, see exchanges.counters and users.strength
         return post
 
-    def check_post_profile_strength(self):
-        request = self.context.get('request')
-        posts = Post.objects.filter(post_user=request.user, post_type='post')
-        try:
-            user_strength = StrengthStates.objects.get(strength_user=request.user)
-        except StrengthStates.DoesNotExist:
-            user_strength = StrengthStates.objects.create(strength_user=request.user)
-        if user_strength.post_obtained is False and posts.count() == 1:
-            try:
-                profile = Profile.objects.get(profile_user=request.user)
-            except Profile.DoesNotExist:
-                profile = Profile.objects.create(profile_user=request.user)
-            profile.profile_strength += 5
-            profile.save()
-            user_strength.post_obtained = True
-            user_strength.save()
-
-    def check_demand_supply_profile_strength(self):
-        request = self.context.get('request')
-        posts = Post.objects.filter(Q(post_user=request.user), Q(post_type='supply') | Q(post_type='demand'))
-        try:
-            user_strength = StrengthStates.objects.get(strength_user=request.user)
-        except StrengthStates.DoesNotExist:
-            user_strength = StrengthStates.objects.create(strength_user=request.user)
-        if user_strength.supply_demand_obtained is False and posts.count() == 1:
-            try:
-                profile = Profile.objects.get(profile_user=request.user)
-            except Profile.DoesNotExist:
-                profile = Profile.objects.create(profile_user=request.user)
-            profile.profile_strength += 10
-            profile.save()
-            user_strength.supply_demand_obtained = True
-            user_strength.save()
-
     @staticmethod
     def validate_post_description(value):
         if len(value) != 0:
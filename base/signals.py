@@ -1,9 +1,47 @@
-from django.core.cache import cache
-from django.conf import settings
+from django.db import transaction
 
+from .cache import invalidate_instance
 
-def update_cache(sender, instance, **kwargs):
-    cache.set(instance._meta.db_table, sender.objects.filter(delete_flag=False), settings.CACHE_TIMEOUT)
+
+def update_cache(sender, instance, using=None, **kwargs):
+    # sent once on commit, see InvalidationBus
+    invalidate_instance(instance, using)
+
+
+def update_search_document(sender, instance, using=None, **kwargs):
+    from .search import index_instance
+    index_instance(instance, using)
+
+
+def update_autocomplete(sender, instance, using=None, **kwargs):
+    from .autocomplete import autocomplete
+    transaction.on_commit(lambda: autocomplete.update_instance(instance), using=using)
+
+
+def update_feeds(sender, instance, created=False, using=None, **kwargs):
+    if created and not instance.delete_flag:
+        from .feed import fan_out_post
+        transaction.on_commit(lambda: fan_out_post(instance), using=using)
+
+
+def invalidate_feed(identity_id, using=None):
+    from .feed import invalidate_feeds
+    transaction.on_commit(lambda: invalidate_feeds([identity_id]), using=using)
+
+
+def update_follower_feed(sender, instance, using=None, **kwargs):
+    # follows and unfollows change the authors of the follower feed
+    invalidate_feed(instance.follow_follower_id, using)
+
+
+def update_member_feed(sender, instance, using=None, **kwargs):
+    # joins and leaves change the exchanges of the member feed
+    invalidate_feed(instance.exchange_identity_related_identity_id, using)
+
+
+def update_profile_strength(sender, instance, created=False, using=None, **kwargs):
+    from users.strength import evaluate_strength
+    evaluate_strength(instance, created, using)
 
 
 def set_child_name(sender, instance, **kwargs):
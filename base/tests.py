@@ -1,3 +1,191 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from base.feed import read_feed
+from base.instrumentation import collect_stats, QueryBudgetExceeded
+from base.models import OutboundMessage, Post
+from base.notifications import (
+    FakeTransport, TransportError, claim, send_batch, queue_email, queue_sms, QUEUED, SENDING, SENT, FAILED, LIMITED)
+from exchanges.models import Exchange
+from exchanges.views import ExchangeViewSet
+from organizations.models import Follow
+from users.models import Identity
+from users.views import UserViewset
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class CollectStatsTestCase(TestCase):
+    def test_counts_queries(self):
+        with collect_stats() as stats:
+            User.objects.count()
+            User.objects.count()
+        self.assertEqual(stats.query_count, 2)
+        self.assertEqual(len(stats.duplicates()), 1)
+
+    def test_budget_exceeded(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with collect_stats(budget=1):
+                User.objects.count()
+                User.objects.count()
+
+
+@override_settings(CACHES=TEST_CACHES, EXPLORE_CACHE_TIMEOUT=0)
+class ExploreQueryBudgetTestCase(TestCase):
+    """
+        Explore pages stay within the budget of their view whatever the page size
+    """
+    def setUp(self):
+        self.user = User.objects.create_user('viewer', 'viewer@example.com', 'password')
+        self.identity = Identity.objects.get(identity_user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_stats(self, path, budget):
+        cache.clear()
+        with collect_stats(budget=budget) as stats:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return stats
+
+    def test_user_explore(self):
+        for index in range(12):
+            User.objects.create_user('user%s' % index, 'user%s@example.com' % index, 'password')
+        budget = UserViewset.query_budget['explore']
+        small = self.get_stats('/users/explore/?limit=2', budget)
+        large = self.get_stats('/users/explore/?limit=12', budget)
+        self.assertEqual(small.query_count, large.query_count)
+
+    def test_exchange_explore(self):
+        for index in range(12):
+            Exchange.objects.create(name='exchange%s' % index, owner=self.identity)
+        budget = ExchangeViewSet.query_budget['explore']
+        small = self.get_stats('/exchanges/explore/?limit=2', budget)
+        large = self.get_stats('/exchanges/explore/?limit=12', budget)
+        self.assertEqual(small.query_count, large.query_count)
+
+
+@override_settings(
+    NOTIFICATION_TRANSPORTS={'email': 'base.notifications.FakeTransport', 'sms': 'base.notifications.FakeTransport'},
+    NOTIFICATION_RATE_LIMITS={'email': (2, 60 * 60)},
+    NOTIFICATION_MAX_ATTEMPTS=3,
+    NOTIFICATION_RETRY_DELAY=30,
+    NOTIFICATION_MAX_RETRY_DELAY=60 * 60,
+    NOTIFICATION_LEASE=60,
+)
+class NotificationTestCase(TestCase):
+    def setUp(self):
+        FakeTransport.outbox = []
+        FakeTransport.fail = None
+
+    def tearDown(self):
+        FakeTransport.fail = None
+
+    def make_due(self, message):
+        OutboundMessage.objects.filter(pk=message.pk).update(next_attempt=now() - timedelta(seconds=1))
+
+    def test_send_batch(self):
+        first = queue_email('first@example.com', 'subject', 'body', html_body='<p>body</p>')
+        second = queue_sms('09120000000', '5253', [('VerificationCode', '12345')])
+        self.assertEqual(send_batch('email'), (1, 0))
+        self.assertEqual(send_batch('sms'), (1, 0))
+        self.assertEqual([message.pk for message in FakeTransport.outbox], [first.pk, second.pk])
+        first.refresh_from_db()
+        self.assertEqual(first.status, SENT)
+        self.assertEqual(first.attempts, 1)
+        self.assertIsNotNone(first.sent_time)
+        # nothing left to send
+        self.assertEqual(send_batch('email'), (0, 0))
+
+    def test_claim_skips_leased(self):
+        message = queue_email('lease@example.com', 'subject', 'body')
+        self.assertEqual(claim('email', 10), [message.pk])
+        self.assertEqual(claim('email', 10), [])
+        message.refresh_from_db()
+        self.assertEqual(message.status, SENDING)
+        # the lease of a worker that died ends
+        self.make_due(message)
+        self.assertEqual(claim('email', 10), [message.pk])
+
+    def test_retry_with_backoff(self):
+        message = queue_email('retry@example.com', 'subject', 'body')
+        FakeTransport.fail = TransportError('unavailable')
+        self.assertEqual(send_batch('email'), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.last_error), (QUEUED, 1, 'unavailable'))
+        delay = (message.next_attempt - now()).total_seconds()
+        self.assertTrue(25 < delay <= 30)
+        # not due before the delay
+        self.assertEqual(send_batch('email'), (0, 0))
+
+        self.make_due(message)
+        self.assertEqual(send_batch('email'), (0, 1))
+        message.refresh_from_db()
+        delay = (message.next_attempt - now()).total_seconds()
+        self.assertTrue(55 < delay <= 60)
+
+        self.make_due(message)
+        self.assertEqual(send_batch('email'), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (FAILED, 3))
+
+    def test_permanent_failure(self):
+        message = queue_email('refused@example.com', 'subject', 'body')
+        FakeTransport.fail = TransportError('refused', retry=False)
+        send_batch('email')
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (FAILED, 1))
+
+    def test_rate_limit(self):
+        messages = [queue_email('limited@example.com', 'subject', 'body') for index in range(3)]
+        self.assertEqual([message.status for message in messages], [QUEUED, QUEUED, LIMITED])
+        # other recipients and channels have their own limits
+        self.assertEqual(queue_email('other@example.com', 'subject', 'body').status, QUEUED)
+        self.assertEqual(queue_sms('limited@example.com', '5253', []).status, QUEUED)
+        self.assertEqual(send_batch('email'), (3, 0))
+        self.assertNotIn(messages[2].pk, [message.pk for message in FakeTransport.outbox])
+        messages[2].refresh_from_db()
+        self.assertEqual(messages[2].status, LIMITED)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class FeedFanOutTestCase(TransactionTestCase):
+    """
+        New posts are inserted into the cached feeds of their recipients on commit
+    """
+    def setUp(self):
+        cache.clear()
+        self.reader = self.create_identity('reader')
+        self.authors = [self.create_identity('author%s' % index) for index in range(2)]
+        for author in self.authors:
+            Follow.objects.create(follow_follower=self.reader, follow_followed=author, follow_accepted=True)
+
+    def create_identity(self, username):
+        user = User.objects.create_user(username, '%s@example.com' % username, 'password')
+        return Identity.objects.get(identity_user=user)
+
+    def post(self, author):
+        return Post.objects.create(post_user=author.identity_user, post_identity=author, post_description='hello feed')
+
+    def test_posts_committed_together(self):
+        read_feed(self.reader.id)
+        with transaction.atomic():
+            posts = [self.post(author) for author in self.authors]
+        feed, cursor = read_feed(self.reader.id)
+        self.assertEqual([post.pk for post in feed], sorted([post.pk for post in posts], reverse=True))
+
+    def test_warm_read_runs_no_post_list_query(self):
+        read_feed(self.reader.id)
+        post = self.post(self.authors[0])
+        with collect_stats() as stats:
+            feed, cursor = read_feed(self.reader.id)
+        self.assertEqual([item.pk for item in feed], [post.pk])
+        table = Post._meta.db_table
+        self.assertEqual([query['sql'] for query in stats.queries
+                          if table in query['sql'] and 'ORDER BY' in query['sql']], [])
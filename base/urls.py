@@ -16,7 +16,9 @@ from .views import (
         BadgeCategoryViewSet,
         BadgeViewSet,
         CertificateViewSet,
-        FavoriteViewSet, FavoriteBaseViewSet)
+        FavoriteViewSet, FavoriteBaseViewSet,
+        AutocompleteViewSet,
+        RequestStatsViewSet)
 
 
 router = DefaultRouter()
@@ -36,6 +38,8 @@ router.register(r'comments', BaseCommentViewset, 'Comments')
 router.register(r'posts', PostViewSet, 'posts')
 router.register(r'favorites', FavoriteViewSet, 'Favorite')
 router.register(r'favorites-relations', FavoriteBaseViewSet, 'Favorite Relations')
+router.register(r'autocomplete', AutocompleteViewSet, 'Autocomplete')
+router.register(r'request-stats', RequestStatsViewSet, 'Request Stats')
 router.register(r'', BaseViewset, 'Base')
 
 urlpatterns = [
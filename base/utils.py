@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models import Case, When, Value
+
+from .cache import invalidate_instance
+from .models import Base
+
+
+def bulk_create_base(model, objs, batch_size=500):
+    # bulk_create refuses multi-table inheritance, insert the Base rows
+    # first (postgres returns their ids) and then the child rows
+    objs = list(objs)
+    base_fields = [field for field in Base._meta.concrete_fields if not field.primary_key]
+    child_fields = model._meta.local_concrete_fields
+    parent_link = model._meta.get_ancestor_link(Base)
+    with transaction.atomic():
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            parents = []
+            for obj in batch:
+                obj.child_name = model._meta.model_name
+                parents.append(Base(**{field.attname: getattr(obj, field.attname) for field in base_fields}))
+            Base._base_manager.bulk_create(parents)
+            for obj, parent in zip(batch, parents):
+                setattr(obj, Base._meta.pk.attname, parent.pk)
+                setattr(obj, parent_link.attname, parent.pk)
+                obj._state.adding = False
+                obj._state.db = model._base_manager.db
+            model._base_manager._insert(batch, fields=child_fields, using=model._base_manager.db)
+    return objs
+
+
+def bulk_update(model, objs, fields, batch_size=500):
+    # django 1.10 has no bulk_update, set each field with one CASE per batch
+    objs = list(objs)
+    fields = [model._meta.get_field(name) for name in fields]
+    with transaction.atomic():
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            values = {}
+            for field in fields:
+                values[field.attname] = Case(*[
+                    When(pk=obj.pk, then=Value(getattr(obj, field.attname), output_field=field)) for obj in batch
+                ], output_field=field)
+            model._base_manager.filter(pk__in=[obj.pk for obj in batch]).update(**values)
+            # plain manager updates skip BaseQuerySet.update
+            for obj in batch:
+                invalidate_instance(obj)
+    return len(objs)
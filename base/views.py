@@ -1,16 +1,21 @@
 import json
+import time
+from collections import OrderedDict
 
+from django.db import transaction
 from django.db.models import Q
 from django.core import serializers
 from requests.status_codes import title
 from rest_framework import status
 from rest_framework.decorators import list_route, detail_route
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, ViewSet
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.http import HttpResponse, Http404
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 
+from exchanges.counters import get_post_counts
+
 from .permissions import (
     IsRollOwnerOrReadOnly,
     IsRollPermissionOwnerOrReadOnly,
@@ -38,6 +43,13 @@ from .models import (
     BadgeCategory,
     Badge,
     Favorite, FavoriteBase)
+from .access import get_access_context
+from .autocomplete import AUTOCOMPLETE_SOURCES, autocomplete
+from .feed import read_feed
+from .instrumentation import route_histogram
+from .pagination import KeysetPagination
+from .search import normalize_text, search_queryset
+from .utils import bulk_create_base
 
 from .serializers import (
     BaseSerializer,
@@ -99,6 +111,26 @@ class BaseModelViewSet(ModelViewSet):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+class SearchMixin(object):
+    """
+        Adds a ranked full text search route, search_prefix leads from the queryset model to the indexed one
+    """
+    search_prefix = ''
+
+    @list_route(methods=['get'])
+    def search(self, request):
+        text = request.query_params.get('q', '')
+        if not normalize_text(text):
+            return Response({"details": "please send q"}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = search_queryset(self.get_queryset(), text, self.search_prefix)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class BaseViewset(ModelViewSet):
     permission_classes = [IsAdminUserOrReadOnly]
 
@@ -140,85 +172,81 @@ class HashtagParentViewset(BaseModelViewSet):
     @list_route(methods=['post'], permission_classes=[IsAdminUser])
     def import_hashtags(self, request):
         jsonString = request.data.get('records', None)
-        if jsonString is not None:
-            data = json.loads(jsonString)
-            errors = []
-            # Add Hashtags First
-            for record in data:
-                if record.get('title', None) is not None:
-                    hashtag_count = HashtagParent.objects.filter(title=record.get('title', None)).count()
-                    print(record.get('title', None))
-                    if hashtag_count == 0:
-                        print('is zero')
-                        try:
-                            hashtag_object = HashtagParent.objects.create(title=record.get('title', None))
-                        except Exception as e:
-                            errors.append({
-                                'data': record,
-                                'status': str(e)
-                            })
-                    else:
-                        print('is not zero')
-                else:
-                    errors.append({
-                        'data': record,
-                        'status': 'this record have not title'
-                    })
-            # Add Hashtag Relations
-            for record in data:
-                if record.get('title', None) is not None:
-                    try:
-                        hashtag = HashtagParent.objects.get(title=record.get('title', None))
-                    except HashtagParent.DoesNotExist:
-                        errors.append({
-                            'data': record,
-                            'status': 'hashtag not exist for set relation'
-                        })
-                        hashtag = None
-                    if hashtag is not None:
-                        hashtag_parent_id = record.get('parent_id', None)
-                        if hashtag_parent_id is not None and hashtag_parent_id != '':
-                            for parent_record in data:
-                                if parent_record.get('title', None) is not None:
-                                    if parent_record.get('id', None) == hashtag_parent_id:
-                                        try:
-                                            hashtag_parent_object = HashtagParent.objects.get(
-                                                title=parent_record.get('title', None)
-                                            )
-                                        except HashtagParent.DoesNotExist:
-                                            hashtag_parent_object = None
-                                        if hashtag_parent_object is not None:
-                                            hashtag_relation_count = HashtagRelation.objects.filter(
-                                                Q(hashtag_first=hashtag, hashtag_second=hashtag_parent_object) |
-                                                Q(hashtag_first=hashtag_parent_object, hashtag_second=hashtag)).count()
-                                            if hashtag_relation_count == 0:
-                                                try:
-                                                    hashtag_realtion_object = HashtagRelation.objects.create(
-                                                        hashtag_first=hashtag_parent_object,
-                                                        hashtag_second=hashtag
-                                                    )
-                                                except Exception as e:
-                                                    errors.append({
-                                                        'data': record,
-                                                        'status': str(e)
-                                                    })
-                                        else:
-                                            errors.append({
-                                                'data': record,
-                                                'status': 'hashtag parent object not exist'
-                                            })
-                                        break
-                    else:
-                        errors.append({
-                            'data': record,
-                            'status': 'this record have not title'
-                        })
-                else:
-                    errors.append({
-                        'data': record,
-                        'status': 'this record have not title'
-                    })
-        return Response(errors, status=status.HTTP_200_OK)
+        errors = []
+        summary = {'records': 0, 'hashtags_created': 0, 'relations_created': 0}
+        if jsonString is None:
+            return Response({'errors': errors, 'summary': summary}, status=status.HTTP_200_OK)
+        start_time = time.time()
+        data = json.loads(jsonString)
+        summary['records'] = len(data)
+        chunk_size = 1000
+        title_max_length = HashtagParent._meta.get_field('title').max_length
+
+        # Validate and dedupe titles in memory
+        titles = OrderedDict()
+        titles_by_record_id = {}
+        for row, record in enumerate(data):
+            title = record.get('title', None)
+            if title is None or title == '':
+                errors.append({'row': row, 'data': record, 'status': 'this record have not title'})
+            elif len(title) > title_max_length:
+                errors.append({'row': row, 'data': record, 'status': 'title is longer than ' + str(title_max_length) + ' characters'})
+            else:
+                titles[title] = True
+                if record.get('id', None) is not None:
+                    titles_by_record_id[record.get('id')] = title
+        titles = list(titles)
+
+        with transaction.atomic():
+            # Add Hashtags First, soft deleted titles still hold the unique constraint
+            hashtags = {}
+            for chunk_start in range(0, len(titles), chunk_size):
+                for title, hashtag_id, delete_flag in HashtagParent._base_manager.filter(
+                        title__in=titles[chunk_start:chunk_start + chunk_size]).values_list('title', 'id', 'delete_flag'):
+                    hashtags[title] = (hashtag_id, delete_flag)
+            new_hashtags = [HashtagParent(title=title) for title in titles if title not in hashtags]
+            bulk_create_base(HashtagParent, new_hashtags, chunk_size)
+            for hashtag in new_hashtags:
+                hashtags[hashtag.title] = (hashtag.id, False)
+            summary['hashtags_created'] = len(new_hashtags)
+            hashtags_time = time.time()
+
+            # Add Hashtag Relations, parents are looked up by record id
+            pairs = OrderedDict()
+            for row, record in enumerate(data):
+                hashtag_parent_id = record.get('parent_id', None)
+                title = record.get('title', None)
+                if hashtag_parent_id is None or hashtag_parent_id == '' or title not in hashtags:
+                    continue
+                parent_title = titles_by_record_id.get(hashtag_parent_id, None)
+                if parent_title is None:
+                    errors.append({'row': row, 'data': record, 'status': 'hashtag parent object not exist'})
+                    continue
+                hashtag_id, hashtag_deleted = hashtags[title]
+                parent_id, parent_deleted = hashtags[parent_title]
+                if hashtag_deleted or parent_deleted:
+                    errors.append({'row': row, 'data': record, 'status': 'hashtag not exist for set relation'})
+                    continue
+                pairs.setdefault(frozenset((hashtag_id, parent_id)), (parent_id, hashtag_id))
+
+            # Relations are undirected, drop pairs that exist in either direction
+            hashtag_ids = list({hashtag_id for pair in pairs for hashtag_id in pair})
+            for chunk_start in range(0, len(hashtag_ids), chunk_size):
+                for first_id, second_id in HashtagRelation.objects.filter(
+                        hashtag_first_id__in=hashtag_ids[chunk_start:chunk_start + chunk_size]
+                ).values_list('hashtag_first_id', 'hashtag_second_id'):
+                    pairs.pop(frozenset((first_id, second_id)), None)
+            bulk_create_base(HashtagRelation, [
+                HashtagRelation(hashtag_first_id=parent_id, hashtag_second_id=hashtag_id)
+                for parent_id, hashtag_id in pairs.values()
+            ], chunk_size)
+            summary['relations_created'] = len(pairs)
+
+        summary['errors'] = len(errors)
+        summary['hashtags_seconds'] = round(hashtags_time - start_time, 3)
+        summary['relations_seconds'] = round(time.time() - hashtags_time, 3)
+        summary['total_seconds'] = round(time.time() - start_time, 3)
+        return Response({'errors': errors, 'summary': summary}, status=status.HTTP_200_OK)
 
     def destroy(self, request, *args, **kwargs):
         try:
@@ -326,6 +354,7 @@ class HashtagRelationViewset(BaseModelViewSet):
 
 class BaseCommentViewset(BaseModelViewSet):
     permission_classes = [IsAuthenticated, IsCommentOwnerOrReadOnly]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = BaseComment.objects.filter(delete_flag=False)
@@ -359,9 +388,10 @@ class BaseCommentViewset(BaseModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class PostViewSet(BaseModelViewSet):
+class PostViewSet(SearchMixin, BaseModelViewSet):
     parent_field = 'post_parent'
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = Post.objects.filter(delete_flag=False).order_by('-id')
@@ -404,13 +434,31 @@ class PostViewSet(BaseModelViewSet):
 
         return queryset
 
+    @list_route(methods=['get'], permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        identity = get_access_context(request).identity
+        if identity is None:
+            return Response({"details": "identity not found"}, status=status.HTTP_404_NOT_FOUND)
+        cursor = request.query_params.get('cursor', None)
+        if cursor is not None and not cursor.isdigit():
+            return Response({"details": "invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = request.query_params.get('limit', '20')
+        limit = min(int(limit), 100) if limit.isdigit() and int(limit) > 0 else 20
+        posts, next_cursor = read_feed(identity.id, cursor, limit)
+        serializer = PostListSerializer(posts, many=True, context={'request': request})
+        return Response({'next': next_cursor, 'results': serializer.data}, status=status.HTTP_200_OK)
+
     @detail_route(
         permission_classes=[IsAuthenticated],
         methods=['get'],
         url_path='(?P<parent_id>[0-9]+)'
     )
     def count(self, request, pk=None, parent_id=None):
-        post_count = Post.objects.filter(post_parent=parent_id, delete_flag=False).count()
+        counts = get_post_counts(parent_id)
+        if counts is not None:
+            post_count = sum(counts.values())
+        else:
+            post_count = Post.objects.filter(post_parent=parent_id, delete_flag=False).count()
         return Response({'count': post_count}, status=status.HTTP_200_OK)
 
     @detail_route(
@@ -419,7 +467,11 @@ class PostViewSet(BaseModelViewSet):
         url_path='(?P<parent_id>[0-9]+)'
     )
     def count_demand(self, request, pk=None, parent_id=None):
-        post_count = Post.objects.filter(post_parent=parent_id, delete_flag=False, post_type='demand').count()
+        counts = get_post_counts(parent_id)
+        if counts is not None:
+            post_count = counts['demand']
+        else:
+            post_count = Post.objects.filter(post_parent=parent_id, delete_flag=False, post_type='demand').count()
         return Response({'count': post_count}, status=status.HTTP_200_OK)
 
     @detail_route(
@@ -428,11 +480,15 @@ class PostViewSet(BaseModelViewSet):
         url_path='(?P<parent_id>[0-9]+)'
     )
     def count_supply(self, request, pk=None, parent_id=None):
-        post_count = Post.objects.filter(post_parent=parent_id, delete_flag=False, post_type='supply').count()
+        counts = get_post_counts(parent_id)
+        if counts is not None:
+            post_count = counts['supply']
+        else:
+            post_count = Post.objects.filter(post_parent=parent_id, delete_flag=False, post_type='supply').count()
         return Response({'count': post_count}, status=status.HTTP_200_OK)
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ['list', 'search']:
             return PostListSerializer
         return PostSerializer
 
@@ -866,3 +922,37 @@ class FavoriteBaseViewSet(ModelViewSet):
             queryset = queryset.filter(favorite_base_related_favorite=favorite_base_related_favorite)
 
         return queryset
+
+
+class AutocompleteViewSet(ViewSet):
+    """
+        Prefix suggestions of hashtags, identities and categories from the in process index
+    """
+    permission_classes = [IsAuthenticated]
+    # the user lookup and a cold index build
+    query_budget = 3
+
+    def list(self, request):
+        source = request.query_params.get('source', 'hashtags')
+        if source not in AUTOCOMPLETE_SOURCES:
+            return Response({"details": "source must be one of " + ', '.join(sorted(AUTOCOMPLETE_SOURCES))},
+                            status=status.HTTP_400_BAD_REQUEST)
+        limit = request.query_params.get('limit', '10')
+        limit = int(limit) if limit.isdigit() else 10
+        results = autocomplete.query(source, request.query_params.get('q', ''), limit)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+class RequestStatsViewSet(ViewSet):
+    """
+        Latency, query and cache stats per route of the recent requests served by this process
+    """
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        return Response({'results': route_histogram.summary()}, status=status.HTTP_200_OK)
+
+    @list_route(methods=['post'])
+    def reset(self, request):
+        route_histogram.reset()
+        return Response({'message': 'stats reset.'}, status=status.HTTP_200_OK)
@@ -0,0 +1,55 @@
+from urllib.parse import parse_qs
+
+import jwt
+from channels.sessions import channel_session
+from django.contrib.auth.models import User
+from rest_framework_jwt.settings import api_settings
+
+from users.models import Identity
+
+from .push import get_broker
+
+
+def get_identity_id(query_string):
+    """
+        Identity of the JWT sent as ?token=, browsers can not set headers on a WebSocket
+    """
+    if isinstance(query_string, bytes):
+        query_string = query_string.decode()
+    token = parse_qs(query_string or '').get('token', [None])[0]
+    if not token:
+        return None
+    try:
+        payload = api_settings.JWT_DECODE_HANDLER(token)
+    except jwt.InvalidTokenError:
+        return None
+    username = api_settings.JWT_PAYLOAD_GET_USERNAME_HANDLER(payload)
+    user = User.objects.filter(username=username, is_active=True).first()
+    if user is None:
+        return None
+    return Identity.objects.filter(identity_user=user).values_list('id', flat=True).first()
+
+
+@channel_session
+def ws_connect(message):
+    identity_id = get_identity_id(message.content.get('query_string'))
+    if identity_id is None:
+        message.reply_channel.send({'close': True})
+        return
+    message.channel_session['identity_id'] = identity_id
+    get_broker().subscribe(identity_id, message.reply_channel.name)
+    message.reply_channel.send({'accept': True})
+
+
+@channel_session
+def ws_receive(message):
+    # clients only listen, pings keep proxies from closing idle sockets
+    if message.content.get('text') == 'ping':
+        message.reply_channel.send({'text': 'pong'})
+
+
+@channel_session
+def ws_disconnect(message):
+    identity_id = message.channel_session.get('identity_id')
+    if identity_id is not None:
+        get_broker().unsubscribe(identity_id, message.reply_channel.name)
@@ -0,0 +1,109 @@
+from django.db import transaction, IntegrityError
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from .push import push, THREAD_SEEN
+
+
+def get_unread(instance):
+    # the receiver's unread count includes the message while this returns the pair
+    if instance.pk is None or instance.seen or instance.delete_flag:
+        return None
+    if instance.message_sender_id == instance.message_receiver_id:
+        return None
+    return instance.message_sender_id, instance.message_receiver_id
+
+
+def add_unread(owner_id, peer_id, amount, using=None):
+    from .models import Conversation
+    Conversation.objects.using(using).filter(owner_id=owner_id, peer_id=peer_id).update(
+        unread_count=Greatest(F('unread_count') + amount, 0))
+
+
+def touch_conversation(owner_id, peer_id, message, unread=0, using=None):
+    """
+        Moves the conversation of owner with peer to message, messages committed out of order never move it back
+    """
+    from .models import Conversation
+    values = {
+        'last_message_id': Greatest(F('last_message_id'), message.id),
+        'last_activity': Greatest(F('last_activity'), message.send_date),
+        'unread_count': F('unread_count') + unread,
+    }
+    conversations = Conversation.objects.using(using).filter(owner_id=owner_id, peer_id=peer_id)
+    if conversations.update(**values):
+        return
+    try:
+        with transaction.atomic(using=using):
+            Conversation.objects.using(using).create(owner_id=owner_id, peer_id=peer_id, last_message_id=message.id,
+                                                     last_activity=message.send_date, unread_count=unread)
+    except IntegrityError:
+        # created by a parallel message of the pair
+        conversations.update(**values)
+
+
+def remember_unread_message(sender, instance, **kwargs):
+    # deferred loads would cost a query per instance
+    if not instance.get_deferred_fields():
+        instance._unread = get_unread(instance)
+
+
+def load_unread_message(sender, instance, using=None, **kwargs):
+    # a deferred load has no snapshot, read what is stored before it is written or deleted
+    if hasattr(instance, '_unread') or instance.pk is None:
+        return
+    from .models import Message
+    stored = Message._base_manager.using(using).filter(pk=instance.pk).only(
+        'seen', 'delete_flag', 'message_sender', 'message_receiver').first()
+    instance._unread = get_unread(stored) if stored is not None else None
+
+
+def update_conversations(sender, instance, created=False, using=None, **kwargs):
+    current = get_unread(instance)
+    previous = getattr(instance, '_unread', None)
+    instance._unread = current
+    if created:
+        touch_conversation(instance.message_sender_id, instance.message_receiver_id, instance, using=using)
+        if instance.message_sender_id != instance.message_receiver_id:
+            touch_conversation(instance.message_receiver_id, instance.message_sender_id, instance,
+                               1 if current else 0, using)
+        return
+    if previous == current:
+        return
+    if previous is not None:
+        add_unread(previous[1], previous[0], -1, using)
+    if current is not None:
+        add_unread(current[1], current[0], 1, using)
+
+
+def remove_conversation_unread(sender, instance, using=None, **kwargs):
+    previous = getattr(instance, '_unread', None)
+    if previous is not None:
+        add_unread(previous[1], previous[0], -1, using)
+    instance._unread = None
+
+
+def get_thread(identity_id, peer_id):
+    from .models import Message
+    return Message.objects.filter(
+        Q(message_sender_id=identity_id, message_receiver_id=peer_id) |
+        Q(message_sender_id=peer_id, message_receiver_id=identity_id)
+    )
+
+
+def mark_thread_seen(identity_id, peer_id, seen_date):
+    """
+        Marks what peer sent to identity as seen and clears its unread count, returns the messages marked
+    """
+    from .models import Message, Conversation
+    with transaction.atomic():
+        # the conversation row is locked first so a parallel send waits for the reset
+        Conversation.objects.select_for_update().filter(owner_id=identity_id, peer_id=peer_id).first()
+        # deleted messages are not unread, they stay as they were
+        marked = Message.objects.filter(
+            message_sender_id=peer_id, message_receiver_id=identity_id, seen=False
+        ).update(seen=True, seen_date=seen_date)
+        Conversation.objects.filter(owner_id=identity_id, peer_id=peer_id).update(unread_count=0)
+        if marked:
+            push(int(peer_id), THREAD_SEEN, {'reader': int(identity_id), 'seen_date': seen_date.isoformat()})
+    return marked
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+
+from chats.models import Message, Conversation
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the conversation index and unread counts from the messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # owner, peer -> [last_message_id, last_activity, unread_count]
+        conversations = {}
+        pairs = Message._base_manager.values('message_sender', 'message_receiver').annotate(
+            last_message=Max('id'), last_activity=Max('send_date')).order_by()
+        for pair in pairs.iterator():
+            sender, receiver = pair['message_sender'], pair['message_receiver']
+            for key in {(sender, receiver), (receiver, sender)}:
+                conversation = conversations.setdefault(key, [0, pair['last_activity'], 0])
+                conversation[0] = max(conversation[0], pair['last_message'])
+                conversation[1] = max(conversation[1], pair['last_activity'])
+        unread = Message.objects.filter(seen=False).values('message_sender', 'message_receiver').annotate(
+            unread=Count('id')).order_by()
+        for pair in unread.iterator():
+            if pair['message_sender'] != pair['message_receiver']:
+                conversations[(pair['message_receiver'], pair['message_sender'])][2] = pair['unread']
+
+        rows = [Conversation(owner_id=owner, peer_id=peer, last_message_id=last_message,
+                             last_activity=last_activity, unread_count=unread_count)
+                for (owner, peer), (last_message, last_activity, unread_count) in conversations.items()]
+        with transaction.atomic():
+            Conversation.objects.all().delete()
+            Conversation.objects.bulk_create(rows, batch_size=options['batch_size'])
+        self.stdout.write('%s conversations rebuilt' % len(rows))
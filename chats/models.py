@@ -1,10 +1,12 @@
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_init, post_delete, pre_save, pre_delete
 
 from base.models import Base, BaseManager
-from base.signals import update_cache
+from base.signals import update_cache, update_search_document
 from users.models import Identity
 from media.models import Media
+from .conversations import remember_unread_message, load_unread_message, update_conversations, remove_conversation_unread
+from .push import remember_message_seen, push_message_events
 
 
 # Create your models here.
@@ -60,7 +62,38 @@ class Message(Base):
     )
 
     objects = BaseManager()
+    search_fields = (('body', 'A'),)
+
+    class Meta:
+        # threads are read by the identity pair
+        index_together = [('message_sender', 'message_receiver')]
 
 
 # Cache Model Data After Update
 post_save.connect(update_cache, sender=Message)
+# Update Search Index
+post_save.connect(update_search_document, sender=Message)
+# Update Conversations Of Sender And Receiver
+post_init.connect(remember_unread_message, sender=Message)
+pre_save.connect(load_unread_message, sender=Message)
+pre_delete.connect(load_unread_message, sender=Message)
+post_save.connect(update_conversations, sender=Message)
+post_delete.connect(remove_conversation_unread, sender=Message)
+# Push Message Events To Connected Clients
+post_init.connect(remember_message_seen, sender=Message)
+post_save.connect(push_message_events, sender=Message)
+
+
+class Conversation(models.Model):
+    """
+        Inbox index, one row per participant of an identity pair, kept by the Message signals
+    """
+    owner = models.ForeignKey(Identity, related_name='conversations', on_delete=models.CASCADE, db_index=True)
+    peer = models.ForeignKey(Identity, related_name='+', on_delete=models.CASCADE)
+    last_message = models.ForeignKey(Message, related_name='+', on_delete=models.SET_NULL, blank=True, null=True)
+    last_activity = models.DateTimeField(db_index=True)
+    unread_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [('owner', 'peer')]
+        index_together = [('owner', 'last_message')]
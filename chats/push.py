@@ -0,0 +1,133 @@
+import json
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_CREATED = 'message.created'
+MESSAGE_SEEN = 'message.seen'
+THREAD_SEEN = 'thread.seen'
+
+
+def get_group_name(identity_id):
+    return 'chat-identity-%s' % identity_id
+
+
+class ChannelLayerBroker(object):
+    """
+        Delivers through the groups of the channel layer, whatever CHANNEL_LAYERS points at: in memory
+        for a single process, redis when interface servers and workers run apart
+    """
+    def subscribe(self, identity_id, reply_channel):
+        from channels import Group
+        Group(get_group_name(identity_id)).add(reply_channel)
+
+    def unsubscribe(self, identity_id, reply_channel):
+        from channels import Group
+        Group(get_group_name(identity_id)).discard(reply_channel)
+
+    def publish(self, identity_id, event):
+        from channels import Group
+        Group(get_group_name(identity_id)).send({'text': json.dumps(event)}, immediately=True)
+
+
+class InMemoryBroker(object):
+    """
+        Keeps the connections of each identity in this process, for tests and single process
+        deployments. The last events stay in published so tests can read what was pushed.
+    """
+    def __init__(self, history=100):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.published = deque(maxlen=history)
+
+    def subscribe(self, identity_id, reply_channel):
+        with self.lock:
+            self.subscribers.setdefault(identity_id, set()).add(reply_channel)
+
+    def unsubscribe(self, identity_id, reply_channel):
+        with self.lock:
+            channels = self.subscribers.get(identity_id, set())
+            channels.discard(reply_channel)
+            if not channels:
+                self.subscribers.pop(identity_id, None)
+
+    def publish(self, identity_id, event):
+        with self.lock:
+            self.published.append((identity_id, event))
+            channels = list(self.subscribers.get(identity_id, ()))
+        if channels:
+            from channels import Channel
+            for reply_channel in channels:
+                Channel(reply_channel).send({'text': json.dumps(event)}, immediately=True)
+
+    def clear(self):
+        with self.lock:
+            self.subscribers.clear()
+            self.published.clear()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.CHAT_PUSH_BROKER)()
+    return _broker
+
+
+def send_event(identity_id, event):
+    try:
+        get_broker().publish(identity_id, event)
+    except Exception:
+        # clients fall back to polling, a lost push never fails the request
+        logger.exception('chat push to identity %s failed', identity_id)
+
+
+def push(identity_id, event_type, payload, using=None):
+    """
+        Publishes event_type to the connections of identity once the current transaction commits,
+        so a client reacting to it reads the committed rows
+    """
+    if not settings.CHAT_PUSH_ENABLED or identity_id is None:
+        return
+    event = dict(payload, type=event_type)
+    transaction.on_commit(lambda: send_event(identity_id, event), using=using)
+
+
+def get_message_payload(message):
+    return {
+        'id': message.id,
+        'sender': message.message_sender_id,
+        'receiver': message.message_receiver_id,
+        'send_date': message.send_date.isoformat() if message.send_date else None,
+        'seen_date': message.seen_date.isoformat() if message.seen_date else None,
+        'body': message.body,
+        'file': message.message_file_id,
+    }
+
+
+def remember_message_seen(sender, instance, **kwargs):
+    # deferred loads would cost a query per instance
+    if not instance.get_deferred_fields():
+        instance._was_seen = instance.seen
+
+
+def push_message_events(sender, instance, created=False, using=None, **kwargs):
+    was_seen = getattr(instance, '_was_seen', None)
+    instance._was_seen = instance.seen
+    if instance.delete_flag:
+        return
+    if created:
+        push(instance.message_receiver_id, MESSAGE_CREATED, {'message': get_message_payload(instance)}, using)
+    elif instance.seen and was_seen is False:
+        push(instance.message_sender_id, MESSAGE_SEEN, {'message': get_message_payload(instance)}, using)
@@ -1,6 +1,9 @@
+from rest_framework.serializers import ModelSerializer
+
 from base.serializers import BaseSerializer
+from users.serializers import IdentityMiniSerializer
 
-from .models import Message
+from .models import Message, Conversation
 
 
 # define serializers here
@@ -9,3 +12,12 @@ class MessageSerializer(BaseSerializer):
         model = Message
         fields = '__all__'
         read_only_fields = ('send_date', 'seen_date')
+
+
+class ConversationSerializer(ModelSerializer):
+    peer = IdentityMiniSerializer()
+    last_message = MessageSerializer()
+
+    class Meta:
+        model = Conversation
+        fields = ('id', 'peer', 'last_message', 'last_activity', 'unread_count')
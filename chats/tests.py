@@ -1,3 +1,184 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import Identity
+from .conversations import mark_thread_seen
+from .models import Message, Conversation
+from .push import get_broker, InMemoryBroker, MESSAGE_CREATED, MESSAGE_SEEN, THREAD_SEEN
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_identity(username):
+    user = User.objects.create_user(username, '%s@example.com' % username, 'password')
+    return Identity.objects.get(identity_user=user)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ConversationTestCase(TestCase):
+    """
+        Counters kept by the signals match a rebuild from the messages
+    """
+    def setUp(self):
+        self.sender = create_identity('sender')
+        self.receiver = create_identity('receiver')
+
+    def send(self, sender, receiver, body='hello'):
+        return Message.objects.create(message_sender=sender, message_receiver=receiver, body=body)
+
+    def get_unread(self, owner, peer):
+        return Conversation.objects.get(owner=owner, peer=peer).unread_count
+
+    def snapshot(self):
+        return list(Conversation.objects.order_by('owner_id', 'peer_id').values_list(
+            'owner_id', 'peer_id', 'last_message_id', 'unread_count'))
+
+    def assertMatchesRebuild(self):
+        maintained = self.snapshot()
+        call_command('rebuild_conversations', stdout=StringIO())
+        self.assertEqual(maintained, self.snapshot())
+
+    def test_send_seen_delete_rebuild(self):
+        messages = [self.send(self.sender, self.receiver) for index in range(4)]
+        self.assertEqual(self.get_unread(self.receiver, self.sender), 4)
+        self.assertEqual(self.get_unread(self.sender, self.receiver), 0)
+
+        messages[0].seen = True
+        messages[0].seen_date = timezone.now()
+        messages[0].save()
+        self.assertEqual(self.get_unread(self.receiver, self.sender), 3)
+
+        messages[1].delete_flag = True
+        messages[1].save()
+        self.assertEqual(self.get_unread(self.receiver, self.sender), 2)
+
+        messages[2].delete()
+        self.assertEqual(self.get_unread(self.receiver, self.sender), 1)
+        self.assertMatchesRebuild()
+
+        reply = self.send(self.receiver, self.sender)
+        self.assertEqual(self.get_unread(self.sender, self.receiver), 1)
+        self.assertEqual(Conversation.objects.get(owner=self.sender, peer=self.receiver).last_message_id, reply.id)
+        self.assertMatchesRebuild()
+
+    def test_mark_thread_seen(self):
+        self.send(self.sender, self.receiver)
+        deleted = self.send(self.sender, self.receiver)
+        deleted.delete_flag = True
+        deleted.save()
+        self.assertEqual(mark_thread_seen(self.receiver.id, self.sender.id, timezone.now()), 1)
+        self.assertEqual(self.get_unread(self.receiver, self.sender), 0)
+        self.assertFalse(Message._base_manager.get(pk=deleted.pk).seen)
+        self.assertMatchesRebuild()
+
+    def test_deferred_load(self):
+        message = self.send(self.sender, self.receiver)
+        deferred = Message.objects.only('id').get(pk=message.pk)
+        deferred.seen = True
+        deferred.save()
+        self.assertEqual(self.get_unread(self.receiver, self.sender), 0)
+        Message.objects.only('id').get(pk=message.pk).save()
+        self.assertEqual(self.get_unread(self.receiver, self.sender), 0)
+        self.assertMatchesRebuild()
+
+    def test_message_to_self(self):
+        self.send(self.sender, self.sender)
+        self.assertEqual(self.get_unread(self.sender, self.sender), 0)
+        self.assertMatchesRebuild()
+
+
+@override_settings(CACHES=TEST_CACHES, CHAT_PUSH_ENABLED=True)
+class PushTestCase(TransactionTestCase):
+    """
+        Events reach the broker once the transaction that wrote the messages commits
+    """
+    def setUp(self):
+        self.broker = get_broker()
+        self.assertIsInstance(self.broker, InMemoryBroker)
+        self.sender = create_identity('sender')
+        self.receiver = create_identity('receiver')
+        self.broker.clear()
+
+    def published(self, event_type):
+        return [(identity_id, event) for identity_id, event in self.broker.published if event['type'] == event_type]
+
+    def test_message_created(self):
+        with transaction.atomic():
+            message = Message.objects.create(message_sender=self.sender, message_receiver=self.receiver, body='hi')
+            self.assertEqual(self.published(MESSAGE_CREATED), [])
+        events = self.published(MESSAGE_CREATED)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][0], self.receiver.id)
+        self.assertEqual(events[0][1]['message']['id'], message.id)
+
+    def test_message_created_rolled_back(self):
+        try:
+            with transaction.atomic():
+                Message.objects.create(message_sender=self.sender, message_receiver=self.receiver, body='hi')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(self.published(MESSAGE_CREATED), [])
+
+    def test_message_seen(self):
+        message = Message.objects.create(message_sender=self.sender, message_receiver=self.receiver, body='hi')
+        message.seen = True
+        message.seen_date = timezone.now()
+        message.save()
+        events = self.published(MESSAGE_SEEN)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][0], self.sender.id)
+        self.assertEqual(events[0][1]['message']['id'], message.id)
+        # saving again is not a new seen
+        message.save()
+        self.assertEqual(len(self.published(MESSAGE_SEEN)), 1)
+
+    def test_thread_seen(self):
+        Message.objects.create(message_sender=self.sender, message_receiver=self.receiver, body='hi')
+        mark_thread_seen(self.receiver.id, self.sender.id, timezone.now())
+        events = self.published(THREAD_SEEN)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0][0], self.sender.id)
+        self.assertEqual(events[0][1]['reader'], self.receiver.id)
+        # nothing left to mark, nothing pushed
+        mark_thread_seen(self.receiver.id, self.sender.id, timezone.now())
+        self.assertEqual(len(self.published(THREAD_SEEN)), 1)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SearchPaginationTestCase(TestCase):
+    """
+        A cursor on search keeps the rank order and pages by offset
+    """
+    def setUp(self):
+        self.sender = create_identity('sender')
+        self.receiver = create_identity('receiver')
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender.identity_user)
+        self.best = self.send('apple apple apple')
+        self.send('apple banana')
+        self.send('apple banana cherry')
+
+    def send(self, body):
+        return Message.objects.create(message_sender=self.sender, message_receiver=self.receiver, body=body)
+
+    def get_ids(self, query):
+        response = self.client.get('/messages/search/?q=apple&limit=2' + query)
+        self.assertEqual(response.status_code, 200)
+        return response.data, [message['id'] for message in response.data['results']]
+
+    def test_search_with_cursor(self):
+        ranked, ranked_ids = self.get_ids('')
+        paged, paged_ids = self.get_ids('&cursor=')
+        self.assertEqual(paged_ids[0], self.best.id)
+        self.assertEqual(paged_ids, ranked_ids)
+        self.assertEqual(paged['count'], 3)
+        self.assertIn('offset=2', paged['next'])
+        _, rest_ids = self.get_ids('&cursor=&offset=2')
+        self.assertEqual(len(set(paged_ids + rest_ids)), 3)
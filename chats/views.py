@@ -1,17 +1,28 @@
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import list_route
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
 
-from .models import Message
-from .serializers import MessageSerializer
+from base.access import get_access_context
+from base.pagination import KeysetPagination
+from base.views import SearchMixin
+
+from .conversations import get_thread, mark_thread_seen
+from .models import Message, Conversation
+from .serializers import MessageSerializer, ConversationSerializer
 
 
 # Create your views here.
-class MessageViewSet(ModelViewSet):
+class MessageViewSet(SearchMixin, ModelViewSet):
     """
         A ViewSet for Handle Message Views
     """
     # queryset = Message.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = Message.objects.all()
@@ -39,4 +50,66 @@ class MessageViewSet(ModelViewSet):
         return queryset
 
     def get_serializer_class(self):
-        return MessageSerializer
\ No newline at end of file
+        if self.action == 'inbox':
+            return ConversationSerializer
+        return MessageSerializer
+
+    @property
+    def keyset_ordering(self):
+        # the inbox pages by the last message of each conversation
+        return '-last_message_id' if self.action == 'inbox' else '-id'
+
+    def get_identity(self):
+        identity = get_access_context(self.request).identity
+        if identity is None:
+            return None, Response({"details": "identity not found"}, status=status.HTTP_400_BAD_REQUEST)
+        return identity, None
+
+    @list_route(methods=['get'])
+    def inbox(self, request):
+        """
+            Conversations of the user, latest first, one row each however many messages it has
+        """
+        identity, error = self.get_identity()
+        if error is not None:
+            return error
+        queryset = Conversation.objects.filter(owner=identity).exclude(last_message=None).select_related(
+            'peer__identity_user', 'last_message').order_by('-last_message_id')
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data, status=status.HTTP_200_OK)
+
+    @list_route(methods=['get'])
+    def unread(self, request):
+        identity, error = self.get_identity()
+        if error is not None:
+            return error
+        total = Conversation.objects.filter(owner=identity).aggregate(total=Sum('unread_count'))['total']
+        return Response({'unread': total or 0}, status=status.HTTP_200_OK)
+
+    @list_route(methods=['get'], url_path='threads/(?P<peer_id>[0-9]+)')
+    def thread(self, request, peer_id=None):
+        """
+            Messages between the user and peer, latest first, ?after=<id> for the ones newer than id
+        """
+        identity, error = self.get_identity()
+        if error is not None:
+            return error
+        queryset = get_thread(identity.id, peer_id).order_by('-id')
+        # polling fallback of clients without a push connection
+        after = request.query_params.get('after', None)
+        if after is not None and after.isdigit():
+            queryset = queryset.filter(id__gt=after)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data, status=status.HTTP_200_OK)
+
+    @list_route(methods=['post'], url_path='threads/(?P<peer_id>[0-9]+)/seen')
+    def thread_seen(self, request, peer_id=None):
+        identity, error = self.get_identity()
+        if error is not None:
+            return error
+        marked = mark_thread_seen(identity.id, peer_id, timezone.now())
+        return Response({'seen': marked}, status=status.HTTP_200_OK)
\ No newline at end of file
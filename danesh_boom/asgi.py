@@ -0,0 +1,13 @@
+"""
+ASGI config for danesh_boom project, run with daphne next to manage.py runworker.
+
+HTTP keeps going through wsgi.py, only WebSockets need this entry point.
+"""
+
+import os
+
+from channels.asgi import get_channel_layer
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "danesh_boom.settings")
+
+channel_layer = get_channel_layer()
@@ -0,0 +1,5 @@
+from channels.routing import include
+
+channel_routing = [
+    include('chats.routing.websocket_routing', path=r'^/ws/chats/?$'),
+]
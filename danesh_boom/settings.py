@@ -13,7 +13,9 @@ https://docs.djangoproject.com/en/1.10/ref/settings/
 import datetime
 import datetime
 import os
+import sys
 
+from django.core.exceptions import ImproperlyConfigured
 from django.utils.translation import ugettext_lazy as _
 
 from danesh_boom.settings_helpers import get_config, get_db_settings, load_static_asset_manifest
@@ -59,9 +61,11 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'social_django',
     'rest_social_auth',
+    'channels',
 ]
 
 MIDDLEWARE = [
+    'base.instrumentation.RequestStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -167,6 +171,44 @@ CACHES = {
 
 CACHE_TIMEOUT = 60 * 60 * 24
 
+# Per identity explore result cache, 0 disables it
+EXPLORE_CACHE_TIMEOUT = 30
+
+# In process autocomplete indexes are reloaded after this many seconds
+AUTOCOMPLETE_REBUILD_INTERVAL = 60 * 10
+
+# Post ids kept per identity feed
+FEED_SIZE = 500
+# Exchanges with more members and identities with more followers are read on demand instead of fanned out
+FEED_FANOUT_LIMIT = 1000
+FEED_LARGE_EXCHANGES_TIMEOUT = 60 * 10
+# Seconds a fan out may hold the lock of one feed before it is released anyway
+FEED_LOCK_TIMEOUT = 5
+
+# Per request query, cache and serializer stats, kept for the last REQUEST_STATS_SAMPLES requests of each route.
+# Measured requests log every query, so production only measures when the config enables it, best with a sample rate
+REQUEST_STATS_ENABLED = CONFIG.get('REQUEST_STATS_ENABLED', DEBUG) or 'test' in sys.argv
+REQUEST_STATS_SAMPLE_RATE = CONFIG.get('REQUEST_STATS_SAMPLE_RATE', 1.0)
+REQUEST_STATS_SAMPLES = 1000
+# Views over their query_budget fail while testing and log a warning otherwise
+QUERY_BUDGET_STRICT = 'test' in sys.argv
+
+# WebSocket push of chat events, clients without a connection keep polling
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': CONFIG.get('CHANNEL_LAYER', {}).get('BACKEND', 'asgiref.inmemory.ChannelLayer'),
+        'CONFIG': CONFIG.get('CHANNEL_LAYER', {}).get('CONFIG', {}),
+        'ROUTING': 'danesh_boom.routing.channel_routing',
+    },
+}
+IN_MEMORY_CHANNEL_LAYER = CHANNEL_LAYERS['default']['BACKEND'] == 'asgiref.inmemory.ChannelLayer'
+# the in memory layer only reaches sockets of this process, runserver serves both but wsgi and daphne do not
+CHAT_PUSH_ENABLED = CONFIG.get('CHAT_PUSH_ENABLED', DEBUG or not IN_MEMORY_CHANNEL_LAYER) or 'test' in sys.argv
+if CHAT_PUSH_ENABLED and IN_MEMORY_CHANNEL_LAYER and not DEBUG and 'test' not in sys.argv:
+    raise ImproperlyConfigured('CHAT_PUSH_ENABLED needs a channel layer shared between processes, e.g. asgi_redis')
+# InMemoryBroker keeps connections in this process and records what was pushed
+CHAT_PUSH_BROKER = 'chats.push.InMemoryBroker' if 'test' in sys.argv else 'chats.push.ChannelLayerBroker'
+
 # Internationalization
 # https://docs.djangoproject.com/en/1.10/topics/i18n/
 
@@ -197,6 +239,35 @@ EMAIL_HOST_USER = CONFIG.get('EMAIL').get('HOST_USER')
 EMAIL_HOST_PASSWORD = CONFIG.get('EMAIL').get('HOST_PASSWORD')
 EMAIL_PORT = CONFIG.get('EMAIL').get('PORT')
 EMAIL_USE_TLS = CONFIG.get('EMAIL').get('USE_TLS')
+EMAIL_FROM = CONFIG.get('EMAIL').get('EMAIL_FROM')
+
+SMS_API_KEY = os.environ.get('SMS_API_KEY', CONFIG.get('SMS').get('API_KEY'))
+SMS_SECRET_KEY = os.environ.get('SMS_SECRET_KEY', CONFIG.get('SMS').get('SECRET_KEY'))
+SMS_TOKEN_URL = CONFIG.get('SMS').get('TOKEN_URL')
+SMS_SEND_URL = CONFIG.get('SMS').get('SEND_URL')
+SMS_VERIFICATION_TEMPLATE = CONFIG.get('SMS').get('VERIFICATION_TEMPLATE')
+SMS_TIMEOUT = 10
+
+# Emails and sms are queued in OutboundMessage and sent by manage.py send_notifications
+NOTIFICATION_TRANSPORTS = {
+    'email': 'base.notifications.EmailTransport',
+    'sms': 'base.notifications.RestfulSmsTransport',
+} if 'test' not in sys.argv else {
+    'email': 'base.notifications.FakeTransport',
+    'sms': 'base.notifications.FakeTransport',
+}
+NOTIFICATION_BATCH_SIZE = 100
+# Seconds a worker owns the messages it claimed
+NOTIFICATION_LEASE = 60 * 5
+NOTIFICATION_MAX_ATTEMPTS = 6
+# Retries wait NOTIFICATION_RETRY_DELAY seconds, doubled on each attempt up to the max
+NOTIFICATION_RETRY_DELAY = 30
+NOTIFICATION_MAX_RETRY_DELAY = 60 * 60
+# channel: (messages, seconds), more messages to one recipient in the window are not sent
+NOTIFICATION_RATE_LIMITS = {
+    'email': (10, 60 * 60),
+    'sms': (5, 60 * 60),
+}
 
 EMAIL_TEXT = '\n کاربر گرامی ' \
              '\n تیم وینیو یک درخواست بازیابی رمز عبور از شما دریافت کرده است.' \
@@ -250,6 +321,15 @@ SENDFILE_ROOT = os.path.normpath(
 SENDFILE_URL = CONFIG.get('SENDFILE_URL')
 # not MEDIA_ROOT. this is media app settings
 MEDIA_DIR = os.path.join(SENDFILE_ROOT, 'media')
+# Processes compressing uploaded images and videos, and the jobs they may have queued
+MEDIA_PROCESSING_WORKERS = 2
+MEDIA_PROCESSING_QUEUE = 50
+# Resumable uploads, chunk size bounds the memory of a request, unfinished uploads expire after the timeout
+MEDIA_UPLOAD_CHUNK_SIZE = 1024 * 1024 * 4
+MEDIA_UPLOAD_MAX_SIZE = 1024 * 1024 * 1024
+MEDIA_UPLOAD_TIMEOUT = 60 * 60 * 24
+# Stored media names never change content, browsers may keep them this many seconds
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media_root')
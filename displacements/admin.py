@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import DisplacementCheckpoint
+
+
+class DisplacementCheckpointAdmin(admin.ModelAdmin):
+    model = DisplacementCheckpoint
+    list_display = ['name', 'last_id', 'rows', 'updated_time']
+
+
+admin.site.register(DisplacementCheckpoint, DisplacementCheckpointAdmin)
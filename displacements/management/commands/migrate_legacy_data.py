@@ -0,0 +1,22 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from displacements.migration import MIGRATIONS, run_migrations
+
+
+class Command(BaseCommand):
+    help = 'Stream the legacy database into this one, resuming from the last migrated id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('groups', nargs='*', choices=list(MIGRATIONS), default=list(MIGRATIONS))
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--restart', action='store_true', help='Ignore the saved checkpoints')
+
+    def handle(self, *args, **options):
+        for group in options['groups']:
+            reports = run_migrations(group, options['batch_size'], options['restart'], log=self.stdout.write)
+            for report in reports:
+                for error in report.pop('errors'):
+                    self.stderr.write(error)
+                self.stdout.write(json.dumps(report))
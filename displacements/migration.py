@@ -0,0 +1,421 @@
+import time
+from collections import OrderedDict
+
+import psycopg2
+from psycopg2.extras import DictCursor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils.timezone import now
+
+from base.models import Hashtag, HashtagParent
+from base.utils import bulk_create_base, bulk_update
+from exchanges.models import Exchange
+from media.models import Media
+from organizations.models import Organization, StaffCount, Staff, Ability, Customer, Follow
+from products.models import Category, CategoryField, Product, Price, Comment
+from users.importers import create_user_defaults, get_header_ids
+from users.models import Identity
+from .models import DisplacementCheckpoint
+
+
+def connect():
+    return psycopg2.connect(
+        host='localhost',
+        dbname=settings.LAST_DATABASE_NAME,
+        user=settings.LAST_DATABASE_USERNAME,
+        password=settings.LAST_DATABASE_PASSWORD
+    )
+
+
+def fields_of(row, before_fields, exclude=()):
+    return {key: row[key] for key in before_fields if key not in exclude}
+
+
+class LegacyMigration(object):
+    """
+        Stream a legacy table in id order and write every batch to the target in one transaction
+    """
+    name = None
+    table = None
+    id_column = 'base_ptr_id'
+    where = None
+
+    def __init__(self, connection, batch_size=1000, log=None):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.log = log
+        self.errors = []
+
+    def fetch_by(self, table, column, values):
+        values = [value for value in set(values) if value is not None]
+        if not values:
+            return []
+        with self.connection.cursor(cursor_factory=DictCursor) as cursor:
+            cursor.execute('SELECT * FROM ' + table + ' WHERE ' + column + ' = ANY(%s)', (values,))
+            return cursor.fetchall()
+
+    def legacy_map(self, table, key, value, keys):
+        return {row[key]: row[value] for row in self.fetch_by(table, key, keys)}
+
+    def user_ids(self, legacy_user_ids):
+        # legacy auth_user id => target user id, joined by username
+        usernames = self.legacy_map('auth_user', 'id', 'username', legacy_user_ids)
+        targets = dict(User.objects.filter(username__in=usernames.values()).values_list('username', 'id'))
+        return {legacy_id: targets[username] for legacy_id, username in usernames.items() if username in targets}
+
+    def identity_ids(self, legacy_identity_ids, key='base_ptr_id'):
+        # legacy identity => target identity, joined by name
+        names = self.legacy_map('users_identity', key, 'name', legacy_identity_ids)
+        targets = dict(Identity.objects.filter(name__in=names.values()).values_list('name', 'id'))
+        return {legacy_id: targets[name] for legacy_id, name in names.items() if name in targets}
+
+    def batches(self, after_id):
+        # a named cursor keeps the result set on the server, memory stays at one batch
+        cursor = self.connection.cursor(name='displacement_' + self.name, cursor_factory=DictCursor)
+        cursor.itersize = self.batch_size
+        query = 'SELECT * FROM ' + self.table + ' WHERE ' + self.id_column + ' > %s'
+        if self.where is not None:
+            query += ' AND ' + self.where
+        cursor.execute(query + ' ORDER BY ' + self.id_column, (after_id,))
+        try:
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def run(self, restart=False):
+        checkpoint, created = DisplacementCheckpoint.objects.get_or_create(name=self.name)
+        if restart:
+            checkpoint.last_id = 0
+            checkpoint.rows = 0
+        start_time = time.time()
+        rows_count = 0
+        for rows in self.batches(checkpoint.last_id):
+            with transaction.atomic():
+                self.migrate(rows)
+                checkpoint.last_id = rows[-1][self.id_column]
+                checkpoint.rows += len(rows)
+                checkpoint.updated_time = now()
+                checkpoint.save()
+            rows_count += len(rows)
+            if self.log is not None:
+                seconds = time.time() - start_time
+                self.log('%s: %d rows, last id %s, %.1f rows/sec' % (
+                    self.name, rows_count, checkpoint.last_id, rows_count / seconds if seconds else 0))
+        seconds = time.time() - start_time
+        return {
+            'name': self.name,
+            'rows': rows_count,
+            'last_id': checkpoint.last_id,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(rows_count / seconds, 1) if seconds else 0,
+            'errors': self.errors,
+        }
+
+    def migrate(self, rows):
+        raise NotImplementedError
+
+
+class UserMigration(LegacyMigration):
+    name = 'users'
+    table = 'auth_user'
+    id_column = 'id'
+
+    def __init__(self, *args, **kwargs):
+        super(UserMigration, self).__init__(*args, **kwargs)
+        self.header_ids = get_header_ids()
+
+    def migrate(self, rows):
+        existing = set(User.objects.filter(username__in=[row['username'] for row in rows]).values_list(
+            'username', flat=True))
+        profiles = {row['profile_user_id']: row for row in self.fetch_by(
+            'users_profile', 'profile_user_id', [row['id'] for row in rows])}
+        users = []
+        profile_values = {}
+        for row in rows:
+            if row['username'] in existing:
+                self.errors.append('user with username=' + row['username'] + ' exist !')
+                continue
+            existing.add(row['username'])
+            users.append(User(**fields_of(row, settings.USERS_BEFORE_FIELDS, exclude=['id'])))
+            if row['id'] in profiles:
+                profile_values[row['username']] = fields_of(profiles[row['id']], settings.PROFILES_BEFORE_FIELDS)
+        User.objects.bulk_create(users)
+        create_user_defaults(users, self.header_ids, self.batch_size, profile_values)
+
+
+class CategoryMigration(LegacyMigration):
+    name = 'categories'
+    table = 'products_category'
+
+    def migrate(self, rows):
+        existing = set(Category._base_manager.filter(name__in=[row['name'] for row in rows]).values_list(
+            'name', flat=True))
+        categories = {}
+        for row in rows:
+            if row['name'] in existing:
+                self.errors.append('category with name=' + row['name'] + ' already exist !')
+                continue
+            existing.add(row['name'])
+            categories[row['base_ptr_id']] = Category(name=row['name'], title=row['title'], creatable=row['creatable'])
+        bulk_create_base(Category, categories.values(), self.batch_size)
+
+        field_rows = self.fetch_by('products_categoryfield', 'field_category_id', categories)
+        existing = set(CategoryField._base_manager.filter(name__in=[row['name'] for row in field_rows]).values_list(
+            'name', flat=True))
+        category_fields = []
+        for row in field_rows:
+            if row['name'] in existing:
+                self.errors.append('category field with name=' + row['name'] + ' already exist !')
+                continue
+            existing.add(row['name'])
+            category_fields.append(CategoryField(
+                field_category_id=categories[row['field_category_id']].id,
+                **fields_of(row, settings.CATEGORY_FIELDS_BEFORE_FIELDS, exclude=['base_ptr_id', 'field_category_id'])
+            ))
+        bulk_create_base(CategoryField, category_fields, self.batch_size)
+
+
+class CategoryParentMigration(LegacyMigration):
+    name = 'category_parents'
+    table = 'products_category'
+    where = 'category_parent_id IS NOT NULL'
+
+    def migrate(self, rows):
+        parent_names = self.legacy_map('products_category', 'base_ptr_id', 'name',
+                                       [row['category_parent_id'] for row in rows])
+        names = [row['name'] for row in rows] + list(parent_names.values())
+        categories = {category.name: category for category in Category.objects.filter(name__in=names)}
+        changed = []
+        for row in rows:
+            parent_name = parent_names.get(row['category_parent_id'], None)
+            if row['name'] not in categories or parent_name not in categories:
+                self.errors.append('category parent of name=' + row['name'] + ' on target not exist !')
+                continue
+            category = categories[row['name']]
+            category.category_parent_id = categories[parent_name].id
+            changed.append(category)
+        bulk_update(Category, changed, ['category_parent'], self.batch_size)
+
+
+class ProductMigration(LegacyMigration):
+    name = 'products'
+    table = 'products_product'
+
+    def migrate(self, rows):
+        owner_ids = self.identity_ids([row['product_owner_id'] for row in rows])
+        owners = {identity['id']: identity for identity in Identity.objects.filter(id__in=owner_ids.values()).values(
+            'id', 'identity_user_id', 'identity_organization__owner_id')}
+        category_names = self.legacy_map('products_category', 'base_ptr_id', 'name',
+                                         [row['product_category_id'] for row in rows])
+        category_ids = dict(Category.objects.filter(name__in=category_names.values()).values_list('name', 'id'))
+        products = {}
+        for row in rows:
+            owner = owners.get(owner_ids.get(row['product_owner_id'], None), None)
+            category_id = category_ids.get(category_names.get(row['product_category_id'], None), None)
+            if owner is None or category_id is None:
+                self.errors.append('owner or category of product name=' + row['name'] + ' on target not exist !')
+                continue
+            products[row['base_ptr_id']] = Product(
+                product_owner_id=owner['id'],
+                product_user_id=owner['identity_user_id'] or owner['identity_organization__owner_id'],
+                product_category_id=category_id,
+                **fields_of(row, settings.PRODUCTS_BEFORE_FIELDS,
+                            exclude=['base_ptr_id', 'product_owner_id', 'product_category_id'])
+            )
+        bulk_create_base(Product, products.values(), self.batch_size)
+
+        prices = [
+            Price(price_product_id=products[row['price_product_id']].id, value=row['value'])
+            for row in self.fetch_by('products_price', 'price_product_id', products)
+        ]
+        bulk_create_base(Price, prices, self.batch_size)
+
+        comment_rows = self.fetch_by('products_comment', 'comment_product_id', products)
+        user_ids = self.user_ids([row['comment_user_id'] for row in comment_rows])
+        comments = []
+        for row in comment_rows:
+            if row['comment_user_id'] not in user_ids:
+                self.errors.append('user of comment id=' + str(row['base_ptr_id']) + ' on target not exist !')
+                continue
+            comments.append(Comment(comment_product_id=products[row['comment_product_id']].id,
+                                    comment_user_id=user_ids[row['comment_user_id']], text=row['text']))
+        bulk_create_base(Comment, comments, self.batch_size)
+
+
+class OrganizationMigration(LegacyMigration):
+    name = 'organizations'
+    table = 'organizations_organization'
+
+    def migrate(self, rows):
+        existing = set(Organization._base_manager.filter(username__in=[row['username'] for row in rows]).values_list(
+            'username', flat=True))
+        # organization identities are named by official name
+        taken_names = set(Identity._base_manager.filter(name__in=[row['official_name'] for row in rows]).values_list(
+            'name', flat=True))
+        owner_ids = self.user_ids([row['owner_id'] for row in rows])
+        organizations = {}
+        for row in rows:
+            if row['username'] in existing or row['official_name'] in taken_names:
+                self.errors.append('organization with name=' + row['username'] + ' already exist !')
+                continue
+            if row['owner_id'] not in owner_ids:
+                self.errors.append('owner of organization name=' + row['username'] + ' on target not exist !')
+                continue
+            existing.add(row['username'])
+            taken_names.add(row['official_name'])
+            organizations[row['base_ptr_id']] = Organization(
+                owner_id=owner_ids[row['owner_id']],
+                **fields_of(row, settings.ORGANIZATION_BEFORE_FIELDS,
+                            exclude=['base_ptr_id', 'owner_id', 'organization_logo_id'])
+            )
+        bulk_create_base(Organization, organizations.values(), self.batch_size)
+        bulk_create_base(Identity, [
+            Identity(identity_organization=organization, name=organization.official_name)
+            for organization in organizations.values()
+        ], self.batch_size)
+        self.migrate_admins(organizations)
+        self.migrate_staffs(organizations)
+        self.migrate_customers(organizations)
+
+    def migrate_admins(self, organizations):
+        admin_rows = self.fetch_by('organizations_organization_admins', 'organization_id', organizations)
+        user_ids = self.user_ids([row['user_id'] for row in admin_rows])
+        admins = []
+        for row in admin_rows:
+            if row['user_id'] not in user_ids:
+                self.errors.append('admin of organization id=' + str(row['organization_id']) + ' on target not exist !')
+                continue
+            admins.append(Organization.admins.through(organization_id=organizations[row['organization_id']].id,
+                                                      user_id=user_ids[row['user_id']]))
+        Organization.admins.through.objects.bulk_create(admins)
+
+    def migrate_staffs(self, organizations):
+        bulk_create_base(StaffCount, [
+            StaffCount(staff_count_organization_id=organizations[row['staff_count_organization_id']].id,
+                       count=row['count'])
+            for row in self.fetch_by('organizations_staffcount', 'staff_count_organization_id', organizations)
+        ], self.batch_size)
+
+        staff_rows = self.fetch_by('organizations_staff', 'staff_organization_id', organizations)
+        user_ids = self.user_ids([row['staff_user_id'] for row in staff_rows])
+        staffs = []
+        for row in staff_rows:
+            if row['staff_user_id'] not in user_ids:
+                self.errors.append('user of staff id=' + str(row['base_ptr_id']) + ' on target not exist !')
+                continue
+            staffs.append(Staff(staff_organization_id=organizations[row['staff_organization_id']].id,
+                                staff_user_id=user_ids[row['staff_user_id']],
+                                position=row['position'], post_permission=row['post_permission']))
+        bulk_create_base(Staff, staffs, self.batch_size)
+
+        bulk_create_base(Ability, [
+            Ability(ability_organization_id=organizations[row['ability_organization_id']].id,
+                    title=row['title'], text=row['text'])
+            for row in self.fetch_by('organizations_ability', 'ability_organization_id', organizations)
+        ], self.batch_size)
+
+    def migrate_customers(self, organizations):
+        customer_rows = self.fetch_by('organizations_customer', 'customer_organization_id', organizations)
+        identity_ids = self.identity_ids([row['related_customer_id'] for row in customer_rows])
+        # media are not migrated, keep the picture only if the same file id exists here
+        media_ids = set(Media.objects.filter(
+            id__in=[row['customer_picture_id'] for row in customer_rows]).values_list('id', flat=True))
+        customers = []
+        for row in customer_rows:
+            if row['related_customer_id'] not in identity_ids or row['customer_picture_id'] not in media_ids:
+                self.errors.append('identity or picture of customer title=' + row['title'] + ' on target not exist !')
+                continue
+            customers.append(Customer(customer_organization_id=organizations[row['customer_organization_id']].id,
+                                      related_customer_id=identity_ids[row['related_customer_id']],
+                                      customer_picture_id=row['customer_picture_id'], title=row['title']))
+        bulk_create_base(Customer, customers, self.batch_size)
+
+
+class FollowMigration(LegacyMigration):
+    name = 'follows'
+    table = 'organizations_follow'
+
+    def migrate(self, rows):
+        # legacy follows point to users, their identities are joined by name
+        identity_ids = self.identity_ids(
+            [row['follow_followed_id'] for row in rows] + [row['follow_follower_id'] for row in rows],
+            key='identity_user_id')
+        existing = set(Follow.objects.filter(follow_follower_id__in=identity_ids.values()).values_list(
+            'follow_follower_id', 'follow_followed_id'))
+        follows = []
+        for row in rows:
+            follower_id = identity_ids.get(row['follow_follower_id'], None)
+            followed_id = identity_ids.get(row['follow_followed_id'], None)
+            if follower_id is None or followed_id is None:
+                self.errors.append('identity of follow id=' + str(row['base_ptr_id']) + ' on target not exist !')
+                continue
+            if (follower_id, followed_id) in existing:
+                continue
+            existing.add((follower_id, followed_id))
+            follows.append(Follow(follow_follower_id=follower_id, follow_followed_id=followed_id,
+                                  follow_accepted=row['follow_accepted']))
+        bulk_create_base(Follow, follows, self.batch_size)
+
+
+class ExchangeMigration(LegacyMigration):
+    name = 'exchanges'
+    table = 'exchanges_exchange'
+
+    def migrate(self, rows):
+        owner_ids = self.identity_ids([row['owner_id'] for row in rows])
+        exchanges = {}
+        for row in rows:
+            if row['owner_id'] not in owner_ids:
+                self.errors.append('identity of exchange name=' + row['name'] + ' not found in target data base')
+                continue
+            exchanges[row['base_ptr_id']] = Exchange(
+                owner_id=owner_ids[row['owner_id']],
+                **fields_of(row, settings.EXCHANGE_BEFORE_FIELD, exclude=['base_ptr_id', 'owner_id', 'exchange_hashtag_id'])
+            )
+        bulk_create_base(Exchange, exchanges.values(), self.batch_size)
+
+        hashtag_rows = {row['base_ptr_id']: row for row in self.fetch_by(
+            'base_hashtag', 'base_ptr_id', [row['exchange_hashtag_id'] for row in rows if row['base_ptr_id'] in exchanges])}
+        parent_titles = self.legacy_map('base_hashtagparent', 'base_ptr_id', 'title',
+                                        [row['related_parent_id'] for row in hashtag_rows.values()])
+        parents = dict(HashtagParent._base_manager.filter(title__in=parent_titles.values()).values_list('title', 'id'))
+        new_parents = [HashtagParent(title=title) for title in set(parent_titles.values()) if title not in parents]
+        bulk_create_base(HashtagParent, new_parents, self.batch_size)
+        parents.update((parent.title, parent.id) for parent in new_parents)
+
+        hashtags = {}
+        for row in rows:
+            hashtag_row = hashtag_rows.get(row['exchange_hashtag_id'], None)
+            if row['base_ptr_id'] not in exchanges or hashtag_row is None:
+                continue
+            hashtags[row['base_ptr_id']] = Hashtag(
+                title=hashtag_row['title'],
+                hashtag_base_id=exchanges[row['base_ptr_id']].id,
+                related_parent_id=parents.get(parent_titles.get(hashtag_row['related_parent_id'], None), None)
+            )
+        bulk_create_base(Hashtag, hashtags.values(), self.batch_size)
+        for legacy_id, hashtag in hashtags.items():
+            exchanges[legacy_id].exchange_hashtag_id = hashtag.id
+        bulk_update(Exchange, [exchanges[legacy_id] for legacy_id in hashtags], ['exchange_hashtag'], self.batch_size)
+
+
+MIGRATIONS = OrderedDict([
+    ('users', [UserMigration]),
+    ('products', [CategoryMigration, CategoryParentMigration, ProductMigration]),
+    ('organizations', [OrganizationMigration, FollowMigration]),
+    ('exchanges', [ExchangeMigration]),
+])
+
+
+def run_migrations(group, batch_size=1000, restart=False, log=None):
+    connection = connect()
+    try:
+        return [migration(connection, batch_size, log).run(restart) for migration in MIGRATIONS[group]]
+    finally:
+        connection.close()
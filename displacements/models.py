@@ -1,3 +1,12 @@
 from django.db import models
+from django.utils.timezone import now
 
-# Create your models here.
+
+class DisplacementCheckpoint(models.Model):
+    name = models.CharField(max_length=100, unique=True, db_index=True, help_text='String(100)')
+    last_id = models.BigIntegerField(default=0, help_text='BigInteger')
+    rows = models.BigIntegerField(default=0, help_text='BigInteger')
+    updated_time = models.DateTimeField(default=now, db_index=True)
+
+    def __str__(self):
+        return '%s(%s)' % (self.name, self.last_id)
@@ -0,0 +1,103 @@
+from django.db.models import F, Count, Case, When, IntegerField
+
+from base.cache import invalidation_bus, related_tables
+from base.models import Post
+
+COUNTER_FIELDS = {
+    'supply': 'supply_count',
+    'demand': 'demand_count',
+    'post': 'post_count',
+}
+
+
+def get_post_counts(exchange_id):
+    # served by the row cache, None when the parent is not an exchange
+    from .models import Exchange
+    try:
+        exchange = Exchange.objects.get(pk=exchange_id)
+    except Exchange.DoesNotExist:
+        return None
+    return {post_type: getattr(exchange, field) for post_type, field in COUNTER_FIELDS.items()}
+
+
+def add_to_counter(exchange_id, post_type, amount, using=None):
+    field = COUNTER_FIELDS.get(post_type)
+    if exchange_id is None or field is None:
+        return
+    from .models import Exchange
+    # plain manager, BaseQuerySet.update would drop the cache of every exchange
+    updated = Exchange._base_manager.using(using).filter(pk=exchange_id).update(**{field: F(field) + amount})
+    if updated:
+        invalidation_bus.add_rows(related_tables(Exchange), exchange_id, using)
+
+
+def get_counted_post(instance):
+    if instance.pk is not None and not instance.delete_flag:
+        return instance.post_parent_id, instance.post_type
+    return None
+
+
+def remember_counted_post(sender, instance, **kwargs):
+    # deferred loads would cost a query per instance
+    if not instance.get_deferred_fields():
+        instance._counted_post = get_counted_post(instance)
+
+
+def load_counted_post(sender, instance, using=None, **kwargs):
+    # a deferred load has no snapshot, read what is stored before it is written or deleted
+    if hasattr(instance, '_counted_post') or instance.pk is None:
+        return
+    row = Post._base_manager.using(using).filter(pk=instance.pk).values_list(
+        'post_parent_id', 'post_type', 'delete_flag').first()
+    instance._counted_post = (row[0], row[1]) if row is not None and not row[2] else None
+
+
+def change_counted_post(instance, current, using=None):
+    previous = getattr(instance, '_counted_post', None)
+    instance._counted_post = current
+    if previous == current:
+        return
+    if previous is not None:
+        add_to_counter(previous[0], previous[1], -1, using)
+    if current is not None:
+        add_to_counter(current[0], current[1], 1, using)
+
+
+def update_post_counters(sender, instance, using=None, **kwargs):
+    change_counted_post(instance, get_counted_post(instance), using)
+
+
+def remove_post_counters(sender, instance, using=None, **kwargs):
+    change_counted_post(instance, None, using)
+
+
+def count_exchange_posts(exchange_ids):
+    counts = Post.objects.filter(post_parent_id__in=exchange_ids).values('post_parent_id').annotate(
+        **{field: Count(Case(When(post_type=post_type, then=1), output_field=IntegerField()))
+           for post_type, field in COUNTER_FIELDS.items()}
+    ).order_by()
+    return {row.pop('post_parent_id'): row for row in counts}
+
+
+def find_drifted_exchanges(batch_size=1000):
+    """
+        Yields exchanges whose stored counters differ from their posts, with the recounted values set
+    """
+    from .models import Exchange
+    fields = list(COUNTER_FIELDS.values())
+    last_id = 0
+    while True:
+        exchanges = list(Exchange.objects.filter(id__gt=last_id).order_by('id').only('id', *fields)[:batch_size])
+        if not exchanges:
+            return
+        last_id = exchanges[-1].id
+        counts = count_exchange_posts([exchange.id for exchange in exchanges])
+        for exchange in exchanges:
+            recount = counts.get(exchange.id, {})
+            drifted = False
+            for field in fields:
+                if getattr(exchange, field) != recount.get(field, 0):
+                    setattr(exchange, field, recount.get(field, 0))
+                    drifted = True
+            if drifted:
+                yield exchange
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from base.utils import bulk_update
+from exchanges.counters import COUNTER_FIELDS, find_drifted_exchanges
+from exchanges.models import Exchange
+
+
+class Command(BaseCommand):
+    help = 'Recount supply, demand and post counters of exchanges and fix the drifted ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report the drifted exchanges')
+
+    def handle(self, *args, **options):
+        fields = list(COUNTER_FIELDS.values())
+        drifted = []
+        total = 0
+        for exchange in find_drifted_exchanges(options['batch_size']):
+            self.stdout.write('%s: %s' % (exchange.id, ', '.join(
+                '%s=%s' % (field, getattr(exchange, field)) for field in fields)))
+            drifted.append(exchange)
+            total += 1
+            if len(drifted) >= options['batch_size']:
+                if not options['dry_run']:
+                    bulk_update(Exchange, drifted, fields)
+                drifted = []
+        if drifted and not options['dry_run']:
+            bulk_update(Exchange, drifted, fields)
+        self.stdout.write('%s drifted exchanges %s' % (total, 'found' if options['dry_run'] else 'fixed'))
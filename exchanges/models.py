@@ -1,11 +1,12 @@
 from django.db import models
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_init, post_delete, pre_delete
 from django.contrib.auth.models import User
 from django.core.validators import MinLengthValidator
 
 from users.models import Identity
-from base.models import Base, Hashtag, BaseManager
-from base.signals import update_cache, set_child_name
+from base.models import Base, Hashtag, BaseManager, Post
+from base.signals import update_cache, set_child_name, update_profile_strength, update_member_feed
+from .counters import remember_counted_post, load_counted_post, update_post_counters, remove_post_counters
 from media.models import Media
 
 
@@ -62,6 +63,12 @@ class Exchange(Base):
 post_save.connect(update_cache, sender=Exchange)
 # Set Child Name
 pre_save.connect(set_child_name, sender=Exchange)
+# Keep Exchange Post Counters In Sync
+post_init.connect(remember_counted_post, sender=Post)
+pre_save.connect(load_counted_post, sender=Post)
+pre_delete.connect(load_counted_post, sender=Post)
+post_save.connect(update_post_counters, sender=Post)
+post_delete.connect(remove_post_counters, sender=Post)
 
 
 class ExchangeIdentity(Base):
@@ -101,3 +108,8 @@ class ExchangeIdentity(Base):
 post_save.connect(update_cache, sender=ExchangeIdentity)
 # Set Child Name
 pre_save.connect(set_child_name, sender=ExchangeIdentity)
+# Score Profile Strength
+post_save.connect(update_profile_strength, sender=ExchangeIdentity)
+# Rebuild Feed Of Member
+post_save.connect(update_member_feed, sender=ExchangeIdentity)
+post_delete.connect(update_member_feed, sender=ExchangeIdentity)
@@ -1,8 +1,7 @@
-from django.contrib.auth.models import User
 from rest_framework import permissions
 
+from base.access import get_access_context
 from users.models import Identity, AgentRequest
-from organizations.models import Organization
 from .models import ExchangeIdentity, Exchange
 
 
@@ -11,25 +10,12 @@ class IsExchangeOwnerOrReadOnly(permissions.BasePermission):
         if request.method == "POST":
             if 'owner' in request.POST:
                 identity_id = request.POST.get('owner')
-                try:
-                    identity = Identity.objects.get(pk=identity_id)
-                except Identity.DoesNotExist:
-                    return False
-                if identity.identity_user is None:
-                    try:
-                        organization = Organization.objects.get(pk=identity.identity_organization)
-                    except Organization.DoesNotExist:
-                        return False
-                    if organization.owner == request.user or request.user.is_superuser:
-                        return True
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(identity_id)
+                if owner_name != 'identity':
                     return False
-                else:
-                    try:
-                        user = User.objects.get(pk=identity.identity_user)
-                    except User.DoesNotExist:
-                        return False
-                    if user == request.user or request.user.is_superuser:
-                        return True
+                if context.is_owner(identity_id, ('identity',)) or request.user.is_superuser:
+                    return True
                 return False
             else:
                 return True
@@ -38,11 +24,8 @@ class IsExchangeOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method == "GET":
             return True
-        elif obj.owner.identity_organization is None:
-            if request.user == obj.owner.identity_user or request.user.is_superuser:
-                return True
-        elif request.user == obj.owner.identity_organization.owner or request.user.is_superuser:
-                return True
+        if request.user.is_superuser or get_access_context(request).is_owner(obj.owner_id, ('identity',)):
+            return True
         return False
 
 
@@ -104,7 +87,7 @@ class IsAgentOrReadOnly(permissions.BasePermission):
                 except Identity.DoesNotExist:
                     return False
             else:
-                identity = Identity.objects.get(identity_user=request.user)
+                identity = get_access_context(request).identity
             agent = AgentRequest.objects.filter(agent_request_identity=identity)
             if agent.count() != 0:
                 return True
@@ -133,7 +116,7 @@ class IsJoinedBefore(permissions.BasePermission):
         if view.action in ['create']:
             exchange_identity_related_identity = request.POST.get('exchange_identity_related_identity', None)
             if exchange_identity_related_identity is None:
-                exchange_identity_related_identity = Identity.objects.get(identity_user=request.user).id
+                exchange_identity_related_identity = get_access_context(request).identity.id
             exchange_identity = ExchangeIdentity.objects.filter(
                 exchange_identity_related_identity_id=exchange_identity_related_identity,
                 exchange_identity_related_exchange_id=request.POST.get('exchange_identity_related_exchange', None),
@@ -2,7 +2,7 @@ from rest_framework import serializers
 from base.serializers import BaseSerializer
 from organizations.serializers import FollowListSerializer
 from .models import Exchange, ExchangeIdentity
-from users.models import Identity, Profile, StrengthStates
+from users.models import Identity
 from users.serializers import IdentityMiniSerializer
 from base.models import Post
 
@@ -65,34 +65,16 @@ class ExchangeIdentitySerializer(BaseSerializer):
         if 'exchange_identity_related_identity' not in validated_data:
             identity = Identity.objects.get(identity_user=request.user)
             validated_data['exchange_identity_related_identity'] = identity
-        else:
-            identity = Identity.objects.get(pk=validated_data['exchange_identity_related_identity'])
         exchange_identity = ExchangeIdentity.objects.create(**validated_data)
         exchange_identity.save()
-        if identity.identity_user is not None:
-            self.check_exchange_identity_profile_strength(identity)
+        # profile strength follows the post_save signal, see users.strength
         return exchange_identity
 
-    def check_exchange_identity_profile_strength(self, identity):
-        request = self.context.get("request")
-        exchange_identity = ExchangeIdentity.objects.filter(exchange_identity_related_identity=identity)
-        try:
-            user_strength = StrengthStates.objects.get(strength_user=request.user)
-        except StrengthStates.DoesNotExist:
-            user_strength = StrengthStates.objects.create(strength_user=request.user)
-        if user_strength.exchange_obtained is False and exchange_identity.count() == 1:
-            try:
-                profile = Profile.objects.get(profile_user=request.user)
-            except Profile.DoesNotExist:
-                profile = Profile.objects.create(profile_user=request.user)
-            profile.profile_strength += 5
-            profile.save()
-            user_strength.exchange_obtained = True
-
 
 class ExploreSerializer(serializers.Serializer):
     exchange = ExchangeMiniSerializer()
     joint_follows = FollowListSerializer(many=True)
     is_joined = serializers.BooleanField(default=False)
+    members = serializers.IntegerField(default=0)
     supply = serializers.IntegerField(default=0)
     demand = serializers.IntegerField(default=0)
\ No newline at end of file
@@ -0,0 +1,60 @@
+from django.db.models import Count, Case, When, IntegerField
+
+from base.models import Post
+from organizations.graph import follow_graph
+from organizations.models import Follow
+from .models import ExchangeIdentity
+
+
+def get_explore_records(exchanges, identity):
+    # one grouped query per relation of the page, joined in memory
+    exchange_ids = [exchange.id for exchange in exchanges]
+
+    post_counts = Post.objects.filter(
+        post_parent_id__in=exchange_ids
+    ).values('post_parent_id').annotate(
+        supply=Count(Case(When(post_type='supply', then=1), output_field=IntegerField())),
+        demand=Count(Case(When(post_type='demand', then=1), output_field=IntegerField())),
+    ).order_by()
+    post_counts = {row['post_parent_id']: row for row in post_counts}
+
+    member_counts = ExchangeIdentity.objects.filter(
+        exchange_identity_related_exchange_id__in=exchange_ids,
+        active_flag=True
+    ).values('exchange_identity_related_exchange_id').annotate(
+        members=Count('id'),
+        joined=Count(Case(When(exchange_identity_related_identity=identity, then=1), output_field=IntegerField())),
+    ).order_by()
+    member_counts = {row['exchange_identity_related_exchange_id']: row for row in member_counts}
+
+    followed_ids = follow_graph.following(identity.id)
+    joint_members = ExchangeIdentity.objects.filter(
+        exchange_identity_related_exchange_id__in=exchange_ids,
+        exchange_identity_related_identity_id__in=list(followed_ids),
+        active_flag=True
+    ).values_list('exchange_identity_related_exchange_id', 'exchange_identity_related_identity_id')
+    joint_members = list(joint_members)
+    follows = Follow.objects.filter(
+        follow_follower=identity,
+        follow_accepted=True,
+        follow_followed_id__in={identity_id for exchange_id, identity_id in joint_members}
+    ).select_related('follow_followed', 'follow_follower')
+    follows = {follow.follow_followed_id: follow for follow in follows}
+    joint_follows = {}
+    for exchange_id, identity_id in joint_members:
+        if identity_id in follows:
+            joint_follows.setdefault(exchange_id, []).append(follows[identity_id])
+
+    records = []
+    for exchange in exchanges:
+        posts = post_counts.get(exchange.id, {})
+        members = member_counts.get(exchange.id, {})
+        records.append({
+            'exchange': exchange,
+            'joint_follows': joint_follows.get(exchange.id, []),
+            'is_joined': members.get('joined', 0) > 0,
+            'members': members.get('members', 0),
+            'supply': posts.get('supply', 0),
+            'demand': posts.get('demand', 0),
+        })
+    return records
@@ -1,6 +1,9 @@
+import hashlib
 import json
 
-from django.core.paginator import Paginator
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator, InvalidPage
 from django.http import Http404, JsonResponse
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -9,13 +12,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 
 from base.views import BaseModelViewSet
-from organizations.models import Follow
 from users.models import Identity
 from .models import Exchange, ExchangeIdentity
 from .permissions import IsExchangeOwnerOrReadOnly, IsExchangeFull, IsFirstDefaultExchange, IsAgentOrReadOnly, IsJoinedBefore
 from .serializers import ExchangeSerializer, ExchangeIdentitySerializer, ExchangeIdentityListViewSerializer, \
     ExchangeMiniSerializer, ExploreSerializer
-from base.models import Post
+from .utils import get_explore_records
 
 
 # Create your views here.
@@ -29,6 +31,7 @@ class ExchangeViewSet(BaseModelViewSet):
         IsFirstDefaultExchange,
         # IsAgentOrReadOnly
     ]
+    query_budget = {'explore': 10}
 
     def get_queryset(self):
         queryset = Exchange.objects.filter(delete_flag=False)
@@ -90,42 +93,49 @@ class ExchangeViewSet(BaseModelViewSet):
         methods=['get']
     )
     def explore(self, request):
-        page = self.request.query_params.get('page', 1)
-        limit = self.request.query_params.get('limit', 10)
         identity = Identity.objects.get(identity_user=request.user)
-        exchanges = Exchange.objects.filter(delete_flag=False)
+        cursor = self.request.query_params.get('cursor', None)
+        if cursor is not None and not cursor.isdigit():
+            return Response({"details": "invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = self.request.query_params.get('limit', '10')
+        limit = min(int(limit), 100) if limit.isdigit() and int(limit) > 0 else 10
+        page = self.request.query_params.get('page', '1')
         name = self.request.query_params.get('name', None)
+
+        # only the params used below, hashed to stay within the memcached key length
+        params = json.dumps([cursor, limit, page, name])
+        cache_key = 'exchange_explore:%s:%s' % (identity.id, hashlib.md5(params.encode('utf-8')).hexdigest())
+        if settings.EXPLORE_CACHE_TIMEOUT:
+            final = cache.get(cache_key)
+            if final is not None:
+                return Response(final, status=status.HTTP_200_OK)
+
+        exchanges = Exchange.objects.filter(delete_flag=False).select_related(
+            'owner', 'exchange_image', 'exchange_banner', 'exchange_hashtag').order_by('-id')
         if name is not None:
             exchanges = exchanges.filter(name__contains=name)
-        paginator = Paginator(exchanges, limit)
-        exchanges = paginator.page(page)
-        response = []
-        for exchange in exchanges:
-            explore = {'exchange': exchange}
-            exchange_idenitities = ExchangeIdentity.objects.filter(
-                exchange_identity_related_exchange=exchange,
-                active_flag=True,
-                delete_flag=False
-            ).values('exchange_identity_related_identity')
-            explore['joint_follows'] = Follow.objects.filter(
-                    follow_followed__in=exchange_idenitities,
-                    follow_follower=identity,
-                    delete_flag=False,
-                    follow_accepted=True
-                )
-            for exchange_idenitity in exchange_idenitities:
-                if identity.id == exchange_idenitity['exchange_identity_related_identity']:
-                    explore['is_joined'] = True
-            exchange_posts = Post.objects.filter(post_parent=exchange)
-            explore['supply'] = exchange_posts.filter(post_type='supply').count()
-            explore['demand'] = exchange_posts.filter(post_type='demand').count()
-            response.append(explore)
-        # serial = serializers.serialize('json', response)
-        serialize = ExploreSerializer(response, many=True)
+
+        # keyset pagination, cursor is the last exchange id of the previous page
+        if cursor is not None:
+            exchanges = list(exchanges.filter(id__lt=cursor)[:limit])
+            count = None
+        else:
+            paginator = Paginator(exchanges, limit)
+            try:
+                exchanges = list(paginator.page(page))
+            except InvalidPage:
+                return Response({"details": "invalid page"}, status=status.HTTP_404_NOT_FOUND)
+            count = paginator.count
+
+        serialize = ExploreSerializer(get_explore_records(exchanges, identity), many=True)
         final = {
             'results': serialize.data,
-            'count': Exchange.objects.filter(delete_flag=False).count()
+            'next': exchanges[-1].id if len(exchanges) == limit else None
         }
+        if count is not None:
+            final['count'] = count
+        if settings.EXPLORE_CACHE_TIMEOUT:
+            cache.set(cache_key, final, settings.EXPLORE_CACHE_TIMEOUT)
         return Response(final, status=status.HTTP_200_OK)
 
     @list_route(
@@ -1,14 +1,46 @@
+import hashlib
 import os
+import uuid
 
+from django.core.files.move import file_move_safe
 from django.core.files.storage import FileSystemStorage
 from django.urls import reverse
 
 
 class MediaStorage(FileSystemStorage):
+    """
+        Content addressed, files are saved as the sha256 of their content so a
+        duplicate upload reuses the stored file, see media.blobs for their references
+    """
     def _save(self, name, content):
-        if self.exists(name):
-            self.delete(name)
-        return super(MediaStorage, self)._save(name, content)
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        ext = os.path.splitext(name)[1].lower()
+        name = os.path.join(os.path.dirname(name), digest.hexdigest() + ext)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            # touched so the garbage collector sees it is in use again
+            os.utime(full_path, None)
+            return name
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        temp_path = '%s.%s.tmp' % (full_path, uuid.uuid4().hex)
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(content.temporary_file_path(), temp_path)
+        else:
+            with open(temp_path, 'wb') as f:
+                content.seek(0)
+                for chunk in content.chunks():
+                    f.write(chunk)
+        if self.file_permissions_mode is not None:
+            os.chmod(temp_path, self.file_permissions_mode)
+        # parallel saves of the same content write the same bytes, the last rename wins
+        os.replace(temp_path, full_path)
+        return name
 
     def get_available_name(self, name, max_length=None):
         return name
@@ -0,0 +1,96 @@
+import json
+import os
+
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from django.utils.timezone import now
+
+
+def get_blob_name(name):
+    return os.path.basename(name) if name else None
+
+
+def add_ref(name, amount=1, size=None, using=None):
+    from .models import MediaBlob
+    if not name:
+        return
+    updated = MediaBlob.objects.using(using).filter(name=name).update(
+        ref_count=F('ref_count') + amount, updated_time=now())
+    if updated or amount < 0:
+        return
+    try:
+        with transaction.atomic(using=using):
+            MediaBlob.objects.using(using).create(name=name, ref_count=amount, size=size)
+    except IntegrityError:
+        # created by a parallel upload of the same content
+        MediaBlob.objects.using(using).filter(name=name).update(ref_count=F('ref_count') + amount, updated_time=now())
+
+
+def move_ref(previous, current, using=None):
+    if previous == current:
+        return
+    add_ref(current, 1, using=using)
+    add_ref(previous, -1, using=using)
+
+
+def get_referenced_blob(instance):
+    if instance.pk is not None and not instance.delete_flag:
+        return get_blob_name(instance.file.name)
+    return None
+
+
+def remember_media_blob(sender, instance, **kwargs):
+    # deferred loads would cost a query per instance
+    if not instance.get_deferred_fields():
+        instance._referenced_blob = get_referenced_blob(instance)
+
+
+def load_media_blob(sender, instance, using=None, **kwargs):
+    # a deferred load has no snapshot, read what is stored before it is written or deleted
+    if hasattr(instance, '_referenced_blob') or instance.pk is None:
+        return
+    from .models import Media
+    row = Media._base_manager.using(using).filter(pk=instance.pk).values_list('file', 'delete_flag').first()
+    instance._referenced_blob = get_blob_name(row[0]) if row is not None and not row[1] else None
+
+
+def update_blob_refs(sender, instance, using=None, **kwargs):
+    current = get_referenced_blob(instance)
+    move_ref(getattr(instance, '_referenced_blob', None), current, using)
+    instance._referenced_blob = current
+
+
+def remove_blob_ref(sender, instance, using=None, **kwargs):
+    move_ref(getattr(instance, '_referenced_blob', None), None, using)
+    instance._referenced_blob = None
+
+
+def find_processed(name, usage):
+    """
+        Result of an earlier processing of the same original for the same usage
+    """
+    from .models import MediaBlob
+    blob = MediaBlob.objects.filter(name=get_blob_name(name)).only('derived').first()
+    if blob is None:
+        return None
+    return json.loads(blob.derived or '{}').get(usage or '')
+
+
+def remember_processed(name, usage, result):
+    from .models import MediaBlob
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(name=get_blob_name(name)).first()
+        if blob is None:
+            return
+        derived = json.loads(blob.derived or '{}')
+        derived[usage or ''] = result
+        MediaBlob.objects.filter(name=blob.name).update(derived=json.dumps(derived))
+
+
+def count_blob_refs():
+    from .models import Media
+    names = {}
+    for name in Media.objects.exclude(file='').exclude(file=None).values_list('file', flat=True).iterator():
+        name = get_blob_name(name)
+        names[name] = names.get(name, 0) + 1
+    return names
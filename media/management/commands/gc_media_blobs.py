@@ -0,0 +1,100 @@
+import glob
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+from media.blobs import count_blob_refs
+from media.models import MediaBlob, media_file_storage
+from media.utils import file_sha256
+from media.variants import get_variants_dir
+
+
+class Command(BaseCommand):
+    help = 'Remove stored media files no Media row references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=24,
+                            help='Hours a file stays unreferenced before it is removed')
+        parser.add_argument('--recount', action='store_true',
+                            help='Recount references from the Media rows first, registers files stored before blobs')
+        parser.add_argument('--orphans', action='store_true',
+                            help='Also remove files of the media directory no blob knows about, run after --recount')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def recount(self, dry_run):
+        counts = count_blob_refs()
+        fixed = 0
+        for blob in MediaBlob.objects.all().iterator():
+            count = counts.pop(blob.name, 0)
+            if blob.ref_count != count:
+                fixed += 1
+                if not dry_run:
+                    MediaBlob.objects.filter(name=blob.name).update(ref_count=count)
+        for name, count in counts.items():
+            fixed += 1
+            path = media_file_storage.path(name)
+            if not dry_run:
+                MediaBlob.objects.create(name=name, ref_count=count,
+                                         size=os.path.getsize(path) if os.path.exists(path) else None)
+        self.stdout.write('%s reference counts fixed' % fixed)
+
+    def remove_file(self, path):
+        # variants are named after the content of their source
+        prefix = file_sha256(path)[:32]
+        for variant in glob.glob(os.path.join(get_variants_dir(), prefix + '_*')):
+            os.remove(variant)
+        os.remove(path)
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        if options['recount']:
+            self.recount(dry_run)
+        cutoff = now() - timedelta(hours=options['min_age'])
+        cutoff_timestamp = time.time() - options['min_age'] * 60 * 60
+
+        removed = 0
+        freed = 0
+        names = MediaBlob.objects.filter(ref_count__lte=0, updated_time__lt=cutoff).values_list('name', flat=True)
+        for name in list(names):
+            with transaction.atomic():
+                blob = MediaBlob.objects.select_for_update().filter(
+                    name=name, ref_count__lte=0, updated_time__lt=cutoff).first()
+                if blob is None:
+                    continue
+                path = media_file_storage.path(name)
+                exists = os.path.exists(path)
+                # touched by a duplicate upload that has not added its reference yet
+                if exists and os.path.getmtime(path) > cutoff_timestamp:
+                    continue
+                removed += 1
+                freed += os.path.getsize(path) if exists else 0
+                self.stdout.write('removing %s' % name)
+                if not dry_run:
+                    blob.delete()
+                    if exists:
+                        self.remove_file(path)
+
+        if options['orphans']:
+            known = set(MediaBlob.objects.values_list('name', flat=True))
+            for entry in os.scandir(settings.MEDIA_DIR):
+                if not entry.is_file() or entry.name in known or entry.stat().st_mtime > cutoff_timestamp:
+                    continue
+                removed += 1
+                freed += entry.stat().st_size
+                self.stdout.write('removing orphan %s' % entry.name)
+                if not dry_run:
+                    self.remove_file(entry.path)
+
+        # chunked uploads nobody finished, their part and state files
+        upload_cutoff = time.time() - settings.MEDIA_UPLOAD_TIMEOUT
+        for pattern in ('*.part', '*.json', '*.tmp'):
+            for path in glob.glob(os.path.join(settings.MEDIA_DIR, 'uploads', pattern)):
+                if os.path.getmtime(path) < upload_cutoff and not dry_run:
+                    os.remove(path)
+
+        self.stdout.write('%s files %s, %s bytes' % (removed, 'found' if dry_run else 'removed', freed))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from media.models import Media
+from media.processing import PROCESSING, FAILED, load_info, process_file, save_result
+
+
+class Command(BaseCommand):
+    help = 'Process the uploads left in processing state, e.g. by a full queue or a restarted worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int)
+        parser.add_argument('--failed', action='store_true', help='Retry the failed uploads too')
+
+    def handle(self, *args, **options):
+        states = {PROCESSING, FAILED} if options['failed'] else {PROCESSING}
+        medias = Media.objects.filter(info__contains='"status": "')
+        if options['ids']:
+            medias = medias.filter(id__in=options['ids'])
+        done = 0
+        for media in medias.iterator():
+            info = load_info(media)
+            if info.get('status') not in states:
+                continue
+            try:
+                result = process_file(media.file.path, info.get('usage'))
+            except Exception as e:
+                result = {'status': FAILED, 'error': str(e)}
+            save_result(media.pk, result)
+            self.stdout.write('%s: %s' % (media.pk, result['status']))
+            done += 1
+        self.stdout.write('%s uploads processed' % done)
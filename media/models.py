@@ -6,14 +6,17 @@ from os.path import basename
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_init, post_delete, pre_delete
 
 from base.models import BaseManager, Base
 from base.signals import update_cache
 from media.MediaStorage import MediaStorage
+from .blobs import remember_media_blob, load_media_blob, update_blob_refs, remove_blob_ref
+from .utils import get_file_meta
 
 
 def get_upload_path(media, filename):
+    # MediaStorage renames it to the content hash when saving
     name, ext = os.path.splitext(filename)
     ext = ext.lower()
     return os.path.join(settings.MEDIA_DIR, uuid.uuid4().hex + ext)
@@ -55,13 +58,44 @@ class Media(models.Model):
 # Cache Model Data After Update
 post_save.connect(update_cache, sender=Media)
 
+# Count References Of Stored Files
+post_init.connect(remember_media_blob, sender=Media)
+pre_save.connect(load_media_blob, sender=Media)
+pre_delete.connect(load_media_blob, sender=Media)
+post_save.connect(update_blob_refs, sender=Media)
+post_delete.connect(remove_blob_ref, sender=Media)
+
+
+class MediaBlob(models.Model):
+    """
+        A stored file and the number of Media rows using it, files without references are
+        removed by the gc_media_blobs command
+    """
+    name = models.CharField(max_length=255, primary_key=True)
+    ref_count = models.IntegerField(default=0, db_index=True)
+    size = models.BigIntegerField(blank=True, null=True)
+    updated_time = models.DateTimeField(auto_now=True, db_index=True)
+    # processing results of this original per file_usage, reused by duplicate uploads
+    derived = models.TextField(default='{}')
 
-def update_meta(sender, instance, **kwargs):
-    post_save.disconnect(update_meta, sender=Media)
-    data = {'size': os.path.getsize(instance.file.path)}
+    def __str__(self):
+        return '%s (%s)' % (self.name, self.ref_count)
+
+
+def set_meta(sender, instance, **kwargs):
+    # read from the new file before it is stored, so the row is written once
+    if not instance.file:
+        return
+    data = json.loads(instance.info or '{}')
+    if instance.file._committed and 'size' in data:
+        return
+    if instance.file._committed and not os.path.exists(instance.file.path):
+        return
+    data.update(get_file_meta(instance.file))
+    if instance.file._committed:
+        instance.file.close()
     instance.info = json.dumps(data)
-    instance.save()
-    post_save.connect(update_meta, sender=Media)
 
 
-post_save.connect(update_meta, sender=Media)
+# Extract File Meta Before Insert
+pre_save.connect(set_meta, sender=Media)
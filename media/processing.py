@@ -0,0 +1,154 @@
+import json
+import logging
+import mimetypes
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from base.cache import invalidate_instance
+from .blobs import get_blob_name, move_ref, find_processed, remember_processed
+from .models import Media, media_file_storage
+from .utils import get_media_kind, compress_image, compress_video, file_sha256
+from .variants import make_upload_variants
+
+logger = logging.getLogger(__name__)
+
+PROCESSING = 'processing'
+READY = 'ready'
+FAILED = 'failed'
+
+
+def load_info(media):
+    try:
+        return json.loads(media.info or '{}')
+    except ValueError:
+        return {}
+
+
+def get_initial_info(name, usage=None):
+    # images and videos are stored as uploaded and compressed by the pool
+    if get_media_kind(name) is None:
+        return {'status': READY}
+    return {'status': PROCESSING, 'usage': usage}
+
+
+def schedule_processing(media):
+    info = load_info(media)
+    if info.get('status') != PROCESSING:
+        return
+    # a duplicate of an original processed before takes its result without processing
+    processed = find_processed(media.file.name, info.get('usage'))
+    if processed is not None and media_file_storage.exists(processed['file']):
+        apply_result(media, dict(processed))
+    else:
+        transaction.on_commit(lambda: media_processor.submit(media))
+
+
+def process_file(path, usage=None):
+    """
+        Compresses the stored original, runs in a pool process and touches files only
+    """
+    kind = get_media_kind(path)
+    temp = '%s.%s.processing' % (os.path.splitext(path)[0], uuid.uuid4().hex)
+    if kind == 'image':
+        temp += '.jpg'
+        info = compress_image(path, temp, usage)
+    elif kind == 'video':
+        temp += '.mp4'
+        info = compress_video(path, temp)
+    else:
+        return {'status': READY, 'size': os.path.getsize(path)}
+    # stored by content like MediaStorage does, the original is left to gc_media_blobs
+    target = os.path.join(os.path.dirname(path), file_sha256(temp) + os.path.splitext(temp)[1])
+    if os.path.exists(target):
+        os.remove(temp)
+    else:
+        os.replace(temp, target)
+    if kind == 'image':
+        info['variants'] = make_upload_variants(target, usage)
+    info.update({
+        'status': READY,
+        'size': os.path.getsize(target),
+        'mime_type': mimetypes.guess_type(target)[0],
+        'file': os.path.basename(target),
+    })
+    return info
+
+
+def apply_result(media, result):
+    # an update, the processed file must not go through the post_save handlers of an upload again
+    info = load_info(media)
+    info.pop('error', None)
+    info.update(result)
+    file_name = info.pop('file', None)
+    with transaction.atomic():
+        if file_name:
+            if result.get('status') == READY:
+                remember_processed(media.file.name, info.get('usage'), result)
+            if not media.delete_flag:
+                move_ref(get_blob_name(media.file.name), file_name)
+            media.file.name = os.path.join(os.path.dirname(media.file.name), file_name)
+            media._referenced_blob = None if media.delete_flag else file_name
+        media.info = json.dumps(info)
+        Media._base_manager.filter(pk=media.pk).update(file=media.file.name, info=media.info)
+    invalidate_instance(media)
+
+
+def save_result(pk, result):
+    media = Media._base_manager.filter(pk=pk).first()
+    if media is not None:
+        apply_result(media, result)
+
+
+class MediaProcessor(object):
+    """
+        Bounded process pool compressing uploads out of the request, jobs over
+        MEDIA_PROCESSING_QUEUE stay in processing state for the process_media command
+    """
+    def __init__(self):
+        self.executor = None
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=settings.MEDIA_PROCESSING_WORKERS)
+        return self.executor
+
+    def submit(self, media):
+        with self.lock:
+            if self.pending >= settings.MEDIA_PROCESSING_QUEUE:
+                logger.warning('media processing queue is full, %s is left to process_media', media.pk)
+                return False
+            try:
+                future = self._get_executor().submit(process_file, media.file.path, load_info(media).get('usage'))
+            except BrokenProcessPool:
+                self.executor = None
+                future = self._get_executor().submit(process_file, media.file.path, load_info(media).get('usage'))
+            self.pending += 1
+        submitter = threading.get_ident()
+        future.add_done_callback(lambda done: self.finish(media.pk, done, submitter))
+        return True
+
+    def finish(self, pk, future, submitter):
+        with self.lock:
+            self.pending -= 1
+        try:
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.exception('processing media %s failed', pk)
+                result = {'status': FAILED, 'error': str(e)}
+            save_result(pk, result)
+        finally:
+            # callbacks of the pool run in its management thread, which has its own connection
+            if threading.get_ident() != submitter:
+                connection.close()
+
+
+media_processor = MediaProcessor()
@@ -1,4 +1,5 @@
 import base64
+import json
 
 from django.core.files.base import ContentFile
 from rest_framework.serializers import ModelSerializer, CharField
@@ -7,7 +8,7 @@ from .models import Media
 from users.models import Identity
 from django.contrib.auth.models import User
 
-from .utils import compress_video, compress_image
+from .processing import get_initial_info, schedule_processing
 
 
 class MediaSeriaizer(ModelSerializer):
@@ -31,13 +32,11 @@ class MediaSeriaizer(ModelSerializer):
         format, imgstr = data.split(';base64,')
         ext = format.split('/')[-1]
         validated_data['file'] = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-        if ext == 'mp4' or ext == 'avi' or ext == 'webm':
-            validated_data['file'] = compress_video(validated_data['file'])
-        elif ext == 'jpeg' or ext == 'png':
-            validated_data['file'] = compress_image(image=validated_data['file'], usage=validated_data.get('file_usage'))
-        if 'file_usage' in validated_data:
-            validated_data.pop('file_usage')
+        usage = validated_data.pop('file_usage', None)
+        # the original is stored as is, compression runs in the media processing pool
+        validated_data['info'] = json.dumps(get_initial_info(validated_data['file'].name, usage))
         media = Media.objects.create(**validated_data)
+        schedule_processing(media)
         return media
 
 
@@ -1,3 +1,94 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .uploads import ChunkedUpload, UploadError
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class ServeVariantTestCase(TestCase):
+    """
+        Each format of a variant is validated by its own ETag
+    """
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, 'media'))
+        self.name = '%s.png' % ('a' * 32)
+        Image.new('RGB', (400, 300), (200, 40, 40)).save(os.path.join(self.root, 'media', self.name))
+        settings = override_settings(SENDFILE_ROOT=self.root, MEDIA_DIR=os.path.join(self.root, 'media'),
+                                     SENDFILE_BACKEND='sendfile.backends.simple', CACHES=TEST_CACHES)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get(self, accept, **headers):
+        return self.client.get('/media/%s' % self.name, {'variant': 'list'}, HTTP_ACCEPT=accept, **headers)
+
+    def test_formats_have_different_etags(self):
+        jpeg = self.get('image/jpeg')
+        webp = self.get('image/webp')
+        self.assertEqual(jpeg.status_code, 200)
+        self.assertEqual(webp.status_code, 200)
+        self.assertNotEqual(jpeg['ETag'], webp['ETag'])
+
+    def test_other_format_etag_is_not_modified(self):
+        jpeg_etag = self.get('image/jpeg')['ETag']
+        self.assertEqual(self.get('image/jpeg', HTTP_IF_NONE_MATCH=jpeg_etag).status_code, 304)
+        response = self.get('image/webp', HTTP_IF_NONE_MATCH=jpeg_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+
+    def test_range_with_other_format_etag_sends_whole_file(self):
+        jpeg_etag = self.get('image/jpeg')['ETag']
+        response = self.get('image/webp', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=jpeg_etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.get('image/webp', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=response['ETag'])
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'].split('/')[0], 'bytes 0-9')
+
+
+class ChunkedUploadTestCase(TestCase):
+    """
+        An upload resumes from its state file when the cache lost it
+    """
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(MEDIA_DIR=self.root, CACHES=TEST_CACHES)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user('uploader', 'uploader@example.com', 'password')
+        self.content = b'0123456789' * 10
+
+    def start(self):
+        return ChunkedUpload.start(self.user, 'notes.txt', len(self.content),
+                                   hashlib.sha256(self.content).hexdigest(), usage=None, file_related_parent=None)
+
+    def test_resumes_after_cache_loss(self):
+        upload = self.start()
+        upload.write_chunk(io.BytesIO(self.content[:40]), 0, 40)
+        cache.clear()
+        upload = ChunkedUpload.get(upload.token, self.user)
+        self.assertEqual(upload.state()['offset'], 40)
+        upload.write_chunk(io.BytesIO(self.content[40:]), 40, 60)
+        cache.clear()
+        name = ChunkedUpload.get(upload.token, self.user).finish()
+        with open(name, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+        with self.assertRaises(UploadError):
+            ChunkedUpload.get(upload.token, self.user)
+
+    def test_other_user_can_not_resume(self):
+        upload = self.start()
+        cache.clear()
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        with self.assertRaises(UploadError):
+            ChunkedUpload.get(upload.token, other)
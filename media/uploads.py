@@ -0,0 +1,163 @@
+import fcntl
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .utils import file_sha256
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, detail, status_code=400):
+        super(UploadError, self).__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def upload_key(token):
+    return 'upload:%s' % token
+
+
+def get_part_path(token):
+    # next to the stored files so finalizing is a rename on the same file system
+    return os.path.join(settings.MEDIA_DIR, 'uploads', token + '.part')
+
+
+def get_state_path(token):
+    return os.path.join(settings.MEDIA_DIR, 'uploads', token + '.json')
+
+
+def read_state(token):
+    # the state file outlives a cache restart or eviction, it expires like the cached copy
+    path = get_state_path(token)
+    try:
+        if os.path.getmtime(path) < time.time() - settings.MEDIA_UPLOAD_TIMEOUT:
+            return None
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class ChunkedUpload(object):
+    """
+        Resumable upload written chunk by chunk to a part file, the offset is the size of that file.
+        Its state is kept in a json file next to the part and read through the cache.
+    """
+    def __init__(self, token, data):
+        self.token = token
+        self.data = data
+
+    @classmethod
+    def start(cls, user, name, size, sha256, **extra):
+        if not name or not os.path.splitext(name)[1]:
+            raise UploadError('name with an extension is required')
+        if size <= 0 or size > settings.MEDIA_UPLOAD_MAX_SIZE:
+            raise UploadError('size must be between 1 and %s' % settings.MEDIA_UPLOAD_MAX_SIZE)
+        if not sha256 or len(sha256) != 64:
+            raise UploadError('sha256 of the file is required')
+        upload = cls(uuid.uuid4().hex, dict(extra, user=user.id, name=name, size=size, sha256=sha256.lower()))
+        os.makedirs(os.path.dirname(upload.path), exist_ok=True)
+        open(upload.path, 'wb').close()
+        upload.save()
+        return upload
+
+    @classmethod
+    def get(cls, token, user):
+        data = cache.get(upload_key(token))
+        if data is None:
+            data = read_state(token)
+            if data is not None:
+                cache.set(upload_key(token), data, settings.MEDIA_UPLOAD_TIMEOUT)
+        if data is None or data['user'] != user.id:
+            raise UploadError('upload not found', 404)
+        return cls(token, data)
+
+    def save(self):
+        path = get_state_path(self.token)
+        temp = '%s.%s.tmp' % (path, uuid.uuid4().hex)
+        with open(temp, 'w') as f:
+            json.dump(self.data, f)
+        # readers never see a half written state
+        os.replace(temp, path)
+        cache.set(upload_key(self.token), self.data, settings.MEDIA_UPLOAD_TIMEOUT)
+
+    def delete_state(self):
+        cache.delete(upload_key(self.token))
+        if os.path.exists(get_state_path(self.token)):
+            os.remove(get_state_path(self.token))
+
+    @property
+    def path(self):
+        return get_part_path(self.token)
+
+    @property
+    def offset(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def state(self):
+        return {
+            'token': self.token,
+            'offset': self.offset,
+            'size': self.data['size'],
+            'chunk_size': settings.MEDIA_UPLOAD_CHUNK_SIZE,
+        }
+
+    def write_chunk(self, stream, offset, length, sha256=None):
+        """
+            Appends length bytes read from stream in small blocks, a chunk failing its sha256 is dropped
+        """
+        if length <= 0 or length > settings.MEDIA_UPLOAD_CHUNK_SIZE:
+            raise UploadError('chunks must be between 1 and %s bytes' % settings.MEDIA_UPLOAD_CHUNK_SIZE, 413)
+        if offset + length > self.data['size']:
+            raise UploadError('chunk ends after the declared size')
+        with open(self.path, 'r+b') as f:
+            # parallel retries of one chunk must not interleave
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0, os.SEEK_END)
+            if f.tell() != offset:
+                raise UploadError('expected offset %s' % f.tell(), 409)
+            digest = hashlib.sha256()
+            remaining = length
+            while remaining:
+                block = stream.read(min(READ_SIZE, remaining)) if stream is not None else b''
+                if not block:
+                    break
+                digest.update(block)
+                f.write(block)
+                remaining -= len(block)
+            if remaining or sha256 and digest.hexdigest() != sha256.lower():
+                f.truncate(offset)
+                raise UploadError('chunk is incomplete or does not match its sha256')
+        self.save()
+        return self.offset
+
+    def finish(self):
+        """
+            Verifies the whole file and moves it to its content addressed name, returns that name
+        """
+        if self.offset != self.data['size']:
+            raise UploadError('%s of %s bytes received' % (self.offset, self.data['size']), 409)
+        if file_sha256(self.path) != self.data['sha256']:
+            self.discard()
+            raise UploadError('file does not match its sha256, upload it again')
+        name = os.path.join(settings.MEDIA_DIR, self.data['sha256'] + os.path.splitext(self.data['name'])[1].lower())
+        if os.path.exists(name):
+            # a duplicate, only its Media row is added
+            os.remove(self.path)
+            os.utime(name, None)
+        else:
+            os.replace(self.path, name)
+        self.delete_state()
+        return name
+
+    def discard(self):
+        self.delete_state()
+        if os.path.exists(self.path):
+            os.remove(self.path)
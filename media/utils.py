@@ -1,36 +1,79 @@
+import hashlib
+import mimetypes
 import os
 from PIL import Image
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-from moviepy.editor import *
-import sys
-
-
-def compress_video(file):
-    clip = VideoFileClip(file)
-    clip = clip.resize(width=854, height=480)
-    clip = clip.volumex(0.8)
-    compressed_file = clip.write_videofile(get_file_name(file) + "_edited.mp4", codec='libx264')
-    return compressed_file
-
-
-def compress_image(image, usage):
-    # Opening the uploaded image
-    im = Image.open(image)
-    output = BytesIO()
-    if usage == 'profile_media' or usage == 'organization_logo':
-        # Resize/modify the image
-        # im = im.resize((100, 100))
-        # after modifications, save it to the output
-        im.save(output, format='JPEG', quality=50)
-    elif usage == 'profile_banner' or usage == 'organization_banner':
-        # after modifications, save it to the output
-        im.save(output, format='JPEG', quality=80)
-    else:
-        # after modifications, save it to the output
-        im.save(output, format='JPEG', quality=100)
-    output.seek(0)
-    return InMemoryUploadedFile(output, 'ImageField', "%s.jpg" % image.name.split('.')[0], 'image/jpeg', sys.getsizeof(output), None)
+
+IMAGE_EXTENSIONS = ('.jpeg', '.jpg', '.png')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.webm')
+# jpeg quality of each file_usage, anything else is kept at full quality
+IMAGE_QUALITY = {
+    'profile_media': 50,
+    'organization_logo': 50,
+    'profile_banner': 80,
+    'organization_banner': 80,
+}
+
+
+def get_media_kind(name):
+    ext = os.path.splitext(name)[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return 'image'
+    if ext in VIDEO_EXTENSIONS:
+        return 'video'
+    return None
+
+
+def compress_video(source, target):
+    from moviepy.editor import VideoFileClip
+    clip = VideoFileClip(source)
+    try:
+        clip = clip.resize(width=854, height=480)
+        clip = clip.volumex(0.8)
+        clip.write_videofile(target, codec='libx264', verbose=False, progress_bar=False)
+        return {'width': clip.w, 'height': clip.h, 'duration': clip.duration}
+    finally:
+        clip.close()
+
+
+def compress_image(source, target, usage):
+    im = Image.open(source)
+    if im.mode not in ('RGB', 'L'):
+        im = im.convert('RGB')
+    im.save(target, format='JPEG', quality=IMAGE_QUALITY.get(usage, 100))
+    return {'width': im.width, 'height': im.height}
+
+
+def get_video_duration(path):
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    return ffmpeg_parse_infos(path).get('duration')
+
+
+def get_file_meta(file):
+    """
+        Size, mime type and image dimensions of a django File, and the duration of videos already on disk
+    """
+    meta = {'size': file.size, 'mime_type': mimetypes.guess_type(file.name)[0]}
+    kind = get_media_kind(file.name)
+    try:
+        if kind == 'image':
+            file.seek(0)
+            # only the header is read
+            meta['width'], meta['height'] = Image.open(file).size
+            file.seek(0)
+        elif kind == 'video' and getattr(file, 'path', None) and os.path.exists(file.path):
+            meta['duration'] = get_video_duration(file.path)
+    except Exception:
+        # unreadable files are stored as they are, processing reports them
+        pass
+    return meta
+
+
+def file_sha256(path, read_size=64 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(read_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 def get_file_name(file):
@@ -0,0 +1,83 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image, ImageOps
+
+from .utils import file_sha256
+
+# name: (width, height, crop), not cropped variants fit inside the box
+VARIANTS = {
+    'avatar': (96, 96, True),
+    'list': (320, 320, False),
+    'banner': (1280, 320, True),
+}
+FORMATS = {
+    'jpeg': ('JPEG', '.jpg', 'image/jpeg'),
+    'webp': ('WEBP', '.webp', 'image/webp'),
+}
+# variants made while processing an upload, the others are made on their first request
+UPLOAD_VARIANTS = {
+    'profile_media': ('avatar', 'list'),
+    'organization_logo': ('avatar', 'list'),
+    'profile_banner': ('banner',),
+    'organization_banner': ('banner',),
+}
+VARIANT_QUALITY = 85
+
+
+def get_variants_dir():
+    return os.path.join(settings.MEDIA_DIR, 'variants')
+
+
+def get_source_hash(path):
+    # stored names never change content, the mtime guards files replaced by processing
+    key = 'media_hash:%s:%s' % (os.path.basename(path), int(os.path.getmtime(path)))
+    digest = cache.get(key)
+    if digest is None:
+        digest = file_sha256(path)
+        cache.set(key, digest, settings.CACHE_TIMEOUT)
+    return digest
+
+
+def get_variant_path(source_hash, variant, format):
+    # named by the source content so identical uploads share their variants
+    return os.path.join(get_variants_dir(), '%s_%s%s' % (source_hash[:32], variant, FORMATS[format][1]))
+
+
+def make_variant(source, target, variant, format):
+    width, height, crop = VARIANTS[variant]
+    im = Image.open(source)
+    if im.mode not in ('RGB', 'L'):
+        im = im.convert('RGB')
+    if crop:
+        im = ImageOps.fit(im, (width, height), Image.LANCZOS)
+    else:
+        im.thumbnail((width, height), Image.LANCZOS)
+    temp = '%s.%s.tmp' % (target, uuid.uuid4().hex)
+    im.save(temp, format=FORMATS[format][0], quality=VARIANT_QUALITY)
+    # readers never see a half written variant
+    os.replace(temp, target)
+
+
+def get_variant(source, variant, format='jpeg', source_hash=None):
+    """
+        Path of the variant of source, made on first use
+    """
+    target = get_variant_path(source_hash or get_source_hash(source), variant, format)
+    if not os.path.exists(target):
+        os.makedirs(get_variants_dir(), exist_ok=True)
+        make_variant(source, target, variant, format)
+    return target
+
+
+def make_upload_variants(source, usage):
+    # runs in the media processing pool, hashes the file itself instead of going through the cache
+    made = []
+    source_hash = file_sha256(source) if usage in UPLOAD_VARIANTS else None
+    for variant in UPLOAD_VARIANTS.get(usage, ()):
+        for format in FORMATS:
+            get_variant(source, variant, format, source_hash)
+        made.append(variant)
+    return made
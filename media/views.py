@@ -1,15 +1,38 @@
+import json
+import mimetypes
 import os
+import re
 
 from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
 
+from rest_framework import status
+from rest_framework.decorators import detail_route, list_route
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
 from sendfile import sendfile
 
+from base.models import Base
 from base.permissions import IsOwnerOrReadOnly
+from users.models import Identity
 from .serializers import MediaSeriaizer
 from .models import Media
+from .processing import load_info, get_initial_info, schedule_processing
+from .uploads import ChunkedUpload, UploadError
+from .utils import get_media_kind
+from .variants import VARIANTS, FORMATS, get_variant
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# stored files and variants are named after their content
+CONTENT_NAME = re.compile(r'^[0-9a-f]{32,64}(_\w+)?$')
+# the others hand the file to the web server, which answers range requests itself
+LOCAL_SENDFILE_BACKENDS = (None, 'sendfile.backends.simple', 'sendfile.backends.development')
+READ_SIZE = 64 * 1024
 
 
 class MediaViewSet(ModelViewSet):
@@ -27,10 +50,199 @@ class MediaViewSet(ModelViewSet):
         queryset = Media.objects.all()
         return queryset
 
+    @detail_route(methods=['get'])
+    def status(self, request, pk=None):
+        """
+            Polled by clients until the uploaded file is processed
+        """
+        media = self.get_object()
+        info = load_info(media)
+        return Response({
+            'id': media.id,
+            'status': info.get('status'),
+            'info': info,
+            'file': media.file.url if media.file else None,
+        }, status=status.HTTP_200_OK)
+
+    @list_route(methods=['post'])
+    def uploads(self, request):
+        """
+            Starts a chunked upload of name, size and sha256, the file is sent to uploads/<token>/
+        """
+        size = str(request.data.get('size', ''))
+        parent = str(request.data.get('file_related_parent', ''))
+        if parent and not (parent.isdigit() and Base.objects.filter(id=parent).exists()):
+            return Response({"details": "file_related_parent not found"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            upload = ChunkedUpload.start(
+                request.user,
+                request.data.get('name'),
+                int(size) if size.isdigit() else 0,
+                request.data.get('sha256'),
+                usage=request.data.get('file_usage'),
+                file_related_parent=int(parent) if parent else None
+            )
+        except UploadError as e:
+            return Response({"details": e.detail}, status=e.status_code)
+        return Response(upload.state(), status=status.HTTP_201_CREATED)
+
+    @list_route(methods=['get', 'put', 'delete'], url_path='uploads/(?P<token>[0-9a-f]+)')
+    def upload_chunk(self, request, token=None):
+        """
+            GET returns the offset to resume from, PUT appends the raw body at the offset of
+            its Content-Range (or offset param), X-Chunk-SHA256 verifies the chunk
+        """
+        try:
+            upload = ChunkedUpload.get(token, request.user)
+            if request.method == 'DELETE':
+                upload.discard()
+                return Response({'message': 'upload discarded.'}, status=status.HTTP_200_OK)
+            if request.method == 'PUT':
+                offset = request.query_params.get('offset', '')
+                content_range = CONTENT_RANGE.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+                if content_range:
+                    offset = content_range.group(1)
+                length = request.META.get('CONTENT_LENGTH') or ''
+                if not offset.isdigit() or not length.isdigit():
+                    return Response({"details": "offset and Content-Length are required"},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                upload.write_chunk(request.stream, int(offset), int(length), request.META.get('HTTP_X_CHUNK_SHA256'))
+        except UploadError as e:
+            return Response({"details": e.detail}, status=e.status_code)
+        return Response(upload.state(), status=status.HTTP_200_OK)
+
+    @list_route(methods=['post'], url_path='uploads/(?P<token>[0-9a-f]+)/finalize')
+    def finalize_upload(self, request, token=None):
+        try:
+            upload = ChunkedUpload.get(token, request.user)
+            name = upload.finish()
+        except UploadError as e:
+            return Response({"details": e.detail}, status=e.status_code)
+        with transaction.atomic():
+            media = Media.objects.create(
+                file=name,
+                file_related_parent_id=upload.data['file_related_parent'],
+                identity=Identity.objects.filter(identity_user=request.user).first(),
+                uploader=request.user,
+                info=json.dumps(get_initial_info(name, upload.data['usage']))
+            )
+            schedule_processing(media)
+        return Response(MediaSeriaizer(media, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+
+def get_variant_format(request):
+    format = request.GET.get('format')
+    if format is None:
+        format = 'webp' if 'image/webp' in request.META.get('HTTP_ACCEPT', '') else 'jpeg'
+    if format not in FORMATS:
+        raise Http404
+    return format
+
+
+def get_etag(path, stat):
+    name = os.path.basename(path)
+    # the extension stays in the tag, the jpeg and webp copies of a variant share the hash
+    if CONTENT_NAME.match(os.path.splitext(name)[0]):
+        return '"%s"' % name
+    return '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+
+
+def is_not_modified(request, etag, stat):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags or 'W/' + etag in tags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE') or '')
+    return if_modified_since is not None and int(stat.st_mtime) <= if_modified_since
+
+
+def get_byte_range(request, etag, size):
+    """
+        (start, end) of a single satisfiable Range, None to send the whole file, False when unsatisfiable
+    """
+    match = BYTE_RANGE.match(request.META.get('HTTP_RANGE', '').strip())
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if match is None or if_range is not None and if_range.strip() != etag:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        # bytes=- is not a valid range, ignored
+        return None
+    if not start:
+        if not int(end):
+            return False
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    if end and int(end) < start:
+        # not a valid range, ignored
+        return None
+    if start >= size:
+        return False
+    return start, min(int(end), size - 1) if end else size - 1
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(READ_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def serve_file(request, path, attachment=False):
+    """
+        sendfile with validators, 304 answers, long lived caching and, for the backends
+        serving from django, 206 answers to range requests
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise Http404
+    etag = get_etag(path, stat)
+    byte_range = None
+    if settings.SENDFILE_BACKEND in LOCAL_SENDFILE_BACKENDS:
+        byte_range = get_byte_range(request, etag, stat.st_size)
+    if is_not_modified(request, etag, stat):
+        response = HttpResponseNotModified()
+    elif byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */%s' % stat.st_size
+    elif byte_range is not None:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_range(path, start, end - start + 1), status=206,
+                                         content_type=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        response['Content-Range'] = 'bytes %s-%s/%s' % (start, end, stat.st_size)
+        response['Content-Length'] = end - start + 1
+        if attachment:
+            response['Content-Disposition'] = 'attachment; filename="%s"' % os.path.basename(path)
+    else:
+        response = sendfile(request, path, attachment=attachment)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    # a stored name never gets other content
+    response['Cache-Control'] = 'public, max-age=%s, immutable' % settings.MEDIA_CACHE_MAX_AGE
+    return response
+
+
+def serve_variant(request, file_path, variant):
+    """
+        ?variant=avatar|list|banner serves a resized copy, as webp when asked by format or Accept
+    """
+    if variant not in VARIANTS or not os.path.exists(file_path):
+        raise Http404
+    response = serve_file(request, get_variant(file_path, variant, get_variant_format(request)))
+    response['Vary'] = 'Accept'
+    return response
+
 
 def serve(request, name):
     file_path = os.path.join(settings.SENDFILE_ROOT, 'media', os.path.basename(name))
+    variant = request.GET.get('variant')
+    if variant is not None and get_media_kind(name) == 'image':
+        return serve_variant(request, file_path, variant)
     p, ext = os.path.splitext(name)
-    if ext in ['.jpg', '.png']:
-        return sendfile(request, file_path)
-    return sendfile(request, file_path, attachment=True)
+    return serve_file(request, file_path, attachment=ext not in ['.jpg', '.png'])
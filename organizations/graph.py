@@ -0,0 +1,173 @@
+import uuid
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from base.cache import get_table_version, invalidation_bus
+from base.instrumentation import record_cache
+
+FOLLOWERS = 'followers'
+FOLLOWING = 'following'
+# memcached refuses items over 1MB, larger arrays are read from the database every time
+MAX_CACHED_BYTES = 1000 * 1000
+
+
+def version_key(direction, identity_id):
+    return 'follow_graph_version:%s:%s' % (direction, identity_id)
+
+
+def graph_key(direction, identity_id, table_version, version):
+    return 'follow_graph:%s:%s:%s:%s' % (table_version, direction, identity_id, version)
+
+
+def contains(ids, identity_id):
+    index = bisect_left(ids, identity_id)
+    return index < len(ids) and ids[index] == identity_id
+
+
+def intersection(first, second):
+    # merge of two sorted arrays
+    result = array('q')
+    i = j = 0
+    while i < len(first) and j < len(second):
+        if first[i] == second[j]:
+            result.append(first[i])
+            i += 1
+            j += 1
+        elif first[i] < second[j]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+class FollowGraph(object):
+    """
+        Accepted follows by identity as sorted id arrays. Each array is cached under a per identity
+        version that a follow change replaces, so an array loaded before the change committed is
+        never read again.
+    """
+    def _table(self):
+        from .models import Follow
+        return Follow._meta.db_table
+
+    def _use_cache(self):
+        # follows written by the running transaction are not committed to the cache yet
+        return not invalidation_bus.is_dirty(self._table())
+
+    def _load(self, direction, identity_ids):
+        from .models import Follow
+        if direction == FOLLOWERS:
+            key_field, value_field = 'follow_followed_id', 'follow_follower_id'
+        else:
+            key_field, value_field = 'follow_follower_id', 'follow_followed_id'
+        rows = Follow.objects.filter(
+            follow_accepted=True, **{'%s__in' % key_field: identity_ids}
+        ).values_list(key_field, value_field).order_by(key_field, value_field)
+        loaded = {identity_id: array('q') for identity_id in identity_ids}
+        for identity_id, other_id in rows:
+            ids = loaded[identity_id]
+            if not ids or ids[-1] != other_id:
+                ids.append(other_id)
+        return loaded
+
+    def get_many(self, direction, identity_ids):
+        identity_ids = {int(identity_id) for identity_id in identity_ids}
+        if not self._use_cache():
+            return self._load(direction, identity_ids)
+        table_version = get_table_version(self._table())
+        version_keys = {version_key(direction, identity_id): identity_id for identity_id in identity_ids}
+        versions = {version_keys[key]: version for key, version in cache.get_many(list(version_keys)).items()}
+        new_versions = {identity_id: uuid.uuid4().hex for identity_id in identity_ids if identity_id not in versions}
+        if new_versions:
+            # set before loading, a change committed after the load replaces it
+            cache.set_many({version_key(direction, identity_id): version
+                            for identity_id, version in new_versions.items()}, settings.CACHE_TIMEOUT)
+            versions.update(new_versions)
+        keys = {graph_key(direction, identity_id, table_version, versions[identity_id]): identity_id
+                for identity_id in identity_ids if identity_id not in new_versions}
+        result = {}
+        for key, data in cache.get_many(list(keys)).items():
+            ids = array('q')
+            ids.frombytes(data)
+            result[keys[key]] = ids
+        missing = identity_ids - set(result)
+        record_cache(len(result), len(missing))
+        if missing:
+            loaded = self._load(direction, missing)
+            cache.set_many({graph_key(direction, identity_id, table_version, versions[identity_id]): ids.tobytes()
+                            for identity_id, ids in loaded.items()
+                            if len(ids) * ids.itemsize <= MAX_CACHED_BYTES}, settings.CACHE_TIMEOUT)
+            result.update(loaded)
+        return result
+
+    def get(self, direction, identity_id):
+        if identity_id is None:
+            return array('q')
+        return self.get_many(direction, [identity_id])[int(identity_id)]
+
+    def followers(self, identity_id):
+        return self.get(FOLLOWERS, identity_id)
+
+    def following(self, identity_id):
+        return self.get(FOLLOWING, identity_id)
+
+    def is_following(self, follower_id, followed_id):
+        if follower_id is None or followed_id is None:
+            return False
+        return contains(self.following(follower_id), int(followed_id))
+
+    def mutual_followers(self, first_id, second_id):
+        return intersection(self.followers(first_id), self.followers(second_id))
+
+    def follower_count(self, identity_id):
+        return len(self.followers(identity_id))
+
+    def following_count(self, identity_id):
+        return len(self.following(identity_id))
+
+    def changed(self, follower_id, followed_id):
+        # a new version instead of patching the array, parallel changes of one identity can not lose each other
+        cache.set_many({
+            version_key(FOLLOWERS, followed_id): uuid.uuid4().hex,
+            version_key(FOLLOWING, follower_id): uuid.uuid4().hex,
+        }, settings.CACHE_TIMEOUT)
+
+
+follow_graph = FollowGraph()
+
+
+def get_edge(instance):
+    if instance.follow_accepted and not instance.delete_flag and instance.pk is not None:
+        return instance.follow_follower_id, instance.follow_followed_id
+    return None
+
+
+def remember_follow_edge(sender, instance, **kwargs):
+    # deferred loads would cost a query per instance
+    if not instance.get_deferred_fields():
+        instance._follow_edge = get_edge(instance)
+
+
+def change_follow_edge(instance, current, using=None):
+    previous = getattr(instance, '_follow_edge', None)
+    instance._follow_edge = current
+    if previous == current:
+        return
+
+    def apply():
+        for edge in (previous, current):
+            if edge is not None:
+                follow_graph.changed(*edge)
+    transaction.on_commit(apply, using=using)
+
+
+def update_follow_graph(sender, instance, using=None, **kwargs):
+    change_follow_edge(instance, get_edge(instance), using)
+
+
+def remove_follow_edge(sender, instance, using=None, **kwargs):
+    change_follow_edge(instance, None, using)
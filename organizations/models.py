@@ -1,13 +1,14 @@
 from django.db import models, transaction
 from django.core.validators import MinLengthValidator, MaxLengthValidator, RegexValidator
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_init, post_delete
 from django.contrib.auth.models import User
 from django.contrib.postgres.fields import ArrayField
 
 from danesh_boom.models import PhoneField
 from media.models import Media
 from base.models import Base, BaseManager
-from base.signals import update_cache, set_child_name
+from base.signals import update_cache, set_child_name, update_follower_feed
+from .graph import remember_follow_edge, update_follow_graph, remove_follow_edge
 
 
 class Organization(Base):
@@ -181,6 +182,13 @@ class Follow(Base):
 post_save.connect(update_cache, sender=Follow)
 # Set Child Name
 pre_save.connect(set_child_name, sender=Follow)
+# Keep Follow Graph In Sync
+post_init.connect(remember_follow_edge, sender=Follow)
+post_save.connect(update_follow_graph, sender=Follow)
+post_delete.connect(remove_follow_edge, sender=Follow)
+# Rebuild Feed Of Follower
+post_save.connect(update_follower_feed, sender=Follow)
+post_delete.connect(update_follower_feed, sender=Follow)
 
 
 class Ability(Base):
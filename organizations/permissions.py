@@ -1,7 +1,7 @@
 from rest_framework import permissions
 
-from users.models import Identity
-from .models import Organization, Follow
+from base.access import get_access_context
+from .models import Follow
 
 
 class IsStaffOrganizationOwnerOrReadOnly(permissions.BasePermission):
@@ -9,11 +9,11 @@ class IsStaffOrganizationOwnerOrReadOnly(permissions.BasePermission):
         if request.method == 'POST':
             organization_id = request.POST.get('staff_organization', None)
             if organization_id is not None:
-                try:
-                    organization_obj = Organization.objects.get(pk=organization_id)
-                except Organization.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(organization_id)
+                if owner_name != 'organization':
                     return False
-                if organization_obj.owner == request.user or request.user.is_superuser:
+                if context.is_owner(organization_id, ('organization',)) or request.user.is_superuser:
                     return True
             return False
         return True
@@ -30,11 +30,11 @@ class IsStaffCountOrganizationOwnerOrReadOnly(permissions.BasePermission):
         if request.method == 'POST':
             organization_id = request.POST.get('staff_count_organization', None)
             if organization_id is not None:
-                try:
-                    organization_obj = Organization.objects.get(pk=organization_id)
-                except Organization.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(organization_id)
+                if owner_name != 'organization':
                     return False
-                if organization_obj.owner == request.user or request.user.is_superuser:
+                if context.is_owner(organization_id, ('organization',)) or request.user.is_superuser:
                     return True
             return False
         return True
@@ -51,11 +51,11 @@ class IsPictureOrganizationOwnerOrReadOnly(permissions.BasePermission):
         if request.method == 'POST':
             organization_id = request.POST.get('picture_organization', None)
             if organization_id is not None:
-                try:
-                    organization_obj = Organization.objects.get(pk=organization_id)
-                except Organization.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(organization_id)
+                if owner_name != 'organization':
                     return False
-                if organization_obj.owner == request.user or request.user.is_superuser:
+                if context.is_owner(organization_id, ('organization',)) or request.user.is_superuser:
                     return True
             return False
         return True
@@ -82,11 +82,11 @@ class IsCustomerOrganizationOwner(permissions.BasePermission):
             customer_active = request.POST.get('customer_active', None)
             if customer_active is not None:
                 customer_organization = request.POST.get('customer_organization', None)
-                try:
-                    organization = Organization.objects.get(pk=customer_organization)
-                except Organization.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(customer_organization)
+                if owner_name != 'organization':
                     return False
-                if request.user == organization.owner or request.user.is_superuser:
+                if context.is_owner(customer_organization, ('organization',)) or request.user.is_superuser:
                     return True
                 return False
             return True
@@ -94,7 +94,7 @@ class IsCustomerOrganizationOwner(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         if request.method != 'GET':
-            if request.user == obj.customer_organization.owner or request.user.is_superuser:
+            if get_access_context(request).is_owner(obj.customer_organization_id, ('organization',)) or request.user.is_superuser:
                 return True
             return False
         return True
@@ -111,13 +111,8 @@ class IsConfirmationOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method != 'GET':
             if obj.confirm_flag is False and request.POST.get('confirm_flag') is True:
-                confirmed_identity = Identity.objects.get(pk=obj.confirmation_confirmed.id)
-                if confirmed_identity.identity_user is not None:
-                    if confirmed_identity.identity_user == request.user or request.user.is_superuser:
-                        return True
-                else:
-                    if confirmed_identity.identity_organization.owner == request.user or request.user.is_superuser:
-                        return True
+                if get_access_context(request).is_owner(obj.confirmation_confirmed_id, ('identity',)) or request.user.is_superuser:
+                    return True
         if obj.confirmation_corroborant.identity_user == request.user or obj.confirmation_confirmed.identity_user == request.user or request.user.is_superuser:
             return True
         return False
@@ -128,11 +123,11 @@ class IsMetaDataOrganizationOwner(permissions.BasePermission):
         if request.method == 'POST':
             organization_id = request.POST.get('meta_organization')
             if organization_id.isdigit():
-                try:
-                    organization = Organization.objects.get(pk=organization_id)
-                except Organization.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(organization_id)
+                if owner_name != 'organization':
                     return False
-                if organization.owner == request.user or request.user.is_superuser:
+                if context.is_owner(organization_id, ('organization',)) or request.user.is_superuser:
                     return True
             return False
         return True
@@ -140,7 +135,7 @@ class IsMetaDataOrganizationOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method == "GET":
             return True
-        if obj.meta_organization.owner == request.user or request.user.is_superuser:
+        if get_access_context(request).is_owner(obj.meta_organization_id, ('organization',)) or request.user.is_superuser:
             return True
         return False
 
@@ -150,11 +145,11 @@ class IsAbilityOrganizationOwnerOrReadOnly(permissions.BasePermission):
         if request.method == 'POST':
             organization_id = request.POST.get('ability_organization', None)
             if organization_id is not None:
-                try:
-                    organization_obj = Organization.objects.get(pk=organization_id)
-                except Organization.DoesNotExist:
+                context = get_access_context(request)
+                owner_name, owner_id = context.get_owner(organization_id)
+                if owner_name != 'organization':
                     return False
-                if organization_obj.owner == request.user or request.user.is_superuser:
+                if context.is_owner(organization_id, ('organization',)) or request.user.is_superuser:
                     return True
             return False
         return True
@@ -206,12 +201,8 @@ class IsFollowedOrReadOnly(permissions.BasePermission):
                 return False
             follow_accepted = request.POST.get('follow_accepted', None)
             if follow_accepted is not None and (follow_accepted == 'true' or follow_accepted == '1') and follow.follow_accepted is False:
-                if follow.follow_followed.identity_user is not None:
-                    if request.user == follow.follow_followed.identity_user or request.user.is_superuser:
-                        return True
-                else:
-                    if request.user == follow.follow_followed.identity_organization.owner or request.user.is_superuser:
-                        return True
+                if get_access_context(request).is_owner(follow.follow_followed_id, ('identity',)) or request.user.is_superuser:
+                    return True
                 return False
             return True
         return True
@@ -239,14 +230,11 @@ class IsFollowerOwner(permissions.BasePermission):
     def has_permission(self, request, view):
         follow_follower = request.POST.get('follow_follower', None)
         if follow_follower is not None:
-            try:
-                identity = Identity.objects.get(pk=follow_follower)
-            except Identity.DoesNotExist:
+            context = get_access_context(request)
+            owner_name, owner_id = context.get_owner(follow_follower)
+            if owner_name != 'identity':
                 return False
-            if identity.identity_user is not None:
-                if identity.identity_user == request.user or request.user.is_superuser:
-                    return True
-            elif identity.identity_organization.owner == request.user or request.user.is_superuser:
+            if context.is_owner(follow_follower, ('identity',)) or request.user.is_superuser:
                 return True
             return False
         return True
\ No newline at end of file
@@ -1,5 +1,4 @@
 from rest_framework import serializers
-from django.contrib.auth.models import User
 from base.serializers import BaseSerializer
 from .models import (
     Organization,
@@ -13,7 +12,7 @@ from .models import (
     MetaData
 )
 from users.serializers import UserMiniSerializer, IdentityMiniSerializer
-from users.models import Identity, Profile, StrengthStates, WorkExperience
+from users.models import Identity, WorkExperience
 
 
 class OrganizationSerializer(BaseSerializer):
@@ -174,23 +173,8 @@ class FollowSerializer(BaseSerializer):
             validated_data['follow_follower'] = identity
         follow = Follow.objects.create(**validated_data)
         follow.save()
-        # self.check_follow_profile_strength(validated_data['follow_follower'])
         return follow
 
-    def check_follow_profile_strength(self, identity):
-        user = User.objects.get(pk=identity.identity_user_id)
-        follows = Follow.objects.filter(follow_follower=identity)
-        try:
-            user_strength = StrengthStates.objects.get(strength_user=user)
-        except StrengthStates.DoesNotExist:
-            user_strength = StrengthStates.objects.create(strength_user=user)
-        if user_strength.follow_obtained is False and follows.count() == 3:
-            profile = Profile.objects.get(profile_user=user)
-            profile.profile_strength += 5
-            profile.save()
-            user_strength.follow_obtained = True
-            user_strength.save()
-
 
 class FollowListSerializer(BaseSerializer):
     class Meta:
@@ -8,10 +8,12 @@ from rest_framework.response import Response
 
 import json
 
+from base.pagination import KeysetPagination
 from base.permissions import IsOwnerOrReadOnly
 from base.views import BaseModelViewSet
 from users.models import Identity
 
+from .graph import follow_graph, intersection
 from .permissions import (
     IsStaffOrganizationOwnerOrReadOnly,
     IsStaffCountOrganizationOwnerOrReadOnly,
@@ -390,6 +392,7 @@ class StaffViewset(BaseModelViewSet):
 class FollowViewset(BaseModelViewSet):
     permission_classes = [IsAuthenticated, IsAdminUserOrCanNotCreateAccepted, IsFollowedOrReadOnly,
                           IsAdminOrCanNotChangeIdentities, IsFollowerOwner]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = Follow.objects.filter(delete_flag=False)
@@ -442,13 +445,11 @@ class FollowViewset(BaseModelViewSet):
     def get_joint(self, request):
         followed_identity = self.request.query_params.get('followed_identity')
         if followed_identity is not None and followed_identity.isdigit():
-            followers = Follow.objects.filter(follow_followed_id=followed_identity)
-            followers_ids = []
-            for follower in followers:
-                followers_ids.append(follower.follow_follower_id)
+            followers_ids = follow_graph.followers(followed_identity)
             if len(followers_ids) != 0:
                 user_identity = Identity.objects.get(identity_user=self.request.user)
-                follower_joints = Follow.objects.filter(follow_follower=user_identity, follow_followed_id__in=followers_ids)
+                joint_ids = intersection(follow_graph.following(user_identity.id), followers_ids)
+                follower_joints = Follow.objects.filter(follow_follower=user_identity, follow_followed_id__in=list(joint_ids))
                 data = serializers.serialize('json', list(follower_joints), fields=('follow_followed',))
                 return Response(data, status=status.HTTP_200_OK)
         return Response({"details": "please filter by followed_identity"}, status=status.HTTP_400_BAD_REQUEST)
@@ -4,7 +4,7 @@ from django.contrib.postgres.fields import JSONField
 from django.contrib.auth.models import User
 
 from base.models import Base, BaseManager, BaseCountry, BaseTown, BaseProvince
-from base.signals import update_cache, set_child_name
+from base.signals import update_cache, set_child_name, update_search_document, update_autocomplete
 from media.models import Media
 from users.models import Identity
 
@@ -26,6 +26,8 @@ class Category(Base):
 post_save.connect(update_cache, sender=Category)
 # Set Child Name
 pre_save.connect(set_child_name, sender=Category)
+# Update Autocomplete Index
+post_save.connect(update_autocomplete, sender=Category)
 
 
 class CategoryField(Base):
@@ -84,6 +86,7 @@ class Product(Base):
     product_price_type = models.CharField(max_length=10, db_index=True, choices=PRICE_CHOICES, default='specified', help_text='specified | call')
 
     objects = BaseManager()
+    search_fields = (('name', 'A'), ('description', 'B'))
 
     def __str__(self):
         return self.name
@@ -93,6 +96,8 @@ class Product(Base):
 post_save.connect(update_cache, sender=Product)
 # Set Child Name
 pre_save.connect(set_child_name, sender=Product)
+# Update Search Index
+post_save.connect(update_search_document, sender=Product)
 
 
 class Price(Base):
@@ -9,7 +9,8 @@ from rest_framework.decorators import list_route, detail_route
 from rest_framework.response import Response
 
 from base.permissions import IsAdminUserOrReadOnly, IsOwnerOrReadOnly
-from base.views import BaseModelViewSet
+from base.pagination import KeysetPagination
+from base.views import BaseModelViewSet, SearchMixin
 from base.models import BaseCountry, BaseProvince, BaseTown
 from users.models import Identity
 from .permissions import (
@@ -151,7 +152,7 @@ class CategoryFieldViewset(BaseModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ProductViewset(BaseModelViewSet):
+class ProductViewset(SearchMixin, BaseModelViewSet):
     owner_field = 'product_user'
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly, IsProductOrganizationOwnerOrReadOnly]
 
@@ -215,7 +216,7 @@ class ProductViewset(BaseModelViewSet):
         return queryset
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ['list', 'search']:
             return ProductListViewSerializer
         elif self.action == 'retrieve':
             return ProductReadSerializer
@@ -396,6 +397,7 @@ class PictureViewset(BaseModelViewSet):
 
 class CommentViewset(BaseModelViewSet):
     permission_classes = [IsAuthenticated, IsCommentOwnerOrReadOnly]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = Comment.objects.filter(delete_flag=False)
@@ -0,0 +1,361 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+
+from base.models import BaseSocialType, BaseSocial
+from base.utils import bulk_create_base, bulk_update
+from .models import (
+    Identity,
+    Profile,
+    Setting,
+    Education,
+    Research,
+    WorkExperience,
+    Skill,
+    UserMetaData,
+    StrengthStates,
+    DefaultHeader
+)
+
+USER_FIELDS = {
+    'email': 'email',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+}
+
+PROFILE_FIELDS = {
+    'profile_national_code': 'national_code',
+    'profile_birth_date': 'birth_date',
+    'profile_description': 'description',
+    'profile_address': 'address',
+    'profile_public_email': 'public_email',
+    'profile_telegram_account': 'telegram_account',
+    'profile_instagram_account': 'instagram_account',
+    'profile_linkedin_account': 'linkedin_account',
+}
+
+EDUCATION_FIELDS = {
+    'education_average': 'average',
+    'education_description': 'description',
+}
+
+RESEARCH_FIELDS = {
+    'research_url': 'url',
+    'research_author': 'author',
+    'research_publication': 'publication',
+    'research_year': 'year',
+    'research_page_count': 'page_count',
+    'research_link': 'research_link',
+}
+
+WORK_EXPERIENCE_FIELDS = {
+    'work_experience_name': 'name',
+    'work_experience_position': 'position',
+}
+
+SKILL_FIELDS = {
+    'skill_tag': 'tag',
+    'skill_description': 'description',
+}
+
+META_TYPES = {
+    'phones': 'phone',
+    'mobiles': 'mobile',
+}
+
+
+def has_value(record, key):
+    return record.get(key, None) is not None and record.get(key, None) != ''
+
+
+def as_list(value):
+    # array fields are sent as '*' separated strings like phones
+    if isinstance(value, str):
+        return value.split('*')
+    return value
+
+
+def create_user_defaults(users, header_ids, batch_size=500, profile_values=None):
+    # the rows User.save and its post_save receivers would create one by one
+    users = list(users)
+    profile_values = profile_values or {}
+    bulk_create_base(Identity, [Identity(identity_user=user, name=user.username) for user in users], batch_size)
+    profiles = []
+    for user in users:
+        profile = Profile(profile_user=user, profile_secret_key=str(uuid.uuid4()))
+        if header_ids:
+            profile.profile_banner_id = random.choice(header_ids)
+        for field, value in profile_values.get(user.username, {}).items():
+            setattr(profile, field, value)
+        profiles.append(profile)
+    bulk_create_base(Profile, profiles, batch_size)
+    bulk_create_base(Setting, [Setting(setting_user=user) for user in users], batch_size)
+    bulk_create_base(StrengthStates, [StrengthStates(strength_user=user) for user in users], batch_size)
+
+
+def get_header_ids():
+    return list(DefaultHeader.objects.values_list('default_header_related_file_id', flat=True))
+
+
+class UserImporter(object):
+    """
+        Import users records chunk by chunk with bulk queries
+    """
+    def __init__(self, records, chunk_size=500, progress=None):
+        self.records = records
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.errors = []
+        self.summary = {
+            'records': len(records),
+            'users_created': 0,
+            'users_updated': 0,
+            'meta_data_created': 0,
+            'profiles_updated': 0,
+            'socials': 0,
+            'educations': 0,
+            'researches': 0,
+            'work_experiences': 0,
+            'skills': 0,
+        }
+        self.social_types = None
+        self.header_ids = None
+
+    def add_error(self, row, record, message):
+        self.errors.append({'row': row, 'data': record, 'status': message})
+
+    def run(self, start=0):
+        start_time = time.time()
+        self.social_types = {social_type.social_name: social_type for social_type in BaseSocialType.objects.all()}
+        self.header_ids = get_header_ids()
+        for chunk_start in range(start, len(self.records), self.chunk_size):
+            rows = list(enumerate(self.records[chunk_start:chunk_start + self.chunk_size], chunk_start))
+            try:
+                self.import_chunk(rows)
+            except Exception:
+                # one bad record fails the whole chunk, isolate it by importing row by row
+                for row, record in rows:
+                    try:
+                        self.import_chunk([(row, record)])
+                    except Exception as e:
+                        self.add_error(row, record, str(e))
+            done = chunk_start + len(rows)
+            if self.progress is not None:
+                self.progress(done, len(self.records), time.time() - start_time)
+        self.summary['errors'] = len(self.errors)
+        self.summary['seconds'] = round(time.time() - start_time, 3)
+        return self.errors
+
+    def import_chunk(self, rows):
+        errors_count = len(self.errors)
+        summary = dict(self.summary)
+        try:
+            with transaction.atomic():
+                self.import_rows(rows)
+        except Exception:
+            # the chunk is rolled back, so are its errors and counters
+            del self.errors[errors_count:]
+            self.summary = summary
+            raise
+
+    def import_rows(self, rows):
+        users = self.import_users(rows)
+        rows = [(row, record) for row, record in rows if row in users]
+        if not rows:
+            return
+        identities = dict(Identity.objects.filter(
+            identity_user__in=set(users.values())).values_list('identity_user_id', 'id'))
+        self.import_meta_data(rows, users)
+        self.import_profiles(rows, users)
+        self.import_socials(rows, users, identities)
+        self.summary['educations'] += self.upsert(
+            Education, 'education_user_id', rows, users,
+            lambda record: has_value(record, 'education_grade') and has_value(record, 'education_university') and
+            has_value(record, 'education_field_of_study') and has_value(record, 'education_from_date') and
+            has_value(record, 'education_to_date'),
+            {'grade': 'education_grade', 'university': 'education_university',
+             'field_of_study': 'education_field_of_study', 'from_date': 'education_from_date',
+             'to_date': 'education_to_date'},
+            EDUCATION_FIELDS)
+        self.summary['researches'] += self.upsert(
+            Research, 'research_user_id', rows, users,
+            lambda record: has_value(record, 'research_title'),
+            {'title': 'research_title'},
+            RESEARCH_FIELDS, defaults={'author': []})
+        self.summary['work_experiences'] += self.upsert(
+            WorkExperience, 'work_experience_user_id', rows, users,
+            lambda record: has_value(record, 'work_experience_organization') and
+            has_value(record, 'work_experience_from_date') and has_value(record, 'work_experience_to_date') and
+            has_value(record, 'work_experience_position'),
+            {'work_experience_organization_id': 'work_experience_organization',
+             'from_date': 'work_experience_from_date', 'to_date': 'work_experience_to_date'},
+            WORK_EXPERIENCE_FIELDS)
+        self.summary['skills'] += self.upsert(
+            Skill, 'skill_user_id', rows, users,
+            lambda record: has_value(record, 'skill_title'),
+            {'title': 'skill_title'},
+            SKILL_FIELDS, defaults={'tag': []})
+
+    def import_users(self, rows):
+        usernames = {record.get('username') for row, record in rows if has_value(record, 'username')}
+        existing = {user.username: user for user in User.objects.filter(username__in=usernames)}
+        # identity names are shared with organizations
+        taken_names = set(Identity._base_manager.filter(name__in=usernames - set(existing)).values_list('name', flat=True))
+        new_users = {}
+        updated_users = {}
+        row_usernames = {}
+        for row, record in rows:
+            if not has_value(record, 'username'):
+                self.add_error(row, record, 'this record have not username')
+                continue
+            username = record.get('username')
+            if username in taken_names:
+                self.add_error(row, record, 'identity with this name exist')
+                continue
+            if username in existing:
+                user = existing[username]
+                updated_users[username] = user
+            else:
+                user = new_users.setdefault(username, User(username=username))
+            if has_value(record, 'password'):
+                user.set_password(record.get('password'))
+            for key, field in USER_FIELDS.items():
+                if has_value(record, key):
+                    setattr(user, field, record.get(key))
+            row_usernames[row] = username
+
+        User.objects.bulk_create(new_users.values(), batch_size=self.chunk_size)
+        bulk_update(User, updated_users.values(), ['password', 'email', 'first_name', 'last_name'], self.chunk_size)
+        create_user_defaults(new_users.values(), self.header_ids, self.chunk_size)
+        self.summary['users_created'] += len(new_users)
+        self.summary['users_updated'] += len(updated_users)
+
+        users = dict(existing)
+        users.update(new_users)
+        return {row: users[username] for row, username in row_usernames.items()}
+
+    def import_meta_data(self, rows, users):
+        values = set()
+        for row, record in rows:
+            for key in META_TYPES:
+                if has_value(record, key):
+                    values.update(record.get(key).split('*'))
+        if not values:
+            return
+        counts = {}
+        for meta in UserMetaData.objects.filter(
+                user_meta_related_user__in=set(users.values()),
+                user_meta_type__in=META_TYPES.values()
+        ).values('user_meta_related_user_id', 'user_meta_type').annotate(count=Count('id')).order_by():
+            counts[(meta['user_meta_related_user_id'], meta['user_meta_type'])] = meta['count']
+        taken = set(UserMetaData.objects.filter(
+            user_meta_type__in=META_TYPES.values(),
+            user_meta_value__in=values
+        ).values_list('user_meta_type', 'user_meta_value'))
+
+        new_meta = []
+        for row, record in rows:
+            user = users[row]
+            for key, meta_type in META_TYPES.items():
+                if not has_value(record, key):
+                    continue
+                numbers = record.get(key).split('*')
+                if len(numbers) > 2:
+                    self.add_error(row, record, 'user can not have more that two ' + meta_type + ' number')
+                    continue
+                for number in numbers:
+                    if counts.get((user.id, meta_type), 0) >= 2:
+                        self.add_error(row, record, 'user can not have more that two ' + meta_type + ' number')
+                    elif (meta_type, number) in taken:
+                        self.add_error(row, record, 'user ' + meta_type + ' number exist')
+                    else:
+                        counts[(user.id, meta_type)] = counts.get((user.id, meta_type), 0) + 1
+                        taken.add((meta_type, number))
+                        new_meta.append(UserMetaData(user_meta_related_user=user, user_meta_type=meta_type,
+                                                     user_meta_value=number))
+        bulk_create_base(UserMetaData, new_meta, self.chunk_size)
+        self.summary['meta_data_created'] += len(new_meta)
+
+    def import_profiles(self, rows, users):
+        profiles = {profile.profile_user_id: profile for profile in Profile.objects.filter(
+            profile_user__in=set(users.values()))}
+        new_profiles = {}
+        changed_profiles = {}
+        changed_fields = set()
+        for row, record in rows:
+            user = users[row]
+            if user.id in profiles:
+                profile = profiles[user.id]
+            else:
+                profile = new_profiles.setdefault(user.id, Profile(profile_user=user, profile_secret_key=str(uuid.uuid4())))
+            for key, field in PROFILE_FIELDS.items():
+                if has_value(record, key):
+                    setattr(profile, field, record.get(key))
+                    changed_fields.add(field)
+                    if user.id in profiles:
+                        changed_profiles[user.id] = profile
+        bulk_create_base(Profile, new_profiles.values(), self.chunk_size)
+        bulk_update(Profile, changed_profiles.values(), changed_fields, self.chunk_size)
+        self.summary['profiles_updated'] += len(new_profiles) + len(changed_profiles)
+
+    def import_socials(self, rows, users, identities):
+        socials = {}
+        for social in BaseSocial.objects.filter(base_social_parent_id__in=identities.values()):
+            socials[(social.base_social_related_social_type_id, social.base_social_parent_id)] = social
+        new_socials = {}
+        changed_socials = {}
+        for row, record in rows:
+            if not has_value(record, 'social_name'):
+                continue
+            social_type = self.social_types.get(record.get('social_name'), None)
+            if social_type is None:
+                self.add_error(row, record, 'BaseSocialType matching query does not exist.')
+                continue
+            key = (social_type.id, identities[users[row].id])
+            if key in socials:
+                social = changed_socials.setdefault(key, socials[key])
+            else:
+                social = new_socials.setdefault(key, BaseSocial(base_social_related_social_type_id=key[0],
+                                                                base_social_parent_id=key[1]))
+            if has_value(record, 'base_social_value'):
+                social.base_social_value = record.get('base_social_value')
+        bulk_create_base(BaseSocial, new_socials.values(), self.chunk_size)
+        bulk_update(BaseSocial, changed_socials.values(), ['base_social_value'], self.chunk_size)
+        self.summary['socials'] += len(new_socials) + len(changed_socials)
+
+    def upsert(self, model, user_field, rows, users, is_valid, key_fields, value_fields, defaults=None):
+        # get or create every row by its natural key and set the given values
+        key_names = list(key_fields)
+        existing = {}
+        for obj in model.objects.filter(**{user_field + '__in': [user.id for user in users.values()]}):
+            existing[(getattr(obj, user_field),) + tuple(getattr(obj, name) for name in key_names)] = obj
+        new_objs = {}
+        changed_objs = {}
+        changed_fields = set()
+        for row, record in rows:
+            if not is_valid(record):
+                continue
+            key_values = {name: model._meta.get_field(name).to_python(record.get(key))
+                          for name, key in key_fields.items()}
+            key = (users[row].id,) + tuple(key_values[name] for name in key_names)
+            if key in existing:
+                obj = changed_objs.setdefault(key, existing[key])
+            else:
+                kwargs = dict(defaults or {}, **key_values)
+                kwargs[user_field] = users[row].id
+                obj = new_objs.setdefault(key, model(**kwargs))
+            for key_name, field in value_fields.items():
+                if has_value(record, key_name):
+                    value = record.get(key_name)
+                    if model._meta.get_field(field).get_internal_type() == 'ArrayField':
+                        value = as_list(value)
+                    setattr(obj, field, value)
+                    changed_fields.add(field)
+        bulk_create_base(model, new_objs.values(), self.chunk_size)
+        if changed_fields:
+            bulk_update(model, changed_objs.values(), changed_fields, self.chunk_size)
+        return len(new_objs) + len(changed_objs)
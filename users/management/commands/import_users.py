@@ -0,0 +1,40 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+
+from users.importers import UserImporter
+
+
+class Command(BaseCommand):
+    help = 'Import users from a json records file, resumable from the last committed chunk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--restart', action='store_true', help='Ignore the saved progress')
+
+    def handle(self, *args, **options):
+        with open(options['path']) as records_file:
+            records = json.load(records_file)
+        progress_path = options['path'] + '.progress'
+        state = {'offset': 0, 'errors': []}
+        if os.path.exists(progress_path) and not options['restart']:
+            with open(progress_path) as progress_file:
+                state = json.load(progress_file)
+            self.stdout.write('resuming from record %d' % state['offset'])
+
+        importer = UserImporter(records, options['chunk_size'])
+        importer.errors = state['errors']
+
+        def progress(done, total, seconds):
+            # chunks are committed one by one, save where to continue
+            with open(progress_path, 'w') as progress_file:
+                json.dump({'offset': done, 'errors': importer.errors}, progress_file)
+            rate = (done - state['offset']) / seconds if seconds else 0
+            self.stdout.write('%d/%d records, %.1f records/sec' % (done, total, rate))
+
+        importer.progress = progress
+        importer.run(start=state['offset'])
+        self.stdout.write(json.dumps(importer.summary))
+        self.stdout.write(self.style.SUCCESS('imported with %d errors, see %s' % (len(importer.errors), progress_path)))
@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from base.utils import bulk_create_base, bulk_update
+from users.models import StrengthStates, Profile
+from users.strength import STRENGTH_RULES, recompute_strength
+
+
+class Command(BaseCommand):
+    help = 'Recompute strength flags and profile_strength of every user from their data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report the users that would change')
+
+    def handle(self, *args, **options):
+        flags = [rule.flag for rule in STRENGTH_RULES]
+        last_id = 0
+        created = states = profiles = 0
+        while True:
+            user_ids = list(User.objects.filter(id__gt=last_id).order_by('id').values_list(
+                'id', flat=True)[:options['batch_size']])
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            missing, changed_states, changed_profiles = recompute_strength(user_ids)
+            created += len(missing)
+            states += len(changed_states)
+            profiles += len(changed_profiles)
+            for profile in changed_profiles:
+                self.stdout.write('%s: %s' % (profile.profile_user_id, profile.profile_strength))
+            if not options['dry_run']:
+                bulk_create_base(StrengthStates, missing)
+                bulk_update(StrengthStates, changed_states, flags)
+                bulk_update(Profile, changed_profiles, ['profile_strength'])
+        self.stdout.write('%s strength states %s, %s changed, %s profiles rescored' % (
+            created, 'missing' if options['dry_run'] else 'created', states, profiles))
@@ -19,7 +19,7 @@ from django.contrib.postgres.fields import JSONField
 from media.models import Media
 from organizations.models import Organization
 from base.models import Base, BaseManager, BaseCountry, BaseProvince, BaseTown
-from base.signals import update_cache, set_child_name
+from base.signals import update_cache, set_child_name, update_search_document, update_autocomplete, update_profile_strength
 
 
 class Identity(Base):
@@ -45,6 +45,7 @@ class Identity(Base):
     email_verified = models.BooleanField(default=False, db_index=True)
 
     objects = BaseManager()
+    search_fields = (('name', 'A'), ('identity_user.first_name', 'B'), ('identity_user.last_name', 'B'))
 
     def clean(self):
         if not self.identity_user and not self.identity_organization:
@@ -78,6 +79,10 @@ default_user_save = User.save
 post_save.connect(update_cache, sender=Identity)
 # Set Child Name
 pre_save.connect(set_child_name, sender=Identity)
+# Update Search Index
+post_save.connect(update_search_document, sender=Identity)
+# Update Autocomplete Index
+post_save.connect(update_autocomplete, sender=Identity)
 
 
 def user_save(self, *args, **kwargs):
@@ -177,6 +182,8 @@ class Profile(Base):
 post_save.connect(update_cache, sender=Profile)
 # Set Child Name
 pre_save.connect(set_child_name, sender=Profile)
+# Score Profile Strength
+post_save.connect(update_profile_strength, sender=Profile)
 
 
 @receiver(post_save, sender=User)
@@ -269,6 +276,8 @@ class Education(Base):
 post_save.connect(update_cache, sender=Education)
 # Set Child Name
 pre_save.connect(set_child_name, sender=Education)
+# Score Profile Strength
+post_save.connect(update_profile_strength, sender=Education)
 
 
 class Research(Base):
@@ -380,6 +389,8 @@ class WorkExperience(Base):
 post_save.connect(update_cache, sender=WorkExperience)
 # Set Child Name
 pre_save.connect(set_child_name, sender=WorkExperience)
+# Score Profile Strength
+post_save.connect(update_profile_strength, sender=WorkExperience)
 
 
 class Skill(Base):
@@ -513,6 +524,8 @@ class StrengthStates(Base):
 post_save.connect(update_cache, sender=StrengthStates)
 # Set Child Name
 pre_save.connect(set_child_name, sender=StrengthStates)
+# Score Profile Strength, after create_strength made the states of new users
+post_save.connect(update_profile_strength, sender=User)
 
 
 class UserMetaData(Base):
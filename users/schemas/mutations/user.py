@@ -1,13 +1,13 @@
 from django.conf import settings
 from django.contrib.auth.forms import PasswordResetForm
 from django.contrib.sites.shortcuts import get_current_site
-from django.core.mail import EmailMultiAlternatives
 from django.template import loader
 from django.urls import reverse
 from django.utils import translation
 from django.utils.translation import ugettext_lazy as _
 from graphene import relay, Field, List, String, Boolean
 
+from base.notifications import queue_email
 from danesh_boom.viewer_fields import ViewerFields
 from users.forms import ProfileForm, RegisterUserForm
 from users.models import Profile
@@ -57,12 +57,7 @@ class RegisterUserMutation(ViewerFields, relay.ClientIDMutation):
         text_body = loader.render_to_string("activation_email.txt", context)
         html_body = loader.render_to_string("activation_email.html", context)
 
-        email_message = EmailMultiAlternatives(
-            subject, text_body, from_email, [to_email])
-
-        email_message.attach_alternative(html_body, 'text/html')
-
-        email_message.send()
+        queue_email(to_email, str(subject), text_body, html_body=html_body, from_email=from_email)
 
         return RegisterUserMutation(user=user)
 
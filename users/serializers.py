@@ -72,18 +72,8 @@ class SuperAdminUserSerializer(ModelSerializer):
         profile = Profile.objects.get(profile_user=user)
         for key in profile_validated_data:
             setattr(profile, key, validated_data.get(key))
-        user_strength = StrengthStates.objects.get(strength_user=user)
-        if validated_data.get('first_name') is not None and validated_data.get('last_name') is not None:
-            profile.profile_strength += 5
-            profile.save()
-            user_strength.first_last_name_obtained = True
-
-        if 'profile_media' in profile_validated_data:
-            profile.profile_strength += 10
-            profile.save()
-            user_strength.profile_media_obtained = True
-        user_strength.registration_obtained = True
-        user_strength.save()
+        profile.save()
+        # profile strength follows the post_save signals, see users.strength
         # add user to default exchange
         add_user_to_default_exchange(user)
         return user
@@ -94,24 +84,10 @@ class SuperAdminUserSerializer(ModelSerializer):
         print('in admin Area')
         user_validated_data = self.get_user_validated_args(**validated_data)
         print(user_validated_data)
-        try:
-            user_strength = StrengthStates.objects.get(strength_user=user)
-        except StrengthStates.DoesNotExist:
-            user_strength = StrengthStates.objects.create(strength_user=user)
-        # check for first name strength rate
         if 'first_name' in user_validated_data and user_validated_data['first_name'] != '':
             user.first_name = user_validated_data['first_name']
-            if (user.first_name is None or user.first_name == '') and (
-                    user.last_name is not None or user.last_name != ''):
-                profile.profile_strength += 5
-                user_strength.first_last_name_obtained = True
-        # check for last name strength rate
         if 'last_name' in user_validated_data and user_validated_data['last_name'] != '':
             user.last_name = user_validated_data['last_name']
-            if (user.last_name is None or user.last_name == '') and (
-                    user.first_name is not None or user.first_name != ''):
-                profile.profile_strength += 5
-                user_strength.first_last_name_obtained = True
         # set validated data to user object
         for key in user_validated_data:
             if key != 'first_name' and key != 'last_name':
@@ -126,17 +102,14 @@ class SuperAdminUserSerializer(ModelSerializer):
         if 'profile_media' in profile_validated_data and profile_validated_data['profile_media'] != '' and \
                 profile_validated_data['profile_media'] is not None:
             profile.profile_media = profile_validated_data['profile_media']
-            if profile.profile_media == '' or profile.profile_media is None:
-                profile.profile_strength += 10
-                user_strength.profile_media_obtained = True
 
         # set validated data to profile object
         for key in profile_validated_data:
             if key != 'profile_media':
                 setattr(profile, key, validated_data.get(key))
 
+        # profile strength follows the post_save signals, see users.strength
         profile.save()
-        user_strength.save()
         return user
 
     @staticmethod
@@ -281,20 +254,7 @@ class UserSerializer(ModelSerializer):
         for key in profile_validated_data:
             setattr(profile, key, validated_data.get(key))
         profile.save()
-        user_strength = StrengthStates.objects.get(strength_user=user)
-        # check for first & last name strength rate
-        if validated_data.get('first_name') is not None and validated_data.get('last_name') is not None:
-            profile.profile_strength += 5
-            profile.save()
-            user_strength.first_last_name_obtained = True
-
-        # check for profile media strength rate
-        if 'profile_media' in profile_validated_data:
-            profile.profile_strength += 10
-            profile.save()
-            user_strength.profile_media_obtained = True
-        user_strength.registration_obtained = True
-        user_strength.save()
+        # profile strength follows the post_save signals, see users.strength
         # add user to default exchange
         add_user_to_default_exchange(user)
         return user
@@ -303,24 +263,10 @@ class UserSerializer(ModelSerializer):
         user = User.objects.get(pk=instance.id)
         profile = Profile.objects.get(profile_user=user)
         user_validated_data = self.get_user_validated_args(**validated_data)
-        try:
-            user_strength = StrengthStates.objects.get(strength_user=user)
-        except StrengthStates.DoesNotExist:
-            user_strength = StrengthStates.objects.create(strength_user=user)
-        # check for first name strength rate
         if 'first_name' in user_validated_data and user_validated_data['first_name'] != '':
             user.first_name = user_validated_data['first_name']
-            if (user.first_name is None or user.first_name == '') and (
-                    user.last_name is not None or user.last_name != ''):
-                profile.profile_strength += 5
-                user_strength.first_last_name_obtained = True
-        # check for last name strength rate
         if 'last_name' in user_validated_data and user_validated_data['last_name'] != '':
             user.last_name = user_validated_data['last_name']
-            if (user.last_name is None or user.last_name == '') and (
-                    user.first_name is not None or user.first_name != ''):
-                profile.profile_strength += 5
-                user_strength.first_last_name_obtained = True
         # set validated data to user object
         for key in user_validated_data:
             if key != 'first_name' and key != 'last_name':
@@ -332,21 +278,17 @@ class UserSerializer(ModelSerializer):
 
         profile_validated_data = self.get_profile_validated_data(**validated_data)
 
-        # check for profile media strength rate
         if 'profile_media' in profile_validated_data and profile_validated_data['profile_media'] != '' and \
                 profile_validated_data['profile_media'] is not None:
             profile.profile_media = profile_validated_data['profile_media']
-            if profile.profile_media == '' or profile.profile_media is None:
-                profile.profile_strength += 10
-                user_strength.profile_media_obtained = True
 
         # set validated data to profile object
         for key in profile_validated_data:
             if key != 'profile_media':
                 setattr(profile, key, validated_data.get(key))
 
+        # profile strength follows the post_save signals, see users.strength
         profile.save()
-        user_strength.save()
 
         return user
 
@@ -480,16 +422,9 @@ class ProfileSerializer(BaseSerializer):
         else:
             instance.profile_user = validated_data.get('profile_user', instance.profile_user)
 
-        # check for profile media strength rate
+        # profile strength follows the post_save signal, see users.strength
         if 'profile_media' in validated_data and (
                 validated_data['profile_media'] != '' or validated_data['profile_media'] is not None):
-            if instance.profile_media == '' or instance.profile_media is None:
-                try:
-                    user_strength = StrengthStates.objects.get(strength_user=instance.profile_user)
-                except StrengthStates.DoesNotExist:
-                    user_strength = StrengthStates.objects.create(strength_user=instance.profile_user)
-                instance.profile_strength += 10
-                user_strength.profile_media_obtained = True
             instance.profile_media = validated_data['profile_media']
 
         # set validated data to profile instance
@@ -557,8 +492,7 @@ class EducationSerializer(BaseSerializer):
             validated_data['education_user'] = request.user
         education = Education.objects.create(**validated_data)
         education.save()
-        # check for education user strength rate
-        self.check_education_profile_strength(validated_data['education_user'])
+        # profile strength follows the post_save signal, see users.strength
         return education
 
     def update(self, instance, validated_data):
@@ -576,22 +510,6 @@ class EducationSerializer(BaseSerializer):
         instance.save()
         return instance
 
-    def check_education_profile_strength(self, user):
-        educations = Education.objects.filter(education_user=user)
-        try:
-            user_strength = StrengthStates.objects.get(strength_user=user)
-        except StrengthStates.DoesNotExist:
-            user_strength = StrengthStates.objects.create(strength_user=user)
-        if educations.count() == 1 and user_strength.education_obtained is False:
-            try:
-                profile = Profile.objects.get(profile_user=user)
-            except Profile.DoesNotExist:
-                profile = Profile.objects.create(profile_user=user)
-            profile.profile_strength += 5
-            profile.save()
-            user_strength.education_obtained = True
-            user_strength.save()
-
 
 class ResearchSerializer(BaseSerializer):
     class Meta:
@@ -692,8 +610,7 @@ class WorkExperienceSerializer(BaseSerializer):
             confirmation_parent=experience
         )
         confirmation.save()
-        # check for experience profile points
-        self.check_experience_profile_strength(validated_data.get('work_experience_user'))
+        # profile strength follows the post_save signal, see users.strength
         return experience
 
     def update(self, instance, validated_data):
@@ -712,22 +629,6 @@ class WorkExperienceSerializer(BaseSerializer):
         instance.save()
         return instance
 
-    def check_experience_profile_strength(self, user):
-        works = WorkExperience.objects.filter(work_experience_user=user)
-        try:
-            user_strength = StrengthStates.objects.get(strength_user=user)
-        except StrengthStates.DoesNotExist:
-            user_strength = StrengthStates.objects.create(strength_user=user)
-        if user_strength.work_obtained is False and works.count() == 1:
-            try:
-                profile = Profile.objects.get(profile_user=user)
-            except Profile.DoesNotExist:
-                profile = Profile.objects.create(profile_user=user)
-            profile.profile_strength += 5
-            profile.save()
-            user_strength.work_obtained = True
-            user_strength.save()
-
 
 class SkillSerializer(BaseSerializer):
     class Meta:
@@ -0,0 +1,178 @@
+from django.apps import apps
+from django.db import connections
+from django.db.models import Count
+
+from base.cache import invalidation_bus, related_tables
+
+# profile_strength of a profile with no obtained flag
+BASE_STRENGTH = 10
+
+
+def user_of_identity(identity_id):
+    from .models import Identity
+    if identity_id is None:
+        return None
+    return Identity.objects.filter(pk=identity_id).values_list('identity_user_id', flat=True).first()
+
+
+def has_full_name(user):
+    return bool(user.first_name) and bool(user.last_name)
+
+
+def count_hashtags(user_id):
+    from base.models import Hashtag
+    return Hashtag.objects.filter(hashtag_base__identity__identity_user_id=user_id).count()
+
+
+def users_with_posts(user_ids, post_types):
+    from base.models import Post
+    return set(Post.objects.filter(post_user_id__in=user_ids, post_type__in=post_types).values_list(
+        'post_user_id', flat=True).order_by().distinct())
+
+
+def users_with_hashtags(user_ids, count):
+    from base.models import Hashtag
+    return set(Hashtag.objects.filter(hashtag_base__identity__identity_user_id__in=user_ids).values(
+        'hashtag_base__identity__identity_user_id').annotate(hashtags=Count('id')).filter(
+        hashtags__gte=count).values_list('hashtag_base__identity__identity_user_id', flat=True).order_by())
+
+
+def user_of_exchange_identity(exchange_identity):
+    # every user is added to the default exchange at signup, only the others are joined
+    from exchanges.models import Exchange
+    if Exchange.objects.filter(pk=exchange_identity.exchange_identity_related_exchange_id,
+                               is_default_exchange=True).exists():
+        return None
+    return user_of_identity(exchange_identity.exchange_identity_related_identity_id)
+
+
+def users_in_exchanges(user_ids):
+    from exchanges.models import ExchangeIdentity
+    return set(ExchangeIdentity.objects.filter(
+        exchange_identity_related_identity__identity_user_id__in=user_ids).exclude(
+        exchange_identity_related_exchange__is_default_exchange=True).values_list(
+        'exchange_identity_related_identity__identity_user_id', flat=True).order_by().distinct())
+
+
+class StrengthRule(object):
+    """
+        flag of StrengthStates worth points, user_id maps a saved sender instance to the user it
+        may score for (None when it does not apply), check confirms it and bulk finds the users
+        of a batch meeting it
+    """
+    def __init__(self, flag, points, sender, user_id, check=None, bulk=None, created_only=True):
+        self.flag = flag
+        self.points = points
+        self.sender = sender
+        self.user_id = user_id
+        self.check = check
+        self.bulk = bulk
+        self.created_only = created_only
+
+
+STRENGTH_RULES = [
+    StrengthRule('registration_obtained', 0, 'auth.User', lambda user: user.id,
+                 bulk=lambda user_ids: set(user_ids)),
+    StrengthRule('first_last_name_obtained', 5, 'auth.User',
+                 lambda user: user.id if has_full_name(user) else None, created_only=False,
+                 bulk=lambda user_ids: set(apps.get_model('auth.User').objects.filter(pk__in=user_ids).exclude(
+                     first_name='').exclude(last_name='').values_list('id', flat=True))),
+    StrengthRule('profile_media_obtained', 10, 'users.Profile',
+                 lambda profile: profile.profile_user_id if profile.profile_media_id else None, created_only=False,
+                 bulk=lambda user_ids: set(apps.get_model('users.Profile').objects.filter(
+                     profile_user_id__in=user_ids, profile_media__isnull=False).values_list('profile_user_id', flat=True))),
+    StrengthRule('hashtags_obtained', 10, 'base.Hashtag',
+                 lambda hashtag: user_of_identity(hashtag.hashtag_base_id),
+                 check=lambda user_id: count_hashtags(user_id) >= 3,
+                 bulk=lambda user_ids: users_with_hashtags(user_ids, 3)),
+    StrengthRule('exchange_obtained', 5, 'exchanges.ExchangeIdentity', user_of_exchange_identity,
+                 bulk=users_in_exchanges),
+    StrengthRule('education_obtained', 5, 'users.Education', lambda education: education.education_user_id,
+                 bulk=lambda user_ids: set(apps.get_model('users.Education').objects.filter(
+                     education_user_id__in=user_ids).values_list('education_user_id', flat=True))),
+    StrengthRule('work_obtained', 5, 'users.WorkExperience', lambda work: work.work_experience_user_id,
+                 bulk=lambda user_ids: set(apps.get_model('users.WorkExperience').objects.filter(
+                     work_experience_user_id__in=user_ids).values_list('work_experience_user_id', flat=True))),
+    StrengthRule('post_obtained', 5, 'base.Post',
+                 lambda post: post.post_user_id if post.post_type == 'post' else None,
+                 bulk=lambda user_ids: users_with_posts(user_ids, ['post'])),
+    StrengthRule('supply_demand_obtained', 10, 'base.Post',
+                 lambda post: post.post_user_id if post.post_type in ('supply', 'demand') else None,
+                 bulk=lambda user_ids: users_with_posts(user_ids, ['supply', 'demand'])),
+]
+
+
+def get_rules(model):
+    return [rule for rule in STRENGTH_RULES if rule.sender == model._meta.label]
+
+
+def obtain(user_id, rule, using=None):
+    """
+        Sets the flag and adds its points in one statement, a no-op when the flag is already set
+    """
+    from .models import StrengthStates, Profile
+    strength_table = StrengthStates._meta.db_table
+    profile_table = Profile._meta.db_table
+    sql = (
+        'WITH claimed AS ('
+        'UPDATE {strength} SET {flag} = true WHERE {strength_user} = %s AND NOT {flag} RETURNING {strength_pk}'
+        '), scored AS ('
+        'UPDATE {profile} SET {points} = {points} + %s '
+        'WHERE {profile_user} = %s AND EXISTS (SELECT 1 FROM claimed) RETURNING {profile_pk}'
+        ') SELECT (SELECT {strength_pk} FROM claimed), (SELECT {profile_pk} FROM scored)'
+    ).format(
+        strength=strength_table,
+        flag=StrengthStates._meta.get_field(rule.flag).column,
+        strength_user=StrengthStates._meta.get_field('strength_user').column,
+        strength_pk=StrengthStates._meta.pk.column,
+        profile=profile_table,
+        points=Profile._meta.get_field('profile_strength').column,
+        profile_user=Profile._meta.get_field('profile_user').column,
+        profile_pk=Profile._meta.pk.column,
+    )
+    with connections[using or 'default'].cursor() as cursor:
+        cursor.execute(sql, [user_id, rule.points, user_id])
+        strength_pk, profile_pk = cursor.fetchone()
+    if strength_pk is not None:
+        invalidation_bus.add_rows(related_tables(StrengthStates), strength_pk, using)
+    if profile_pk is not None:
+        invalidation_bus.add_rows(related_tables(Profile), profile_pk, using)
+    return strength_pk is not None
+
+
+def evaluate_strength(instance, created=False, using=None):
+    for rule in get_rules(type(instance)):
+        if rule.created_only and not created or getattr(instance, 'delete_flag', False):
+            continue
+        user_id = rule.user_id(instance)
+        if user_id is None or rule.check is not None and not rule.check(user_id):
+            continue
+        obtain(user_id, rule, using)
+
+
+def recompute_strength(user_ids):
+    """
+        Flags and profile_strength of the users from their data, returns the missing StrengthStates
+        and the changed StrengthStates and Profiles
+    """
+    from .models import StrengthStates, Profile
+    met = {rule.flag: rule.bulk(user_ids) for rule in STRENGTH_RULES}
+    states = {state.strength_user_id: state for state in StrengthStates.objects.filter(strength_user_id__in=user_ids)}
+    missing = [StrengthStates(strength_user_id=user_id) for user_id in user_ids if user_id not in states]
+    changed_states = []
+    changed_profiles = []
+    for state in missing + list(states.values()):
+        changed = False
+        for rule in STRENGTH_RULES:
+            obtained = state.strength_user_id in met[rule.flag]
+            if getattr(state, rule.flag) != obtained:
+                setattr(state, rule.flag, obtained)
+                changed = True
+        if changed and state.pk is not None:
+            changed_states.append(state)
+    for profile in Profile.objects.filter(profile_user_id__in=user_ids).only('id', 'profile_user', 'profile_strength'):
+        strength = BASE_STRENGTH + sum(rule.points for rule in STRENGTH_RULES if profile.profile_user_id in met[rule.flag])
+        if profile.profile_strength != strength:
+            profile.profile_strength = strength
+            changed_profiles.append(profile)
+    return missing, changed_states, changed_profiles
@@ -1,23 +1,18 @@
 from django.contrib.auth.models import User
 from django.template.loader import render_to_string
-from django.core.mail import EmailMessage
 from utils.token import generate_token
 
-from .models import Identity
+from base.models import Badge
+from base.notifications import queue_email
+from organizations.graph import follow_graph, contains
+from .models import Identity, Profile
 from exchanges.models import Exchange, ExchangeIdentity
 
 
 def send_verification_mail(user):
     link = 'http://daneshboom.ir/users/active/' + generate_token(user) + '/'
     content = render_to_string("activation_email.html", {'user': user, 'link': link})
-    msg = EmailMessage(
-        subject='verify your account',
-        body=content,
-        from_email='kamankesh.amr@gmail.com',
-        bcc=[user.email]
-    )
-    msg.content_subtype = "html"
-    return msg.send()
+    return queue_email(user.email, 'verify your account', '', html_body=content)
 
 
 def add_user_to_default_exchange(user):
@@ -45,3 +40,29 @@ def add_organization_to_default_exchange(organization):
     exchange_identity = ExchangeIdentity.objects.create(exchange_identity_related_identity=identity,
                                                         exchange_identity_related_exchange=exchange,
                                                         join_type='quest')
+
+
+def get_explore_records(users, viewer_identity):
+    # fetch every relation of the page once and join them in memory
+    user_ids = [user.id for user in users]
+    profiles = Profile.objects.select_related(
+        'profile_media', 'profile_banner'
+    ).only('id', 'profile_user', 'profile_media', 'profile_banner', 'description').filter(profile_user_id__in=user_ids)
+    profiles = {profile.profile_user_id: profile for profile in profiles}
+    identities = dict(Identity.objects.filter(identity_user_id__in=user_ids).values_list('identity_user_id', 'id'))
+    followed_ids = follow_graph.following(viewer_identity.id)
+    badges = {}
+    for badge in Badge.objects.filter(
+            badge_related_parent_id__in=identities.values()).select_related('badge_related_badge_category'):
+        badges.setdefault(badge.badge_related_parent_id, []).append(badge)
+
+    records = []
+    for user in users:
+        identity_id = identities.get(user.id, None)
+        records.append({
+            'user': user,
+            'profile': profiles.get(user.id, None),
+            'is_followed': identity_id is not None and contains(followed_ids, identity_id),
+            'badges': badges.get(identity_id, []),
+        })
+    return records
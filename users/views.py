@@ -1,5 +1,4 @@
 import json
-import requests
 import random
 
 from django.conf import settings
@@ -12,7 +11,6 @@ from django.http import HttpResponse, Http404
 from django.shortcuts import render, redirect
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
-from django.core.mail import send_mail
 from numpy import record
 from rest_framework import status
 
@@ -27,6 +25,8 @@ from rest_framework.decorators import list_route, detail_route
 from rest_framework.response import Response
 from base.permissions import BlockPostMethod, IsOwnerOrReadOnly, SafeMethodsOnly, OnlyPostMethod, CanReadContent
 from base.models import BaseSocialType, BaseSocial, Badge
+from base.notifications import queue_email, queue_sms, LIMITED
+from base.views import SearchMixin
 from .models import (
     Identity,
     Profile,
@@ -77,10 +77,15 @@ from .serializers import (
     UniversityFieldSerializer
 )
 from .permissions import IsUrlOwnerOrReadOnly, IsAuthenticatedOrCreateOnly, IsDeviceOwnerOrReadOnly
+from .utils import get_explore_records
+from .importers import UserImporter
 
 
-class UserViewset(ModelViewSet):
+class UserViewset(SearchMixin, ModelViewSet):
     permission_classes = [IsAuthenticatedOrCreateOnly]
+    # users are found through their identity documents
+    search_prefix = 'identity__'
+    query_budget = {'explore': 10}
 
     def get_queryset(self):
         if self.request.user.is_superuser:
@@ -157,29 +162,19 @@ class UserViewset(ModelViewSet):
         permission_classes=[IsAuthenticated]
     )
     def explore(self, request):
-        result = []
-        users = User.objects.filter(is_active=True)
+        users = User.objects.filter(is_active=True).order_by('id')
         self_user_identity = Identity.objects.get(identity_user=request.user)
         username = self.request.query_params.get('username', None)
         if username is not None:
             users = users.filter(username__contains=username)
-        for user in users:
-            explore_record = {'user': user}
-            profile = Profile.objects.select_related(
-                'profile_media', 'profile_banner'
-            ).only('id', 'profile_media', 'profile_banner', 'description').get(profile_user=user)
-            explore_record['profile'] = profile
-            user_identity = Identity.objects.filter(identity_user=user)
-            explore_record['is_followed'] = False
-            follow = Follow.objects.filter(follow_followed=user_identity, follow_follower=self_user_identity, follow_accepted=True)
-            if follow.count() != 0:
-                explore_record['is_followed'] = True
-            badges = Badge.objects.filter(badge_related_parent=user_identity).select_related('badge_related_badge_category')
-            explore_record['badges'] = badges
-            result.append(explore_record)
-
-        explore_serializer = UserExploreSerializer(result, many=True)
 
+        page = self.paginate_queryset(users)
+        if page is None:
+            page = list(users)
+        explore_serializer = UserExploreSerializer(get_explore_records(page, self_user_identity), many=True)
+
+        if self.paginator is not None:
+            return self.get_paginated_response(explore_serializer.data)
         return Response(explore_serializer.data, status=status.HTTP_200_OK)
 
     @list_route(methods=['post'], permission_classes=[AllowAny])
@@ -207,227 +202,11 @@ class UserViewset(ModelViewSet):
     def import_users(self, request):
         jsonString = request.data.get('records', None)
         data = json.loads(jsonString)
-        errors = []
-        for record in data:
-
-            # get users with username  if not exist adding it to data baase
-            user = User.objects.filter(username=record.get('username', None))
-            if user.count() == 0:
-                user = User(username=record.get('username', None))
-            else:
-                user = User.objects.get(username=record.get('username', None))
-
-            # check for user input data and add update fields
-            if record.get('password', None) is not None and record.get('password', None) != '':
-                user.set_password(record.get('password', None))
-            if record.get('email', None) is not None and record.get('email', None) != '':
-                user.email = record.get('email', None)
-            if record.get('first_name', None) is not None and record.get('first_name', None) != '':
-                user.first_name = record.get('first_name', None)
-            if record.get('last_name', None) is not None and record.get('last_name', None) != '':
-                user.last_name = record.get('last_name', None)
-            user.save()
-
-            # get user identity
-            user_identity = Identity.objects.get(identity_user=user)
-
-            # adding user phone numbers
-            phone_data = record.get('phones', None)
-            if phone_data is not None and phone_data != '':
-                # get phone numbers with '*' split
-                phones = phone_data.split('*')
-                if len(phones) < 3:
-                    for phone in phones:
-                        meta_phone_count = UserMetaData.objects.filter(user_meta_related_user=user, user_meta_type='phone').count()
-                        if meta_phone_count < 2:
-                            meta_phone_check = UserMetaData.objects.filter(user_meta_value=phone, user_meta_type='phone').count()
-                            if meta_phone_check == 0:
-                                try:
-                                    meta_phone = UserMetaData.objects.create(
-                                        user_meta_related_user=user,
-                                        user_meta_type='phone',
-                                        user_meta_value=phone
-                                    )
-                                except Exception as e:
-                                    errors.append({
-                                        'data': record,
-                                        'status': str(e)
-                                    })
-                            else:
-                                errors.append({
-                                    'data': record,
-                                    'status': 'user phone number exist'
-                                })
-                        else:
-                            errors.append({
-                                'data': record,
-                                'status': 'user can not have more that two phone number'
-                            })
-                else:
-                    errors.append({
-                        'data': record,
-                        'status': 'user can not have more that two phone number'
-                    })
-            # adding user mobile numbers
-            mobile_data = record.get('mobiles', None)
-            if mobile_data is not None and mobile_data != '':
-                # get mobile numbers wiht '*' split
-                mobiles = mobile_data.split('*')
-                if len(mobiles) < 3:
-                    for mobile in mobiles:
-                        meta_mobile_count = UserMetaData.objects.filter(user_meta_related_user=user, user_meta_type='mobile').count()
-                        if meta_mobile_count < 2:
-                            meta_mobile_check = UserMetaData.objects.filter(user_meta_value=mobile, user_meta_type='mobile').count()
-                            if meta_mobile_check == 0:
-                                try:
-                                    meta_mobile = UserMetaData.objects.create(
-                                        user_meta_related_user=user,
-                                        user_meta_type='mobile',
-                                        user_meta_value=mobile
-                                    )
-                                except Exception as e:
-                                    errors.append({
-                                        'data': record,
-                                        'status': str(e)
-                                    })
-                            else:
-                                errors.append({
-                                    'data': record,
-                                    'status': 'user phone number exist'
-                                })
-                        else:
-                            errors.append({
-                                'data': record,
-                                'status': 'user can not have more that two mobile number'
-                            })
-                else:
-                    errors.append({
-                        'data': record,
-                        'status': 'user can not have more that two mobile number'
-                    })
-            # add user profile data
-            profile = Profile.objects.filter(profile_user=user)
-            if profile.count() == 0:
-                profile = Profile(profile_user=user)
-            else:
-                profile = Profile.objects.get(profile_user=user)
-            # check if data exist update profile instance
-            if record.get('profile_national_code', None) is not None and record.get('profile_national_code', None) != '':
-                profile.national_code = record.get('profile_national_code', None)
-            if record.get('profile_birth_date', None) is not None and record.get('profile_birth_date', None) != '':
-                profile.birth_date = record.get('profile_birth_date', None)
-            if record.get('profile_description', None) is not None and record.get('profile_description', None) != '':
-                profile.description = record.get('description', None)
-            if record.get('profile_address', None) is not None and record.get('profile_address', None) != '':
-                profile.address = record.get('profile_address', None)
-            if record.get('profile_public_email', None) is not None and record.get('profile_public_email', None) != '':
-                profile.public_email = record.get('profile_public_email', None)
-            if record.get('profile_telegram_account', None) is not None and record.get('profile_telegram_account', None) != '':
-                profile.public_email = record.get('profile_telegram_account', None)
-            if record.get('profile_instagram_account', None) is not None and record.get('profile_instagram_account', None) != '':
-                profile.public_email = record.get('profile_instagram_account', None)
-            if record.get('profile_linkedin_account', None) is not None and record.get('profile_linkedin_account', None) != '':
-                profile.public_email = record.get('profile_linkedin_account', None)
-            # add social data
-            if record.get('social_name', None) is not None and record.get('social_name', None) != '':
-                try:
-                    social_type = BaseSocialType.objects.get(social_name=record.get('social_name', None))
-                except Exception as e:
-                    social_type = None
-                    errors.append({
-                        'data': record,
-                        'status': str(e)
-                    })
-                if social_type is not None:
-                    social_value = BaseSocial.objects.filter(base_social_related_social_type=social_type,
-                                                             base_social_parent=user_identity)
-                    if social_value.count() == 0:
-                        social_value = BaseSocial(base_social_parent=user_identity)
-                    else:
-                        social_value = BaseSocial.objects.get(base_social_related_social_type=social_type,
-                                                              base_social_parent=user_identity)
-                    if record.get('base_social_value', None) is not None and record.get('base_social_value', None) != '':
-                        social_value.base_social_parent = user_identity
-                    social_value.save()
-            # add education data
-            if (record.get('education_grade', None) is not None and record.get('education_grade', None) != '') and (record.get('education_university', None) is not None and record.get('education_university', None) != '') and (record.get('education_field_of_study', None) is not None and record.get('education_field_of_study', None) != 0) and (record.get('education_from_date', None) is not None and record.get('education_from_date', None) != '') and (record.get('education_to_date', None) is not None and record.get('education_to_date', None) != ''):
-                education = Education.objects.filter(education_user=user,
-                                                     grade=record.get('education_grade', None),
-                                                     university=record.get('education_university', None),
-                                                     field_of_study=record.get('education_field_of_study', None),
-                                                     from_date=record.get('education_from_date', None),
-                                                     to_date=record.get('education_to_date', None))
-                if education.count() == 0:
-                    education = Education(education_user=user,
-                                          grade=record.get('education_grade', None),
-                                          university=record.get('education_university', None),
-                                          field_of_study=record.get('education_field_of_study', None),
-                                          from_date=record.get('education_from_date', None),
-                                          to_date=record.get('education_to_date', None))
-                else:
-                    education = Education.objects.get(education_user=user,
-                                                      grade=record.get('education_grade', None),
-                                                      university=record.get('education_university', None),
-                                                      field_of_study=record.get('education_field_of_study', None),
-                                                      from_date=record.get('education_from_date', None),
-                                                      to_date=record.get('education_to_date', None))
-                if record.get('education_average', None) is not None and record.get('education_average', None) != '':
-                    education.average = record.get('education_average', None)
-                if record.get('education_description', None) is not None and record.get('education_description', None) != '':
-                    education.description = record.get('education_description', None)
-            # add research data
-            if record.get('research_title', None) is not None and record.get('research_title', None) != '':
-                research = Research.objects.filter(research_user=user, title=record.get('research_title', None))
-                if research.count() == 0:
-                    research = Research(research_user=user)
-                else:
-                    research = Research.objects.get(research_user=user, title=record.get('research_title', None))
-                if record.get('research_url', None) is not None and record.get('research_url', None) != '':
-                    research.url = record.get('research_url', None)
-                if record.get('research_author', None) is not None and record.get('research_author', None) != '':
-                    research.author = record.get('research_author', None)
-                if record.get('research_publication', None) is not None and record.get('research_publication', None):
-                    research.publication = record.get('research_publication', None)
-                if record.get('research_year', None) is not None and record.get('research_year', None) != '':
-                    research.year = record.get('research_year', None)
-                if record.get('research_page_count', None) is not None and record.get('research_page_count', None):
-                    research.page_count = record.get('research_page_count', None)
-                if record.get('research_link', None) is not None and record.get('research_link', None) != '':
-                    research.research_link = record.get('research_link', None)
-                research.save()
-            # add work experience
-            if (record.get('work_experience_organization', None) is not None and record.get('work_experience_organization', None) != '') and (record.get('work_experience_from_date', None) is not None and record.get('work_experience_from_date', None) != '') and (record.get('work_experience_to_date', None) is not None and record.get('work_experience_to_date', None) != '') and (record.get('work_experience_position', None) is not None and record.get('work_experience_position', None) != ''):
-                work_experience = WorkExperience.objects.filter(work_experience_user=user,
-                                                                work_experience_organization=record.get('work_experience_organization', None),
-                                                                from_date=record.get('work_experience_from_date', None),
-                                                                to_date=record.get('work_experience_to_date', None))
-                if work_experience.count() == 0:
-                    work_experience = WorkExperience(work_experience_user=user,
-                                                     work_experience_organization=record.get('work_experience_organization', None))
-                else:
-                    work_experience = WorkExperience.objects.get(work_experience_user=user,
-                                                                 work_experience_organization=record.get('work_experience_organization', None))
-                if record.get('work_experience_name', None) is not None and record.get('work_experience_name', None) != '':
-                    work_experience.name = record.get('work_experience_name', None)
-                if record.get('work_experience_position', None) is not None and record.get('work_experience_position', None) != '':
-                    work_experience.position = record.get('work_experience_position', None)
-                if record.get('work_experience_from_date', None) is not None and record.get('work_experience_from_date') != '':
-                    work_experience.from_date = record.get('work_experience_from_date', None)
-                if record.get('work_experience_to_date', None) is not None and record.get('work_experience_to_date', None) != '':
-                    work_experience.to_date = record.get('work_experience_to_date', None)
-                work_experience.save()
-            # add skills data
-            if record.get('skill_title', None) is not None and record.get('skill_title', None) != '':
-                skill = Skill.objects.filter(skill_user=user, title=record.get('skill_title', None))
-                if skill.count() == 0:
-                    skill = Skill.objects.create(skill_user=user, title=record.get('skill_title', None))
-                if record.get('skill_tag', None) is not None and record.get('skill_tag', None) != '':
-                    skill.tag = record.get('skill_tag', None)
-                if record.get('skill_description', None) is not None and record.get('skill_description', None) != '':
-                    skill.description = record.get('skill_description', None)
-
+        importer = UserImporter(data)
+        errors = importer.run()
         response = {
-            'errors': errors
+            'errors': errors,
+            'summary': importer.summary
         }
         return Response(response)
 
@@ -497,30 +276,14 @@ class UserViewset(ModelViewSet):
                 code_object.save()
             else:
                 code_object = UserCode.objects.filter(user=user_object, active=True, used=False, type='sms')[0]
-            print(code_object.code)
-            data = {
-              "UserApiKey": "ead9bf7ba2865979ab2dcc3e",
-              "SecretKey": "w9abTCGEEJqPfgWSEv4Dz9NxSqHFxJuj"
-            }
-            r = requests.post("http://RestfulSms.com/api/Token", data=data)
-            tokenData = json.loads(r.text)
-            if tokenData["IsSuccessful"] == True:
-                sms_body = {
-                    "ParameterArray":[
-                      { "Parameter": "Name", "ParameterValue": "اینوین" },
-                      { "Parameter": "VerificationCode","ParameterValue": code_object.code }
-                    ],
-                    "Mobile": profile.auth_mobile,
-                    "TemplateId":"5253"
-                }
-                headers = {
-                  "Content-Type" : "application/json",
-                  "x-sms-ir-secure-token" : tokenData["TokenKey"]
-                }
-                smsRequest = requests.post("http://RestfulSms.com/api/UltraFastSend", headers=headers, data=json.dumps(sms_body))
-                smsRequestData = json.loads(smsRequest.text)
-                return Response({'status': 'SUCCESS', 'user_id': user_object.id})
-            return Response({'status': 'FAILED'})
+            # sent by the send_notifications worker, the provider never delays the response
+            sms = queue_sms(profile.auth_mobile, settings.SMS_VERIFICATION_TEMPLATE, [
+                ("Name", "اینوین"),
+                ("VerificationCode", code_object.code),
+            ])
+            if sms.status == LIMITED:
+                return Response({'status': 'FAILED'})
+            return Response({'status': 'SUCCESS', 'user_id': user_object.id})
         else:
             return Response({'status': 'User not set mobile'})
 
@@ -1162,9 +925,7 @@ class ForgetPasswordViewset(ViewSet):
                 # send random number via email
                 subject = ' بازیابی رمز عبور '
                 message = settings.EMAIL_TEXT + '\n' + ' کد : ' + str(user_code.code)
-                email_from = settings.EMAIL_HOST_USER
-                recipient_list = [user.email]
-                send_mail(subject, message, email_from, recipient_list, fail_silently=False)
+                queue_email(user.email, subject, message, from_email=settings.EMAIL_HOST_USER)
             return Response({'detail': 'code sended'}, status=status.HTTP_200_OK)
         else:
             return Response({'detail': 'invalid data'}, status=status.HTTP_400_BAD_REQUEST)